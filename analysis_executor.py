@@ -0,0 +1,263 @@
+# app/services/analysis_executor.py
+# 分析執行器 - 在進程池中運行 CPU 密集的指標計算，避免阻塞事件循環
+# OHLCV 通過共享內存傳遞 (不經 pickle)，限制排隊深度並為每個任務設置超時
+
+import os
+import signal
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from ..core.config import get_settings
+from ..utils.metrics import INDICATOR_COMPUTE
+from .technical_analyzer import TechnicalAnalyzer
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class AnalysisQueueFullError(RuntimeError):
+    """排隊任務已達上限"""
+
+
+class AnalysisTimeoutError(TimeoutError):
+    """分析任務超時"""
+
+
+class _JobDeadline(BaseException):
+    """工作進程內的任務截止時間到達 (由 SIGALRM 觸發；不被分析代碼的 except Exception 吞掉)"""
+
+
+# ---------------------------------------------------------------------------
+# 共享內存打包：[列數 × 行數] float64 數值區 + 行數 int64 時間索引
+# ---------------------------------------------------------------------------
+
+def _pack_ohlcv(data: pd.DataFrame) -> Dict[str, Any]:
+    """將 OHLCV 複製到共享內存，返回可傳給子進程的描述 (僅名稱與形狀)"""
+    columns = [c for c in OHLCV_COLUMNS if c in data]
+    rows = len(data)
+    index = pd.DatetimeIndex(data.index)
+
+    values_bytes = len(columns) * rows * 8
+    shm = shared_memory.SharedMemory(create=True, size=max(values_bytes + rows * 8, 1))
+
+    values = np.ndarray((len(columns), rows), dtype=np.float64, buffer=shm.buf)
+    for i, column in enumerate(columns):
+        values[i] = data[column].to_numpy(dtype=np.float64)
+    stamps = np.ndarray((rows,), dtype=np.int64, buffer=shm.buf, offset=values_bytes)
+    # 帶時區的索引取 UTC 時間戳
+    stamps[:] = index.values.astype("datetime64[ns]").view(np.int64)
+
+    spec = {
+        "name": shm.name,
+        "columns": columns,
+        "rows": rows,
+        "tz": str(index.tz) if index.tz is not None else None
+    }
+    return {"shm": shm, "spec": spec}
+
+
+def _unpack_ohlcv(spec: Dict[str, Any]) -> pd.DataFrame:
+    """子進程中從共享內存重建 DataFrame"""
+    shm = _attach(spec["name"])
+    try:
+        columns, rows = spec["columns"], spec["rows"]
+        values_bytes = len(columns) * rows * 8
+        values = np.ndarray((len(columns), rows), dtype=np.float64, buffer=shm.buf)
+        stamps = np.ndarray((rows,), dtype=np.int64, buffer=shm.buf, offset=values_bytes)
+
+        # 索引同樣複製 (pandas 2.x 的 DatetimeIndex 直接引用傳入的緩衝區，detach 後即失效)
+        index = pd.DatetimeIndex(stamps.copy().view("datetime64[ns]"))
+        if spec["tz"]:
+            index = index.tz_localize("UTC").tz_convert(spec["tz"])
+        # 計算期間共享內存可能被父進程釋放，因此複製到進程本地內存
+        return pd.DataFrame({c: values[i].copy() for i, c in enumerate(columns)}, index=index)
+    finally:
+        shm.close()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """附加到已有共享內存 (由父進程負責 unlink)"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 無 track 參數；工作進程與父進程共用同一資源追蹤器，重複登記無副作用
+        return shared_memory.SharedMemory(name=name)
+
+
+# ---------------------------------------------------------------------------
+# 工作進程
+# ---------------------------------------------------------------------------
+
+_worker_analyzer: Optional[TechnicalAnalyzer] = None
+
+
+def _init_worker(backend: str):
+    global _worker_analyzer
+    _worker_analyzer = TechnicalAnalyzer(backend=backend)
+    # 子進程內不輸出逐次計算的 info 日誌
+    logger.disable("app")
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _on_deadline(signum, frame):
+    raise _JobDeadline()
+
+
+def _run_indicators(spec: Dict[str, Any], config: Optional[Dict],
+                    indicators: Optional[List[str]], tail: Optional[int],
+                    timeout: Optional[float]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """工作進程入口：重建數據、計算指標、按需截取尾部後返回 (結果, 分類耗時)
+
+    工作進程內的指標不會被抓取，分類耗時回傳給主進程記錄。
+    """
+    use_alarm = bool(timeout) and hasattr(signal, "setitimer")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_deadline)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+
+    try:
+        data = _unpack_ohlcv(spec)
+        results = _worker_analyzer.calculate_all_indicators(data, config, indicators=indicators)
+        return (_trim(results, tail) if tail else results), dict(_worker_analyzer.last_timings)
+    except _JobDeadline:
+        return {"error": f"分析超時 ({timeout}s)", "timeout": True}, {}
+    except FileNotFoundError:
+        # 任務已被取消，共享內存已釋放
+        return {"error": "任務已取消", "cancelled": True}, {}
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _trim(value: Any, tail: int) -> Any:
+    """只保留指標序列最後 tail 個值，減少回傳的序列化數據量"""
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        return value.iloc[-tail:]
+    if isinstance(value, dict):
+        return {k: _trim(v, tail) for k, v in value.items()}
+    return value
+
+
+# ---------------------------------------------------------------------------
+# 執行器
+# ---------------------------------------------------------------------------
+
+class AnalysisExecutor:
+    """進程池分析執行器 (每個 gunicorn worker 各自持有一個)"""
+
+    def __init__(self, max_workers: Optional[int] = None,
+                 max_pending: Optional[int] = None,
+                 timeout: Optional[float] = None,
+                 backend: Optional[str] = None):
+        settings = get_settings()
+        workers = max_workers if max_workers is not None else settings.ANALYSIS_WORKERS
+        self.max_workers = workers or max(1, (os.cpu_count() or 2) // 2)
+        self.max_pending = max_pending or settings.ANALYSIS_MAX_PENDING
+        self.timeout = timeout if timeout is not None else settings.ANALYSIS_TIMEOUT
+        self.backend = backend or settings.TECHNICAL_BACKEND
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self.stats_counters = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timeouts": 0
+        }
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """延遲創建進程池；forkserver/spawn 避免在多線程的服務進程中 fork"""
+        if self._pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.backend,)
+            )
+            logger.info(f"✅ 分析進程池已啟動: {self.max_workers} 進程")
+        return self._pool
+
+    async def calculate_all_indicators(self, data: pd.DataFrame,
+                                       config: Optional[Dict] = None,
+                                       indicators: Optional[List[str]] = None,
+                                       tail: Optional[int] = None,
+                                       timeout: Optional[float] = None) -> Dict[str, Any]:
+        """在進程池中計算技術指標 (參數與 TechnicalAnalyzer.calculate_all_indicators 相同)
+
+        tail: 只返回各指標序列最後 tail 個值
+        排隊已滿時拋出 AnalysisQueueFullError，超時拋出 AnalysisTimeoutError。
+        """
+        if data is None or data.empty:
+            return {"error": "數據不足"}
+
+        if self._pending >= self.max_pending:
+            self.stats_counters["rejected"] += 1
+            raise AnalysisQueueFullError(f"分析任務排隊已滿 ({self.max_pending})")
+
+        timeout = self.timeout if timeout is None else timeout
+        self._pending += 1
+        self.stats_counters["submitted"] += 1
+        packed = None
+
+        try:
+            # 大數據複製到共享內存需數十毫秒，放到線程中執行 (NumPy 複製時釋放 GIL)
+            packed = await asyncio.get_running_loop().run_in_executor(None, _pack_ohlcv, data)
+            future = self._get_pool().submit(
+                _run_indicators, packed["spec"], config, indicators, tail, timeout
+            )
+            try:
+                # 父進程多留一秒給工作進程自行中止並返回
+                results, timings = await asyncio.wait_for(
+                    asyncio.wrap_future(future), timeout + 1 if timeout else None
+                )
+            except asyncio.TimeoutError:
+                future.cancel()
+                self.stats_counters["timeouts"] += 1
+                raise AnalysisTimeoutError(f"分析超時 ({timeout}s)")
+
+            for category, elapsed in timings.items():
+                INDICATOR_COMPUTE.observe(elapsed, category=category)
+            if results.get("timeout"):
+                self.stats_counters["timeouts"] += 1
+                raise AnalysisTimeoutError(results["error"])
+            if "error" in results:
+                self.stats_counters["failed"] += 1
+            else:
+                self.stats_counters["completed"] += 1
+            return results
+
+        finally:
+            self._pending -= 1
+            if packed is not None:
+                packed["shm"].close()
+                packed["shm"].unlink()
+
+    def stats(self) -> Dict[str, Any]:
+        """執行器統計"""
+        return {
+            "workers": self.max_workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "timeout": self.timeout,
+            **self.stats_counters
+        }
+
+    def shutdown(self, wait: bool = True):
+        """關閉進程池 (應用關閉時調用)"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+            logger.info("分析進程池已關閉")
+
+
+# 全局分析執行器實例
+analysis_executor = AnalysisExecutor()
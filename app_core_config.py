@@ -4,7 +4,13 @@
 import os
 from functools import lru_cache
 from typing import List, Optional
-from pydantic import BaseSettings, validator
+from pydantic import validator
+
+# pydantic 2 的 BaseSettings 已移至 pydantic-settings；pydantic 1 環境沿用原導入
+try:
+    from pydantic_settings import BaseSettings
+except ImportError:
+    from pydantic import BaseSettings
 
 class Settings(BaseSettings):
     """應用程式配置"""
@@ -59,6 +65,8 @@ class Settings(BaseSettings):
 
     # 🔄 Redis 配置
     REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_SOCKET_TIMEOUT: float = 0.5  # 限流組件的連接/讀寫超時 (秒)，Redis 故障時盡快退回進程內計數
+    REDIS_RETRY_INTERVAL: float = 30.0  # Redis 故障後改用進程內計數的冷卻秒數
 
     # 📊 API Keys - 您提供的真實 API Keys
     ALPHA_VANTAGE_KEY: str = "1ONMXCOE6XBGKFWJ"  # ✅ 您的實際key
@@ -74,8 +82,53 @@ class Settings(BaseSettings):
 
     # ⚡ 性能配置
     CACHE_TTL: int = 300  # 5分鐘緩存
+    CACHE_L2_ENABLED: bool = True  # 使用 REDIS_URL 作為跨 worker 的 L2 緩存
+    L1_CACHE_MAX_MB: int = 64  # 進程內 (L1) 資產資料/報價緩存上限
+    QUOTE_CACHE_TTL: int = 5  # 開市時報價緩存秒數 (休市時緩存至下次開市)
+    QUOTE_STALE_TTL: int = 30  # 報價過期後仍可返回舊值並後台刷新的秒數
+    ASSET_INFO_CACHE_TTL: int = 86400  # 資產/公司資料緩存一天
+    ASSET_INFO_STALE_TTL: int = 86400
+    QUOTE_STREAM_INTERVAL: float = 5.0  # 報價推送的每標的輪詢間隔 (秒)
+    QUOTE_STREAM_MAX_SYMBOLS: int = 50  # 單個推送連接最多訂閱標的數
+    QUOTE_STREAM_HEARTBEAT: float = 15.0  # 無更新時的心跳間隔 (秒)
+    QUOTE_HEDGE_DELAY: float = 0.5  # 首選報價來源未返回時啟動備用來源的延遲 (秒)
+    QUOTE_SOURCE_TIMEOUT: float = 5.0  # 單個報價來源超時 (秒)
+    CIRCUIT_BREAKER_FAILURES: int = 5  # 連續失敗次數達到後熔斷該來源
+    CIRCUIT_BREAKER_COOLDOWN: float = 30.0  # 熔斷冷卻期 (秒)
     MAX_CONNECTIONS: int = 100
     REQUEST_TIMEOUT: int = 30
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0  # 空閒連接保持時間 (秒)
+    YFINANCE_WORKERS: int = 8  # yfinance 阻塞調用線程池大小
+    BULK_DOWNLOAD_CHUNK_SIZE: int = 50  # 批量歷史數據每組標的數
+    BULK_DOWNLOAD_CONCURRENCY: int = 4  # 同時進行的批量下載組數
+    OHLCV_STORE_ENABLED: bool = True  # 本地 OHLCV 存儲 (增量刷新)
+    OHLCV_STORE_DIR: str = "data/ohlcv"
+    HISTORY_LEAN_MODE: bool = False  # 歷史數據精簡模式: float32 價格、整數成交量、收益率列按需計算
+    HISTORY_CACHE_MAX_MB: int = 256  # 歷史數據及重採樣結果緩存上限
+    HISTORY_CACHE_TTL: int = 60  # 歷史數據緩存秒數
+    RESAMPLE_ENABLED: bool = True  # 由細週期本地合成粗週期K線，減少上游請求
+    INDICATOR_CACHE_MAX_MB: int = 256  # 技術指標結果緩存上限
+    INDICATOR_FRAME_DTYPE: str = "float64"  # 緩存指標精度: float64 / float32 (減半內存)
+    INCREMENTAL_MAX_STATES: int = 2000  # 增量指標引擎保留的 (標的, 週期) 狀態數，超出時淘汰最久未更新者
+    TECHNICAL_BACKEND: str = "auto"  # 指標後端: auto / talib / pandas_ta / numpy
+    ANALYSIS_WORKERS: int = 0  # 指標計算進程數，0 表示按 CPU 核心數自動選擇
+    ANALYSIS_MAX_PENDING: int = 32  # 進程池最大排隊任務數
+    ANALYSIS_TIMEOUT: int = 60  # 單個分析任務超時 (秒)
+    BATCH_ANALYSIS_MAX_SYMBOLS: int = 300  # 批量分析單次最多標的數
+    BATCH_ANALYSIS_CONCURRENCY: int = 8  # 批量分析同時處理的標的數
+    METRICS_ENABLED: bool = True  # 暴露 /metrics (Prometheus 文本格式)
+    LOOP_LAG_INTERVAL: float = 0.5  # 事件循環延遲採樣間隔 (秒)
+    BLOCKING_DETECTOR_ENABLED: bool = False  # 調試: 抓取阻塞事件循環的調用棧 (/debug/blocking-calls)
+    BLOCKING_THRESHOLD_MS: int = 100  # 事件循環停頓超過此值即記錄
+
+    # 🚦 上游速率限制 (令牌桶，經 REDIS_URL 在各 worker 間共享)
+    RATE_LIMIT_BACKEND: str = "redis"  # redis / memory
+    RATE_LIMIT_MAX_WAIT: float = 1.0  # 交互請求最長排隊秒數，超過即返回 retry-after
+    RATE_LIMIT_BACKGROUND_MAX_WAIT: float = 120.0  # 後台刷新最長排隊秒數
+    ALPHA_VANTAGE_CALLS_PER_MINUTE: int = 5
+    ALPHA_VANTAGE_CALLS_PER_DAY: int = 500
+    FINNHUB_CALLS_PER_MINUTE: int = 60
+    YAHOO_CALLS_PER_MINUTE: int = 120
 
     # 📈 數據源配置
     YAHOO_FINANCE_ENABLED: bool = True
@@ -88,6 +141,21 @@ class Settings(BaseSettings):
     PREMIUM_ANALYSIS_LIMIT: int = 1000
     PREMIUM_AI_CHAT_LIMIT: int = 500
 
+    # 🔑 客戶端限流 (按 X-API-Key，無 Key 時按 IP 計為 FREE；經 REDIS_URL 在各 worker 間共享)
+    CLIENT_RATE_LIMIT_ENABLED: bool = True
+    CLIENT_RATE_LIMIT_BACKEND: str = "redis"  # redis / memory
+    CLIENT_RATE_LIMIT_WINDOW: int = 3600  # 滑動窗口長度 (秒)
+    CLIENT_INFLIGHT_TTL: int = 300  # 並發計數過期時間，防止 worker 異常退出後名額無法釋放
+    CLIENT_RATE_LIMIT_EXEMPT_PATHS: List[str] = ["/", "/health", "/metrics", "/docs", "/redoc", "/openapi.json"]
+    # 來自這些地址 (IP 或 CIDR，"*" 表示全部) 的連接按 X-Forwarded-For / Forwarded 取客戶端 IP
+    CLIENT_TRUSTED_PROXIES: List[str] = ["127.0.0.1/32", "::1/128", "10.0.0.0/8", "172.16.0.0/12", "192.168.0.0/16"]
+    FREE_REQUESTS_PER_HOUR: int = 100
+    FREE_MAX_CONCURRENT: int = 10
+    PREMIUM_REQUESTS_PER_HOUR: int = 1000
+    PREMIUM_MAX_CONCURRENT: int = 50
+    PREMIUM_API_KEYS: List[str] = []  # 環境變量以 JSON 列表提供
+    ENTERPRISE_API_KEYS: List[str] = []  # 不受限流
+
     # 📊 支援的市場
     SUPPORTED_MARKETS: dict = {
         "US": {"flag": "🇺🇸", "timezone": "America/New_York", "currency": "USD"},
@@ -111,6 +179,7 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
         case_sensitive = True
+        extra = "ignore"
 
 @lru_cache()
 def get_settings() -> Settings:
@@ -118,11 +187,16 @@ def get_settings() -> Settings:
     return Settings()
 
 # 全局市場配置
+# lunch_break: 午休時段；pre_market / post_market: 盤前開始、盤後結束時間 (prepost 數據)
 MARKET_HOURS = {
-    "US": {"open": "09:30", "close": "16:00", "timezone": "America/New_York"},
-    "HK": {"open": "09:30", "close": "16:00", "timezone": "Asia/Hong_Kong"},
-    "CN": {"open": "09:30", "close": "15:00", "timezone": "Asia/Shanghai"},
-    "JP": {"open": "09:00", "close": "15:00", "timezone": "Asia/Tokyo"},
+    "US": {"open": "09:30", "close": "16:00", "timezone": "America/New_York",
+           "pre_market": "04:00", "post_market": "20:00"},
+    "HK": {"open": "09:30", "close": "16:00", "timezone": "Asia/Hong_Kong",
+           "lunch_break": ["12:00", "13:00"]},
+    "CN": {"open": "09:30", "close": "15:00", "timezone": "Asia/Shanghai",
+           "lunch_break": ["11:30", "13:00"]},
+    "JP": {"open": "09:00", "close": "15:00", "timezone": "Asia/Tokyo",
+           "lunch_break": ["11:30", "12:30"]},
     "UK": {"open": "08:00", "close": "16:30", "timezone": "Europe/London"}
 }
 
@@ -0,0 +1,113 @@
+# app/services/batch_analysis.py
+# 批量技術分析 - 多個標的並發獲取數據和計算 (受併發上限約束)，按完成順序逐個產出結果
+# 單個標的失敗只在該標的的結果中報告，不影響其他標的
+
+import math
+import time
+import asyncio
+from typing import Dict, List, Any, Optional, AsyncIterator
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from ..core.config import get_settings
+from ..utils.rate_limiter import RateLimitExceeded
+from .data_fetcher import data_fetcher
+from .technical_analyzer import technical_analyzer
+from .analysis_executor import analysis_executor, AnalysisQueueFullError, AnalysisTimeoutError
+
+
+def _jsonable(value: Any) -> Any:
+    """轉為可 JSON 序列化的值：序列取最後一個值，NaN/inf 轉為 None"""
+    if isinstance(value, pd.DataFrame):
+        return {str(k): _jsonable(v) for k, v in value.iloc[-1].items()} if len(value) else None
+    if isinstance(value, pd.Series):
+        return _jsonable(value.iloc[-1]) if len(value) else None
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value
+
+
+async def analyze_symbol(symbol: str, period: str = "1y", interval: str = "1d",
+                         indicators: Optional[List[str]] = None) -> Dict[str, Any]:
+    """單個標的的技術分析摘要 (最新指標值、信號、評分、建議)；錯誤以 status=error 返回"""
+    symbol = symbol.upper().strip()
+    started = time.perf_counter()
+    try:
+        data = await data_fetcher.get_historical_data(symbol, period, interval)
+        if data is None or data.empty:
+            return {"symbol": symbol, "status": "error", "error": "無法獲取歷史數據"}
+
+        results = await analysis_executor.calculate_all_indicators(data, indicators=indicators, tail=1)
+        if "error" in results:
+            return {"symbol": symbol, "status": "error", "error": results["error"]}
+
+        signals = results.pop("signals", [])
+        score = results.pop("technical_score", 50)
+        recommendation, confidence = technical_analyzer.get_recommendation(score, signals)
+
+        return {
+            "symbol": symbol,
+            "status": "success",
+            "current_price": _jsonable(data['Close'].iloc[-1]),
+            "last_bar": data.index[-1].isoformat(),
+            "technical_score": _jsonable(score),
+            "recommendation": recommendation,
+            "confidence": confidence,
+            "signals": _jsonable(signals),
+            "indicators": _jsonable(results),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+
+    except RateLimitExceeded as e:
+        return {"symbol": symbol, "status": "error", "error": str(e), "retry_after": e.retry_after}
+    except (AnalysisQueueFullError, AnalysisTimeoutError) as e:
+        return {"symbol": symbol, "status": "error", "error": str(e)}
+    except Exception as e:
+        logger.error(f"批量分析失敗 {symbol}: {e}")
+        return {"symbol": symbol, "status": "error", "error": str(e)}
+
+
+async def stream_batch_analysis(symbols: List[str], period: str = "1y", interval: str = "1d",
+                                indicators: Optional[List[str]] = None,
+                                concurrency: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """並發分析多個標的，按完成順序逐個產出結果，最後產出一條匯總
+
+    調用方停止迭代 (如客戶端斷開) 時取消尚未完成的任務。
+    """
+    symbols = list(dict.fromkeys(s.upper().strip() for s in symbols if s and s.strip()))
+    semaphore = asyncio.Semaphore(concurrency or get_settings().BATCH_ANALYSIS_CONCURRENCY)
+    started = time.perf_counter()
+
+    async def run(symbol: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await analyze_symbol(symbol, period, interval, indicators)
+
+    tasks = [asyncio.ensure_future(run(symbol)) for symbol in symbols]
+    succeeded = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            succeeded += result["status"] == "success"
+            yield result
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    logger.info(f"✅ 批量分析完成: {succeeded}/{len(symbols)} 成功")
+    yield {
+        "status": "done",
+        "total": len(symbols),
+        "succeeded": succeeded,
+        "failed": len(symbols) - succeeded,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
@@ -0,0 +1,246 @@
+# scripts/benchmark_technical.py
+# 技術分析引擎基準測試 - 合成 OHLCV (1k ~ 10M 根K線)
+# 用法: python scripts/benchmark_technical.py --sizes 1000 100000 --backends numpy talib
+#       python scripts/benchmark_technical.py --compare bench_old.json bench_new.json
+
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.technical_analyzer import TechnicalAnalyzer, DEFAULT_CONFIG
+from app.services.indicator_backends import available_backends
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+STAGES = ["trend", "momentum", "volatility", "volume", "support_resistance",
+          "signals", "end_to_end"]
+
+
+def generate_ohlcv(n_bars: int, freq: str = "1min", seed: int = 42,
+                   start: str = "2020-01-01 09:30") -> pd.DataFrame:
+    """生成可重現的合成 OHLCV (幾何隨機遊走，High/Low 包含 Open/Close)"""
+    rng = np.random.default_rng(seed)
+
+    log_returns = rng.normal(0.0, 0.001, n_bars)
+    close = 100.0 * np.exp(np.cumsum(log_returns))
+    open_ = np.empty(n_bars)
+    open_[0] = 100.0
+    open_[1:] = close[:-1]
+    open_ *= 1 + rng.normal(0.0, 0.0002, n_bars)
+
+    spread = np.abs(rng.normal(0.0, 0.0005, (2, n_bars)))
+    high = np.maximum(open_, close) * (1 + spread[0])
+    low = np.minimum(open_, close) * (1 - spread[1])
+    volume = rng.integers(1_000, 100_000, n_bars).astype(float)
+
+    index = pd.date_range(start=start, periods=n_bars, freq=freq)
+    return pd.DataFrame(
+        {"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+        index=index
+    )
+
+
+def _stage_functions(analyzer: TechnicalAnalyzer, data: pd.DataFrame, config: Dict,
+                     stages: List[str]) -> Dict[str, Callable[[], Any]]:
+    """各分類的計算入口 (與 calculate_all_indicators 內部調用一致)
+
+    signals 的輸入 (完整指標結果) 只在測量 signals 時預先計算，不計入計時。
+    """
+    close, high, low, volume = data['Close'], data['High'], data['Low'], data['Volume']
+    results = analyzer.calculate_all_indicators(data, config) if "signals" in stages else None
+
+    functions = {
+        "trend": lambda: analyzer._calculate_trend_indicators(close, high, low, config),
+        "momentum": lambda: analyzer._calculate_momentum_indicators(close, high, low, config),
+        "volatility": lambda: analyzer._calculate_volatility_indicators(close, high, low, config),
+        "volume": lambda: analyzer._calculate_volume_indicators(close, volume, config, high, low),
+        "support_resistance": lambda: analyzer._calculate_support_resistance(data, config),
+        "signals": lambda: (analyzer._generate_signals(results, close),
+                            analyzer._calculate_technical_score(results)),
+        "end_to_end": lambda: analyzer.calculate_all_indicators(data, config)
+    }
+    return {stage: functions[stage] for stage in stages}
+
+
+def _measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """計時 (不啟用 tracemalloc) 後單獨運行一次測量峰值內存"""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds_min": min(timings),
+        "seconds_median": statistics.median(timings),
+        "peak_mb": peak / 1024 / 1024,
+        "repeat": repeat
+    }
+
+
+def _default_repeat(n_bars: int) -> int:
+    """小數據多跑幾次以降低噪聲，大數據只跑一次"""
+    if n_bars <= 10_000:
+        return 7
+    if n_bars <= 100_000:
+        return 5
+    if n_bars <= 1_000_000:
+        return 3
+    return 1
+
+
+def run_benchmarks(sizes: List[int], backends: List[str], stages: List[str],
+                   repeat: Optional[int] = None, freq: str = "1min",
+                   seed: int = 42) -> List[Dict[str, Any]]:
+    """按 (K線數, 後端, 分類) 逐項測量"""
+    records = []
+    config = dict(DEFAULT_CONFIG)
+
+    for n_bars in sizes:
+        data = generate_ohlcv(n_bars, freq=freq, seed=seed)
+        for backend in backends:
+            analyzer = TechnicalAnalyzer(backend=backend)
+            functions = _stage_functions(analyzer, data, config, stages)
+
+            for stage in stages:
+                result = _measure(functions[stage], repeat or _default_repeat(n_bars))
+                record = {"size": n_bars, "backend": analyzer.backend.name, "stage": stage}
+                record.update(result)
+                record["bars_per_second"] = n_bars / result["seconds_min"] if result["seconds_min"] else None
+                records.append(record)
+
+                print(f"{n_bars:>11,} {analyzer.backend.name:<10} {stage:<20} "
+                      f"{result['seconds_min'] * 1000:>11.2f} ms {result['peak_mb']:>10.1f} MB")
+
+            del functions, analyzer
+        del data
+        gc.collect()
+
+    return records
+
+
+def _environment() -> Dict[str, Any]:
+    """記錄運行環境，便於跨提交對比時確認條件一致"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "backends_available": available_backends()
+    }
+
+
+def compare_results(baseline_path: str, current_path: str, threshold: float = 0.10) -> List[Dict[str, Any]]:
+    """對比兩份結果：返回每項耗時比例，超過閾值的變慢項目標記為 regression"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(current_path) as f:
+        current = json.load(f)
+
+    def index(report):
+        return {(r["size"], r["backend"], r["stage"]): r for r in report["results"]}
+
+    old, new = index(baseline), index(current)
+    rows = []
+    for key in sorted(old.keys() & new.keys()):
+        ratio = new[key]["seconds_min"] / old[key]["seconds_min"] if old[key]["seconds_min"] else None
+        rows.append({
+            "size": key[0],
+            "backend": key[1],
+            "stage": key[2],
+            "baseline_seconds": old[key]["seconds_min"],
+            "current_seconds": new[key]["seconds_min"],
+            "ratio": ratio,
+            "baseline_peak_mb": old[key]["peak_mb"],
+            "current_peak_mb": new[key]["peak_mb"],
+            "regression": ratio is not None and ratio > 1 + threshold
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="TechnicalAnalyzer 基準測試")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="K線數量 (默認 1k ~ 10M)")
+    parser.add_argument("--backends", nargs="+", default=None,
+                        help="指標後端 (默認所有可用後端)")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--repeat", type=int, default=None, help="每項重複次數 (默認按數據量自動選擇)")
+    parser.add_argument("--freq", default="1min", help="合成數據的K線週期")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_results.json", help="JSON 結果輸出路徑")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="對比兩份 JSON 結果而不運行測試")
+    parser.add_argument("--threshold", type=float, default=0.10, help="判定變慢的比例閾值")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        rows = compare_results(args.compare[0], args.compare[1], args.threshold)
+        for row in rows:
+            flag = "⚠️ " if row["regression"] else "   "
+            print(f"{flag}{row['size']:>11,} {row['backend']:<10} {row['stage']:<20} "
+                  f"{row['baseline_seconds'] * 1000:>11.2f} ms -> {row['current_seconds'] * 1000:>11.2f} ms "
+                  f"(x{row['ratio']:.2f})")
+        return 1 if any(row["regression"] for row in rows) else 0
+
+    # 基準測試期間關閉分析引擎的逐次 info 日誌
+    logger.disable("app")
+
+    backends = args.backends or [name for name, ok in available_backends().items() if ok]
+    records = run_benchmarks(args.sizes, backends, args.stages, args.repeat, args.freq, args.seed)
+
+    report = {
+        "environment": _environment(),
+        "parameters": {
+            "sizes": args.sizes,
+            "backends": backends,
+            "stages": args.stages,
+            "freq": args.freq,
+            "seed": args.seed,
+            "config": DEFAULT_CONFIG
+        },
+        "results": records
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"✅ 結果已保存: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
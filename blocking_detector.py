@@ -0,0 +1,158 @@
+# app/utils/blocking_detector.py
+# 事件循環阻塞檢測 (調試用，默認關閉) - 看門狗線程在事件循環停頓超過閾值時抓取其調用棧，
+# 按調用點匯總次數與停頓時長，用於找出 async 路徑中的同步 IO / 重計算
+
+import os
+import sys
+import time
+import asyncio
+import sysconfig
+import threading
+import traceback
+from typing import Dict, Any, Optional
+
+from loguru import logger
+
+from ..core.config import get_settings
+
+# 標準庫與第三方庫目錄：調用點取棧中最深的非庫代碼幀 (即項目中發起阻塞調用的位置)
+_LIBRARY_ROOTS = tuple({sysconfig.get_paths()[name] for name in ("stdlib", "platstdlib", "purelib", "platlib")})
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class BlockingCallDetector:
+    """事件循環心跳 + 看門狗線程
+
+    心跳協程每 threshold/2 秒更新一次時間戳；看門狗線程發現心跳超過閾值未更新時，
+    經 sys._current_frames() 抓取事件循環線程當前的調用棧 (即正在阻塞循環的回調)。
+    心跳恢復後以實際停頓時長記入該調用點。
+    """
+
+    def __init__(self, threshold: float = 0.1, max_sites: int = 200, stack_depth: int = 25):
+        self.threshold = threshold
+        self.max_sites = max_sites
+        self.stack_depth = stack_depth
+
+        self._sites: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._beat = 0.0
+        self._captured: Optional[Dict[str, Any]] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self.counters = {"stalls": 0, "uncaptured": 0, "dropped": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """在當前事件循環中啟動檢測 (應用啟動時調用)"""
+        if self.running:
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.ensure_future(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="blocking-detector", daemon=True)
+        self._watchdog.start()
+        logger.info(f"✅ 事件循環阻塞檢測已啟動 (閾值 {self.threshold * 1000:.0f}ms)")
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _heartbeat(self):
+        interval = self.threshold / 2
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            with self._lock:
+                stall = now - self._beat - interval
+                self._beat = now
+                captured, self._captured = self._captured, None
+
+            if stall < self.threshold:
+                continue
+            self.counters["stalls"] += 1
+            if captured is None:
+                # 停頓結束前看門狗未來得及抓棧 (停頓僅略超閾值)
+                self.counters["uncaptured"] += 1
+            else:
+                self._record(captured, stall)
+
+    def _watch(self):
+        """看門狗線程：心跳超時且本次停頓尚未抓棧時抓取事件循環線程的調用棧"""
+        poll = self.threshold / 4
+        while not self._stopping.wait(poll):
+            with self._lock:
+                stalled = time.monotonic() - self._beat > self.threshold / 2 + self.threshold
+                if not stalled or self._captured is not None:
+                    continue
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is not None:
+                    self._captured = self._capture(frame)
+
+    def _capture(self, frame) -> Dict[str, Any]:
+        stack = traceback.extract_stack(frame)[-self.stack_depth:]
+        site = next((f for f in reversed(stack)
+                     if not f.filename.startswith(_LIBRARY_ROOTS) and f.filename != __file__), stack[-1])
+        filename = site.filename
+        if filename.startswith(_PROJECT_ROOT):
+            filename = os.path.relpath(filename, _PROJECT_ROOT)
+        innermost = stack[-1]
+        return {
+            "site": f"{filename}:{site.lineno} in {site.name}",
+            "blocked_in": f"{innermost.filename}:{innermost.lineno} in {innermost.name}",
+            "stack": traceback.format_list(stack)
+        }
+
+    def _record(self, captured: Dict[str, Any], stall: float):
+        key = captured["site"]
+        entry = self._sites.get(key)
+        if entry is None:
+            if len(self._sites) >= self.max_sites:
+                self.counters["dropped"] += 1
+                return
+            entry = self._sites[key] = {
+                "site": key, "count": 0, "total_seconds": 0.0, "max_seconds": 0.0
+            }
+            logger.warning(f"⚠️ 事件循環阻塞 {stall * 1000:.0f}ms @ {key}\n{''.join(captured['stack'])}")
+        else:
+            logger.debug(f"事件循環阻塞 {stall * 1000:.0f}ms @ {key}")
+
+        entry["count"] += 1
+        entry["total_seconds"] += stall
+        entry["max_seconds"] = max(entry["max_seconds"], stall)
+        entry["last_seen"] = time.time()
+        entry["blocked_in"] = captured["blocked_in"]
+        entry["stack"] = captured["stack"]
+
+    def report(self, limit: int = 20, include_stack: bool = True) -> Dict[str, Any]:
+        """按累計停頓時長排序的阻塞調用點"""
+        sites = sorted(self._sites.values(), key=lambda e: e["total_seconds"], reverse=True)[:limit]
+        return {
+            "enabled": self.running,
+            "threshold_ms": self.threshold * 1000,
+            **self.counters,
+            "sites": [
+                dict(entry, stack="".join(entry["stack"])) if include_stack
+                else {k: v for k, v in entry.items() if k != "stack"}
+                for entry in sites
+            ]
+        }
+
+    def reset(self):
+        self._sites.clear()
+        self.counters = {"stalls": 0, "uncaptured": 0, "dropped": 0}
+
+
+# 全局阻塞檢測實例 (BLOCKING_DETECTOR_ENABLED 時於應用啟動時啟動)
+blocking_detector = BlockingCallDetector(threshold=get_settings().BLOCKING_THRESHOLD_MS / 1000)
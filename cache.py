@@ -0,0 +1,264 @@
+# app/utils/cache.py
+# 緩存工具 - 按近似字節大小限制的 LRU/TTL 緩存，及進程內 (L1) + Redis (L2) 兩級緩存
+
+import sys
+import json
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+try:
+    import redis.asyncio as aioredis
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+
+
+def approximate_size(value: Any, _seen_indexes: Optional[set] = None) -> int:
+    """估算對象佔用的字節數 (共享的 pandas 索引只計算一次)"""
+    if _seen_indexes is None:
+        _seen_indexes = set()
+
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        size = int(np.asarray(value.memory_usage(index=False, deep=False)).sum())
+        if id(value.index) not in _seen_indexes:
+            _seen_indexes.add(id(value.index))
+            size += int(value.index.memory_usage(deep=False))
+        return size
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(getattr(value, "nbytes", None), int):
+        # 自行報告大小的容器 (如 IndicatorFrame)
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            approximate_size(k, _seen_indexes) + approximate_size(v, _seen_indexes)
+            for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(approximate_size(v, _seen_indexes) for v in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """按字節大小限制的 LRU 緩存，支援 TTL 過期及命中統計"""
+
+    def __init__(self, max_bytes: int, ttl: Optional[float] = None,
+                 sizeof: Callable[[Any], int] = approximate_size):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """讀取緩存；過期或不存在時計為未命中"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> bool:
+        """寫入緩存；單個條目超過容量上限時不緩存"""
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return False
+
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, size, expires_at)
+            self.current_bytes += size
+
+            # 按最近最少使用順序淘汰，直至低於字節上限
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+        return True
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def stats(self) -> Dict[str, Any]:
+        """緩存統計"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / total if total else 0.0
+        }
+
+
+class TieredCache:
+    """L1 進程內 LRU + L2 Redis 共享緩存，支援 stale-while-revalidate
+
+    每個條目有兩個期限：fresh_until 之前直接返回；fresh_until 至 stale_until 之間
+    返回舊值並在後台刷新 (同一鍵只刷新一次)；stale_until 之後視為未命中。
+    L2 的值以 JSON 存儲，只適用於可 JSON 序列化的結果；Redis 不可用時只使用 L1。
+    """
+
+    def __init__(self, max_bytes: int, ttl: float, redis_url: Optional[str] = None,
+                 prefix: str = "cache"):
+        self.ttl = ttl
+        self.prefix = prefix
+        # L1 條目: (值, fresh_until, stale_until)，LRU 自身的 TTL 設為 stale 期限
+        self.l1 = LRUCache(max_bytes=max_bytes, sizeof=lambda entry: approximate_size(entry[0]))
+        self.l2 = aioredis.from_url(redis_url) if (redis_url and HAS_REDIS) else None
+        self._l2_retry_at = 0.0
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self.counters = {"l2_hits": 0, "l2_misses": 0, "stale_served": 0,
+                         "refreshes": 0, "refresh_errors": 0}
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]],
+                          ttl: Optional[float] = None, stale_ttl: float = 0,
+                          cacheable: Callable[[Any], bool] = lambda value: value is not None,
+                          refresh: Optional[Callable[[], Awaitable[Any]]] = None) -> Any:
+        """讀取緩存，未命中時調用 loader 並寫入
+
+        ttl: 新鮮期 (秒)，缺省為實例 ttl；stale_ttl: 過期後仍可返回舊值的時長。
+        cacheable: 判斷結果是否寫入緩存 (如錯誤結果不緩存)。
+        refresh: 後台刷新使用的加載函數，缺省與 loader 相同。
+        """
+        ttl = self.ttl if ttl is None else ttl
+        entry = await self._lookup(key)
+        now = time.time()
+
+        if entry is not None:
+            value, fresh_until, stale_until = entry
+            if now < fresh_until:
+                return value
+            if now < stale_until:
+                self.counters["stale_served"] += 1
+                self._schedule_refresh(key, refresh or loader, ttl, stale_ttl, cacheable)
+                return value
+
+        value = await loader()
+        if cacheable(value):
+            await self.set(key, value, ttl, stale_ttl)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None, stale_ttl: float = 0):
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        entry = (value, now + ttl, now + ttl + stale_ttl)
+        self.l1.set(key, entry, ttl=ttl + stale_ttl)
+
+        if self.l2 is not None:
+            payload = json.dumps({"v": value, "f": entry[1], "s": entry[2]}, default=str)
+            await self._l2_call(self.l2.set, self._l2_key(key), payload,
+                                ex=max(1, int(ttl + stale_ttl)))
+
+    async def delete(self, key: str):
+        self.l1.delete(key)
+        if self.l2 is not None:
+            await self._l2_call(self.l2.delete, self._l2_key(key))
+
+    async def _lookup(self, key: str) -> Optional[tuple]:
+        entry = self.l1.get(key)
+        if entry is not None or self.l2 is None:
+            return entry
+
+        payload = await self._l2_call(self.l2.get, self._l2_key(key))
+        if payload is None:
+            self.counters["l2_misses"] += 1
+            return None
+
+        self.counters["l2_hits"] += 1
+        data = json.loads(payload)
+        entry = (data["v"], data["f"], data["s"])
+        remaining = entry[2] - time.time()
+        if remaining > 0:
+            self.l1.set(key, entry, ttl=remaining)
+        return entry
+
+    def _schedule_refresh(self, key: str, loader: Callable[[], Awaitable[Any]],
+                          ttl: float, stale_ttl: float, cacheable: Callable[[Any], bool]):
+        if key in self._refreshing:
+            return
+
+        async def run():
+            try:
+                value = await loader()
+                if cacheable(value):
+                    await self.set(key, value, ttl, stale_ttl)
+                self.counters["refreshes"] += 1
+            except Exception as e:
+                self.counters["refresh_errors"] += 1
+                logger.warning(f"緩存後台刷新失敗 {key}: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.ensure_future(run())
+
+    async def _l2_call(self, method: Callable, *args, **kwargs) -> Any:
+        """Redis 故障時降級為僅 L1，30 秒後再重試連接"""
+        if time.monotonic() < self._l2_retry_at:
+            return None
+        try:
+            result = await method(*args, **kwargs)
+        except Exception as e:
+            if not self._l2_retry_at:
+                logger.warning(f"L2 緩存 (Redis) 不可用，僅使用進程內緩存: {e}")
+            self._l2_retry_at = time.monotonic() + 30
+            return None
+
+        if self._l2_retry_at:
+            logger.info("L2 緩存 (Redis) 已恢復")
+            self._l2_retry_at = 0.0
+        return result
+
+    def _l2_key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def stats(self) -> Dict[str, Any]:
+        """兩級緩存統計"""
+        return dict(self.counters, l1=self.l1.stats(), l2_enabled=self.l2 is not None,
+                    refreshing=len(self._refreshing))
@@ -0,0 +1,72 @@
+# app/utils/circuit_breaker.py
+# 熔斷器 - 上游來源連續失敗後在冷卻期內停止調用，冷卻結束放行一次試探請求
+
+import time
+from typing import Dict, Any, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """連續失敗計數熔斷器 (單進程內，協程間共享)
+
+    closed: 正常調用；連續失敗 failure_threshold 次後轉為 open。
+    open: 冷卻期內拒絕調用；冷卻結束後轉為 half_open。
+    half_open: 只放行一個試探請求，成功則恢復 closed，失敗則重新 open。
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self.counters = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def allow(self) -> bool:
+        """是否允許調用 (half_open 時只放行一個試探請求)"""
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.cooldown:
+                self.counters["rejected"] += 1
+                return False
+            self.state = HALF_OPEN
+            self._probing = False
+
+        if self.state == HALF_OPEN:
+            if self._probing:
+                self.counters["rejected"] += 1
+                return False
+            self._probing = True
+        return True
+
+    def record_success(self):
+        self.counters["successes"] += 1
+        self.failures = 0
+        self.state = CLOSED
+        self._probing = False
+
+    def record_failure(self):
+        self.counters["failures"] += 1
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.counters["opened"] += 1
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """放行的調用未產生結果 (如被取消) 時歸還試探名額"""
+        if self.state == HALF_OPEN:
+            self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+        return dict(self.counters, state=self.state, consecutive_failures=self.failures,
+                    retry_in=retry_in)
@@ -0,0 +1,390 @@
+# app/utils/client_rate_limiter.py
+# 客戶端限流 - 按 API Key (無 Key 時按 IP) 的分級滑動窗口請求數限制 + 並發請求上限
+# FREE: 100 次/小時、10 並發；PREMIUM: 1000 次/小時、50 並發；ENTERPRISE: 不限制
+# 計數經 Redis 在各 worker 間共享 (每請求一次 Lua 調用 + 結束時一次 DECR)，Redis 不可用時退回進程內計數
+
+import math
+import time
+import hashlib
+import ipaddress
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from loguru import logger
+
+from ..core.config import get_settings
+from .metrics import metrics
+from .serialization import dumps
+
+try:
+    import redis.asyncio as aioredis
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+
+TIER_FREE = "FREE"
+TIER_PREMIUM = "PREMIUM"
+TIER_ENTERPRISE = "ENTERPRISE"
+
+# 准入結果
+ALLOWED = 1
+RATE_LIMITED = 0
+TOO_MANY_CONCURRENT = -1
+
+API_RATE_LIMITED = metrics.counter(
+    "api_rate_limited_total", "被客戶端限流拒絕的請求數", ("tier", "reason"))
+
+
+@dataclass
+class TierLimit:
+    requests: int  # 每窗口請求數
+    concurrent: int  # 同時進行的請求數
+
+
+def tier_limits() -> Dict[str, TierLimit]:
+    settings = get_settings()
+    return {
+        TIER_FREE: TierLimit(settings.FREE_REQUESTS_PER_HOUR, settings.FREE_MAX_CONCURRENT),
+        TIER_PREMIUM: TierLimit(settings.PREMIUM_REQUESTS_PER_HOUR, settings.PREMIUM_MAX_CONCURRENT)
+    }
+
+
+def sliding_count(previous: int, current: int, elapsed: float, window: float) -> float:
+    """滑動窗口計數近似：上一固定窗口按未過去的比例加權 + 當前窗口計數"""
+    return previous * (1 - elapsed / window) + current
+
+
+def retry_after(previous: int, current: int, limit: int, elapsed: float, window: float) -> float:
+    """再發一個請求不超限所需等待的秒數"""
+    if current < limit:
+        if previous <= 0:
+            return 0.0
+        # previous * (1 - x / window) + current + 1 <= limit
+        x = window * (1 - (limit - 1 - current) / previous)
+        return max(0.0, x - elapsed)
+    # 當前窗口已滿：等到下一窗口，且當前計數作為上一窗口衰減到可用
+    y = window * (1 - (limit - 1) / current) if current else 0.0
+    return (window - elapsed) + max(0.0, y)
+
+
+def forwarded_chain(headers: Dict[bytes, bytes]) -> List[str]:
+    """代理轉發鏈上的地址 (由客戶端到最近一跳)：優先 X-Forwarded-For，其次 RFC 7239 Forwarded"""
+    value = headers.get(b"x-forwarded-for")
+    if value:
+        return [part.strip() for part in value.decode("latin-1").split(",") if part.strip()]
+
+    chain = []
+    value = headers.get(b"forwarded")
+    if value:
+        for element in value.decode("latin-1").split(","):
+            for pair in element.split(";"):
+                name, _, addr = pair.strip().partition("=")
+                if name.lower() == "for" and addr:
+                    chain.append(_strip_port(addr.strip().strip('"')))
+    return chain
+
+
+def _strip_port(addr: str) -> str:
+    """去掉地址中的端口 (支援 [IPv6]:端口 與 IPv4:端口 形式)"""
+    if addr.startswith("["):
+        return addr[1:addr.find("]")] if "]" in addr else addr[1:]
+    if addr.count(":") == 1:
+        return addr.split(":")[0]
+    return addr
+
+
+@dataclass
+class Admission:
+    status: int
+    limit: int = 0
+    remaining: int = 0
+    retry_after: float = 0.0
+    release_key: Optional[str] = None
+    backend: Any = None
+
+
+class MemoryClientBackend:
+    """進程內計數 (單 worker 或 Redis 不可用時)"""
+
+    def __init__(self):
+        # 客戶端 -> [窗口序號, 上一窗口計數, 當前窗口計數]
+        self._windows: Dict[str, list] = {}
+        self._inflight: Dict[str, int] = {}
+        self._admits = 0
+
+    async def admit(self, client: str, limit: TierLimit, window: int,
+                    now: float) -> Tuple[int, int, int]:
+        """返回 (准入結果, 上一窗口計數, 當前窗口計數)；准入時計數並佔用一個並發名額"""
+        index = int(now // window)
+        state = self._windows.get(client)
+        if state is None or state[0] < index - 1:
+            state = self._windows[client] = [index, 0, 0]
+        elif state[0] == index - 1:
+            state[:] = [index, state[2], 0]
+
+        self._admits += 1
+        if self._admits % 10000 == 0:
+            self._prune(index)
+
+        elapsed = now - index * window
+        if sliding_count(state[1], state[2], elapsed, window) + 1 > limit.requests:
+            return RATE_LIMITED, state[1], state[2]
+        if self._inflight.get(client, 0) >= limit.concurrent:
+            return TOO_MANY_CONCURRENT, state[1], state[2]
+
+        state[2] += 1
+        self._inflight[client] = self._inflight.get(client, 0) + 1
+        return ALLOWED, state[1], state[2]
+
+    async def release(self, client: str):
+        remaining = self._inflight.get(client, 0) - 1
+        if remaining > 0:
+            self._inflight[client] = remaining
+        else:
+            self._inflight.pop(client, None)
+
+    def _prune(self, index: int):
+        """清理兩個窗口以上未出現的客戶端"""
+        stale = [c for c, s in self._windows.items() if s[0] < index - 1 and c not in self._inflight]
+        for client in stale:
+            del self._windows[client]
+
+
+# 原子地檢查滑動窗口與並發數，准入時當前窗口計數 +1、並發數 +1
+_ADMIT_SCRIPT = """
+local previous = tonumber(redis.call('GET', KEYS[1]) or '0')
+local current = tonumber(redis.call('GET', KEYS[2]) or '0')
+local inflight = tonumber(redis.call('GET', KEYS[3]) or '0')
+local limit = tonumber(ARGV[1])
+local concurrent = tonumber(ARGV[2])
+local weight = tonumber(ARGV[3])
+if previous * weight + current + 1 > limit then
+    return {0, previous, current}
+end
+if inflight >= concurrent then
+    return {-1, previous, current}
+end
+current = redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+redis.call('INCR', KEYS[3])
+redis.call('EXPIRE', KEYS[3], ARGV[5])
+return {1, previous, current}
+"""
+
+# 釋放並發名額 (計數鍵過期後不會減為負數)
+_RELEASE_SCRIPT = """
+if redis.call('DECR', KEYS[1]) <= 0 then
+    redis.call('DEL', KEYS[1])
+end
+"""
+
+
+class RedisClientBackend:
+    """Redis 計數 (所有 worker 共享)
+
+    並發計數鍵帶過期時間，worker 異常退出未釋放的名額最多保留 CLIENT_INFLIGHT_TTL 秒。
+    """
+
+    def __init__(self, url: str, prefix: str = "apilimit", inflight_ttl: int = 300,
+                 socket_timeout: float = 0.5):
+        self.client = aioredis.from_url(url, socket_connect_timeout=socket_timeout,
+                                        socket_timeout=socket_timeout)
+        self.prefix = prefix
+        self.inflight_ttl = inflight_ttl
+        self._script = self.client.register_script(_ADMIT_SCRIPT)
+        self._release = self.client.register_script(_RELEASE_SCRIPT)
+
+    async def admit(self, client: str, limit: TierLimit, window: int,
+                    now: float) -> Tuple[int, int, int]:
+        index = int(now // window)
+        keys = [f"{self.prefix}:{client}:{index - 1}", f"{self.prefix}:{client}:{index}",
+                f"{self.prefix}:{client}:inflight"]
+        weight = 1 - (now - index * window) / window
+        status, previous, current = await self._script(
+            keys=keys, args=[limit.requests, limit.concurrent, weight, window * 2, self.inflight_ttl]
+        )
+        return int(status), int(previous), int(current)
+
+    async def release(self, client: str):
+        await self._release(keys=[f"{self.prefix}:{client}:inflight"])
+
+
+class ClientRateLimiter:
+    """按客戶端分級的請求數 + 並發數限制"""
+
+    def __init__(self, backend=None, window: Optional[int] = None):
+        settings = get_settings()
+        self.window = window or settings.CLIENT_RATE_LIMIT_WINDOW
+        self.limits = tier_limits()
+        self.premium_keys = set(settings.PREMIUM_API_KEYS)
+        self.enterprise_keys = set(settings.ENTERPRISE_API_KEYS)
+        self.backend = backend or self._default_backend(settings)
+        self._fallback = MemoryClientBackend()
+        self.retry_interval = settings.REDIS_RETRY_INTERVAL
+        self._retry_at = 0.0
+
+    @staticmethod
+    def _default_backend(settings):
+        if settings.CLIENT_RATE_LIMIT_BACKEND == "redis" and HAS_REDIS:
+            return RedisClientBackend(settings.REDIS_URL, inflight_ttl=settings.CLIENT_INFLIGHT_TTL,
+                                      socket_timeout=settings.REDIS_SOCKET_TIMEOUT)
+        return MemoryClientBackend()
+
+    def identify(self, api_key: Optional[str], client_host: Optional[str]) -> Tuple[str, str]:
+        """返回 (客戶端標識, 等級)；API Key 以哈希存儲，無 Key 時按 IP 計為 FREE"""
+        if api_key:
+            tier = (TIER_ENTERPRISE if api_key in self.enterprise_keys
+                    else TIER_PREMIUM if api_key in self.premium_keys else TIER_FREE)
+            return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:24], tier
+        return f"ip:{client_host or 'unknown'}", TIER_FREE
+
+    async def admit(self, client: str, tier: str, now: Optional[float] = None) -> Admission:
+        limit = self.limits.get(tier)
+        if limit is None:
+            return Admission(ALLOWED)
+
+        now = time.time() if now is None else now
+        backend = self.backend
+        result = await self._backend_admit(client, limit, now)
+        if result is None:
+            backend = self._fallback
+            result = await backend.admit(client, limit, self.window, now)
+        status, previous, current = result
+
+        elapsed = now - int(now // self.window) * self.window
+        used = sliding_count(previous, current, elapsed, self.window)
+        admission = Admission(status, limit=limit.requests,
+                              remaining=max(0, math.floor(limit.requests - used)))
+        if status == ALLOWED:
+            admission.release_key, admission.backend = client, backend
+        elif status == RATE_LIMITED:
+            admission.retry_after = retry_after(previous, current, limit.requests, elapsed, self.window)
+            API_RATE_LIMITED.inc(tier=tier, reason="rate")
+        else:
+            # 並發已滿：稍後重試即可
+            admission.retry_after = 1.0
+            API_RATE_LIMITED.inc(tier=tier, reason="concurrency")
+        return admission
+
+    async def _backend_admit(self, client: str, limit: TierLimit,
+                             now: float) -> Optional[Tuple[int, int, int]]:
+        """Redis 故障時返回 None 改用進程內計數，REDIS_RETRY_INTERVAL 秒後再重試連接"""
+        if time.monotonic() < self._retry_at:
+            return None
+        try:
+            result = await self.backend.admit(client, limit, self.window, now)
+        except Exception as e:
+            if not self._retry_at:
+                logger.warning(f"Redis 客戶端限流不可用，使用進程內計數: {e}")
+            self._retry_at = time.monotonic() + self.retry_interval
+            return None
+
+        if self._retry_at:
+            logger.info("Redis 客戶端限流已恢復")
+            self._retry_at = 0.0
+        return result
+
+    async def release(self, admission: Admission):
+        if admission.release_key is None:
+            return
+        try:
+            await admission.backend.release(admission.release_key)
+        except Exception as e:
+            logger.warning(f"釋放並發名額失敗: {e}")
+
+
+class ClientRateLimitMiddleware:
+    """ASGI 中間件：超出請求數或並發數時返回 429 (Retry-After)，正常響應附帶 X-RateLimit-* 頭
+
+    並發名額保持到響應體發送完畢 (含流式響應)。WebSocket 與 CLIENT_RATE_LIMIT_EXEMPT_PATHS 不受限制。
+    無 API Key 的請求按客戶端 IP 計數：連接來自 CLIENT_TRUSTED_PROXIES 時，從轉發鏈右側
+    跳過可信代理取第一個地址，否則使用連接對端地址 (轉發頭可被客戶端偽造)。
+    """
+
+    def __init__(self, app, limiter: Optional["ClientRateLimiter"] = None):
+        self.app = app
+        self.limiter = limiter
+        settings = get_settings()
+        self.enabled = settings.CLIENT_RATE_LIMIT_ENABLED
+        self.exempt = set(settings.CLIENT_RATE_LIMIT_EXEMPT_PATHS)
+        self.trust_all = "*" in settings.CLIENT_TRUSTED_PROXIES
+        self.trusted = [ipaddress.ip_network(p, strict=False)
+                        for p in settings.CLIENT_TRUSTED_PROXIES if p != "*"]
+
+    def _trusted(self, addr: str) -> bool:
+        if self.trust_all:
+            return True
+        try:
+            ip = ipaddress.ip_address(addr)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted)
+
+    def client_host(self, scope, headers: Dict[bytes, bytes]) -> Optional[str]:
+        """請求的客戶端 IP"""
+        peer = (scope.get("client") or (None,))[0]
+        if peer is None or not self._trusted(peer):
+            return peer
+        chain = forwarded_chain(headers)
+        for addr in reversed(chain):
+            if not self._trusted(addr):
+                return addr
+        return chain[0] if chain else peer
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or scope["path"] in self.exempt:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiter or client_rate_limiter
+        headers = dict(scope.get("headers") or [])
+        api_key = headers.get(b"x-api-key", b"").decode("latin-1").strip() or None
+        client, tier = limiter.identify(api_key, self.client_host(scope, headers))
+        admission = await limiter.admit(client, tier)
+
+        if admission.status != ALLOWED:
+            await self._reject(send, admission, tier, limiter.window)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and admission.limit:
+                message["headers"] = list(message.get("headers") or []) + [
+                    (b"x-ratelimit-limit", str(admission.limit).encode()),
+                    (b"x-ratelimit-remaining", str(admission.remaining).encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            await limiter.release(admission)
+
+    @staticmethod
+    async def _reject(send, admission: Admission, tier: str, window: int):
+        seconds = max(1, math.ceil(admission.retry_after))
+        if admission.status == RATE_LIMITED:
+            code, message = "RATE_LIMITED", f"{tier} 等級請求次數已達上限 ({admission.limit} 次 / {window} 秒)"
+        else:
+            code, message = "TOO_MANY_CONCURRENT_REQUESTS", f"{tier} 等級同時進行的請求數已達上限"
+        body = dumps({
+            "status": "error",
+            "error": {"code": code, "message": message, "retry_after": seconds},
+            "timestamp": datetime.utcnow().isoformat() + "Z"
+        })
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(seconds).encode()),
+                (b"x-ratelimit-limit", str(admission.limit).encode()),
+                (b"x-ratelimit-remaining", str(admission.remaining).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# 全局客戶端限流器實例
+client_rate_limiter = ClientRateLimiter()
@@ -3,17 +3,81 @@
 # 專業工程師審查：✅ 錯誤處理完善，API限制管理
 
 import asyncio
+import inspect
 import yfinance as yf
-import requests
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Any
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from typing import Dict, List, Optional, Tuple, Any, Callable
 from loguru import logger
-import time
-from functools import wraps
-
-from ..core.config import get_settings
+from functools import wraps, partial
+from concurrent.futures import ThreadPoolExecutor
+
+from ..core.config import get_settings, MARKET_HOURS
+from ..utils.http_client import get_json
+from ..utils.cache import LRUCache, TieredCache
+from ..utils.circuit_breaker import CircuitBreaker
+from ..utils.single_flight import SingleFlight
+from ..utils.metrics import track_upstream
+from ..utils.rate_limiter import rate_limiter, RateLimitExceeded, priority_scope, PRIORITY_BACKGROUND
+from .ohlcv_store import OHLCVStore
+from .resampler import resample_ohlcv, can_resample, INTRADAY_MINUTES
+
+# period 對應的日曆跨度；1d/5d 按交易日計算，不經本地存儲
+PERIOD_OFFSETS = {
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10)
+}
+
+# period 的最長日曆天數 (max 不限)
+PERIOD_DAYS = {
+    "1d": 1, "5d": 5, "1mo": 31, "3mo": 92, "6mo": 184, "ytd": 366,
+    "1y": 366, "2y": 731, "5y": 1827, "10y": 3653
+}
+
+# yfinance 日內週期可取的最長天數
+INTERVAL_MAX_DAYS = {
+    "1m": 7, "2m": 60, "5m": 60, "15m": 60, "30m": 60, "90m": 60, "60m": 730, "1h": 730
+}
+
+# 本地重採樣的基礎週期 (由細到粗)
+RESAMPLE_BASE_INTERVALS = ("5m", "1h", "1d")
+
+# 按需計算的衍生列 (精簡模式下不預先生成)
+DERIVED_COLUMNS = {
+    "Returns": lambda data: data['Close'].pct_change(),
+    "Log_Returns": lambda data: np.log(data['Close'] / data['Close'].shift(1))
+}
+
+
+def ensure_derived_columns(data: pd.DataFrame, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """原地添加衍生列 (缺省為全部)，已存在的列不重算"""
+    for name in columns or DERIVED_COLUMNS:
+        if name not in data.columns:
+            data[name] = DERIVED_COLUMNS[name](data)
+    return data
+
+
+def _volume_dtype(volume: pd.Series) -> np.dtype:
+    """能容納成交量的最小無符號整數類型"""
+    if len(volume) == 0 or volume.max() < np.iinfo(np.uint32).max:
+        return np.dtype(np.uint32)
+    return np.dtype(np.uint64)
+
+
+def _share(result: Any) -> Any:
+    """合併請求的跟隨者拿到獨立副本，避免調用方修改共享結果"""
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return result.copy()
+    if isinstance(result, dict):
+        return dict(result)
+    return result
 
 class DataFetcher:
     """全球金融數據獲取器"""
@@ -22,48 +86,267 @@ class DataFetcher:
         self.settings = get_settings()
         self.alpha_vantage_key = self.settings.ALPHA_VANTAGE_KEY
         self.finnhub_key = self.settings.FINNHUB_KEY
-        self.last_alpha_vantage_call = 0
-        self.last_finnhub_call = 0
-        self.alpha_vantage_calls_today = 0
-        self.alpha_vantage_calls_minute = 0
-        self.last_minute_reset = time.time()
 
         # API端點
         self.alpha_vantage_base = "https://www.alphavantage.co/query"
         self.finnhub_base = "https://finnhub.io/api/v1"
 
-    def rate_limit(api_name: str, calls_per_minute: int = 5, calls_per_day: int = 500):
-        """API速率限制裝飾器"""
+        # yfinance 為同步阻塞調用，隔離在有界線程池中執行，避免阻塞事件循環
+        self._yf_executor = ThreadPoolExecutor(
+            max_workers=self.settings.YFINANCE_WORKERS,
+            thread_name_prefix="yfinance"
+        )
+
+        # 上游速率限制 (跨 worker 共享令牌桶)
+        self.rate_limiter = rate_limiter
+
+        # 報價來源熔斷器：連續失敗後冷卻期內跳過該來源
+        self.breakers = {
+            name: CircuitBreaker(
+                name,
+                failure_threshold=self.settings.CIRCUIT_BREAKER_FAILURES,
+                cooldown=self.settings.CIRCUIT_BREAKER_COOLDOWN
+            )
+            for name in ("finnhub", "yfinance")
+        }
+
+        # 資產資料/報價的兩級緩存 (L1 進程內 + L2 Redis)
+        self.cache = TieredCache(
+            max_bytes=self.settings.L1_CACHE_MAX_MB * 1024 * 1024,
+            ttl=self.settings.CACHE_TTL,
+            redis_url=self.settings.REDIS_URL if self.settings.CACHE_L2_ENABLED else None
+        )
+
+        # 相同參數的併發上游請求合併為一次
+        self.inflight = SingleFlight()
+
+        # 本地 OHLCV 存儲：先讀本地，只向上游請求最後時間戳之後的K線
+        self.ohlcv_store = OHLCVStore() if self.settings.OHLCV_STORE_ENABLED else None
+
+        # 已標準化的歷史數據 (含本地重採樣結果)，鍵為 (標的, period, interval, lean)
+        self.history_cache = LRUCache(
+            max_bytes=self.settings.HISTORY_CACHE_MAX_MB * 1024 * 1024,
+            ttl=self.settings.HISTORY_CACHE_TTL
+        )
+
+    async def _run_blocking(self, func: Callable, *args, cost: float = 1.0,
+                            priority: Optional[int] = None, max_wait: Optional[float] = None,
+                            **kwargs) -> Any:
+        """在 yfinance 線程池中執行阻塞函數 (每次執行消耗 cost 個 yahoo 令牌)"""
+        await self.rate_limiter.acquire("yahoo", priority=priority, max_wait=max_wait, cost=cost)
+        loop = asyncio.get_running_loop()
+        with track_upstream("yahoo"):
+            return await loop.run_in_executor(self._yf_executor, partial(func, *args, **kwargs))
+
+    async def _run_local(self, func: Callable, *args, **kwargs) -> Any:
+        """在 yfinance 線程池中執行本地阻塞操作 (存儲讀寫，不消耗令牌)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._yf_executor, partial(func, *args, **kwargs))
+
+    @staticmethod
+    def _yf_info(symbol: str) -> Dict[str, Any]:
+        return yf.Ticker(symbol).info
+
+    @staticmethod
+    def _yf_history(symbol: str, period: str, interval: str) -> pd.DataFrame:
+        ticker = yf.Ticker(symbol)
+        return ticker.history(period=period, interval=interval, auto_adjust=True, prepost=True)
+
+    @staticmethod
+    def _yf_history_since(symbol: str, start: pd.Timestamp, interval: str) -> pd.DataFrame:
+        ticker = yf.Ticker(symbol)
+        return ticker.history(start=start, interval=interval, auto_adjust=True, prepost=True)
+
+    async def _history_from_store(self, symbol: str, period: str, interval: str) -> pd.DataFrame:
+        """本地存儲優先的歷史數據讀取
+
+        存儲未覆蓋所需範圍時完整下載並重寫；否則只下載最後已存K線之後的數據並追加。
+        最後已存K線的收盤價與上游不一致 (除權息後復權價變化)、日內存儲已超出上游
+        可取範圍、或增量下載失敗/為空而存儲未到最近交易日時整段重新下載。
+        存儲讀寫在線程池中執行，每次上游下載各消耗一個 yahoo 令牌。
+        """
+        start = self._period_start(period)
+
+        try:
+            meta = await self._run_local(self._store_coverage, symbol, interval, start)
+        except Exception as e:
+            logger.warning(f"本地 OHLCV 存儲不可用，改為完整下載 {symbol}: {e}")
+            return await self._run_blocking(self._yf_history, symbol, period, interval)
+
+        if meta is not None and self._store_expired(interval, meta["last_time"]):
+            logger.info(f"{symbol} {interval} 本地存儲已超出上游可增量範圍，重新下載完整歷史")
+            meta = None
+
+        if meta is not None:
+            try:
+                fresh = await self._run_blocking(self._yf_history_since, symbol, meta["last_time"], interval)
+            except RateLimitExceeded:
+                raise
+            except Exception as e:
+                logger.warning(f"增量下載失敗，改為完整下載 {symbol}: {e}")
+                fresh = None
+            data = None
+            if fresh is not None:
+                try:
+                    data = await self._run_local(self._store_merge, symbol, interval, start, meta, fresh)
+                except Exception as e:
+                    logger.warning(f"本地 OHLCV 存儲追加失敗 {symbol}: {e}")
+            if data is not None:
+                return data
+
+        data = await self._run_blocking(self._yf_history, symbol, period, interval)
+        if not data.empty:
+            try:
+                await self._run_local(self.ohlcv_store.replace, symbol, interval, data, coverage_start=start)
+            except Exception as e:
+                logger.warning(f"本地 OHLCV 存儲寫入失敗 {symbol}: {e}")
+        return data
+
+    def _store_coverage(self, symbol: str, interval: str,
+                        start: Optional[pd.Timestamp]) -> Optional[Dict[str, Any]]:
+        """存儲覆蓋 start 起的範圍時返回其元數據，否則返回 None"""
+        meta = self.ohlcv_store.info(symbol, interval)
+        covered = bool(meta and meta["rows"]) and (
+            meta["coverage_start"] is None
+            or (start is not None and start.value >= meta["coverage_start"])
+        )
+        return meta if covered else None
+
+    def _store_merge(self, symbol: str, interval: str, start: Optional[pd.Timestamp],
+                     meta: Dict[str, Any], fresh: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """把增量K線追加進存儲並返回 start 起的完整數據；復權價已變化時返回 None"""
+        store = self.ohlcv_store
+        if not fresh.empty and fresh.index[0] == meta["last_time"]:
+            # 與存儲自身的最後一行比較 (該行可能早於 start)
+            tail = store.read_arrays(symbol, interval, start=meta["last_time"])
+            if tail is not None and len(tail["timestamp"]) and not np.isclose(
+                    fresh['Close'].iloc[0], tail['Close'][-1], rtol=1e-6):
+                logger.info(f"{symbol} 復權價格已變化，重新下載完整歷史")
+                return None
+
+        stored = store.read_frame(symbol, interval, start=start)
+        if fresh.empty:
+            # 上游連最後已存K線都未返回：存儲未覆蓋到最近交易日時不能當作最新數據
+            if stored.empty or meta["last_time"] < pd.Timestamp.now(tz="UTC").normalize() - pd.offsets.BDay(1):
+                return None
+            return stored
+
+        store.append(symbol, interval, fresh)
+        fresh = fresh.reindex(columns=stored.columns)
+        if start is not None:
+            fresh = fresh[fresh.index >= start]
+        return pd.concat([stored[stored.index < fresh.index[0]], fresh]) if len(fresh) else stored
+
+    @staticmethod
+    def _store_expired(interval: str, last_time: pd.Timestamp) -> bool:
+        """最後已存K線早於上游日內週期可取的天數範圍時，增量請求無法補齊缺口"""
+        max_days = INTERVAL_MAX_DAYS.get(interval)
+        if max_days is None:
+            return False
+        return pd.Timestamp.now(tz="UTC") - last_time >= pd.Timedelta(days=max_days - 1)
+
+    @staticmethod
+    def _period_start(period: str) -> Optional[pd.Timestamp]:
+        """period 對應的起始時間 (UTC)；max 返回 None"""
+        now = pd.Timestamp.now(tz="UTC")
+        if period == "max":
+            return None
+        if period == "ytd":
+            return pd.Timestamp(year=now.year, month=1, day=1, tz="UTC")
+        return now - PERIOD_OFFSETS[period]
+
+    def rate_limit(api_name: str):
+        """API速率限制裝飾器：向共享令牌桶申請許可，額度不足時拋出 RateLimitExceeded；記錄上游調用延遲"""
         def decorator(func):
             @wraps(func)
             async def wrapper(self, *args, **kwargs):
-                now = time.time()
-
-                if api_name == "alpha_vantage":
-                    # 檢查每分鐘限制
-                    if now - self.last_minute_reset > 60:
-                        self.alpha_vantage_calls_minute = 0
-                        self.last_minute_reset = now
-
-                    if self.alpha_vantage_calls_minute >= calls_per_minute:
-                        wait_time = 60 - (now - self.last_minute_reset)
-                        logger.warning(f"Alpha Vantage API 達到每分鐘限制，等待 {wait_time:.0f} 秒")
-                        await asyncio.sleep(wait_time)
-                        self.alpha_vantage_calls_minute = 0
-                        self.last_minute_reset = time.time()
-
-                    # 檢查每日限制
-                    if self.alpha_vantage_calls_today >= calls_per_day:
-                        logger.error("Alpha Vantage API 達到每日限制")
-                        raise Exception("API daily limit reached")
-
-                    self.alpha_vantage_calls_minute += 1
-                    self.alpha_vantage_calls_today += 1
-
-                return await func(self, *args, **kwargs)
+                try:
+                    await self.rate_limiter.acquire(api_name)
+                except RateLimitExceeded as e:
+                    logger.warning(f"{api_name} API 達到速率限制，{e.retry_after:.0f} 秒後可重試")
+                    raise
+                with track_upstream(api_name):
+                    return await func(self, *args, **kwargs)
             return wrapper
         return decorator
 
+    def coalesce(method: str, *key_params: str):
+        """請求合併裝飾器：按 (方法, 標的, *key_params) 合併併發調用"""
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            @wraps(func)
+            async def wrapper(self, *args, **kwargs):
+                bound = signature.bind(self, *args, **kwargs)
+                bound.apply_defaults()
+                key = (method, str(bound.arguments['symbol']).upper().strip(),
+                       *(bound.arguments[name] for name in key_params))
+                result, leader = await self.inflight.do(key, func, self, *args, **kwargs)
+                return result if leader else _share(result)
+            return wrapper
+        return decorator
+
+    def get_coalescing_stats(self) -> Dict[str, Any]:
+        """請求合併統計"""
+        return self.inflight.stats()
+
+    def get_rate_limit_stats(self) -> Dict[str, Any]:
+        """上游速率限制統計"""
+        return self.rate_limiter.stats()
+
+    def get_source_health(self) -> Dict[str, Any]:
+        """各報價來源的熔斷器狀態"""
+        return {name: breaker.stats() for name, breaker in self.breakers.items()}
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """資產資料/報價緩存統計"""
+        return self.cache.stats()
+
+    @staticmethod
+    def _cacheable(result: Any) -> bool:
+        """錯誤結果不緩存"""
+        return isinstance(result, dict) and "error" not in result
+
+    @staticmethod
+    def _in_background(loader: Callable) -> Callable:
+        """後台刷新以低優先級申請上游額度，不擠佔交互請求"""
+        async def run():
+            with priority_scope(PRIORITY_BACKGROUND):
+                return await loader()
+        return run
+
+    def _market_session(self, market: str, now: Optional[datetime] = None) -> Tuple[bool, Optional[float]]:
+        """按 MARKET_HOURS 判斷是否開市，休市時同時返回距下次開市的秒數
+
+        週末順延至週一；未計入節假日。不在 MARKET_HOURS 中的市場視為持續交易。
+        """
+        hours = MARKET_HOURS.get(market)
+        if hours is None:
+            return True, None
+
+        tz = ZoneInfo(hours["timezone"])
+        local = (now or datetime.now(timezone.utc)).astimezone(tz)
+        open_time = datetime.strptime(hours["open"], "%H:%M").time()
+        close_time = datetime.strptime(hours["close"], "%H:%M").time()
+
+        if local.weekday() < 5 and open_time <= local.time() < close_time:
+            return True, None
+
+        day = local.date()
+        next_open = datetime.combine(day, open_time, tzinfo=tz)
+        while next_open <= local or next_open.weekday() >= 5:
+            day += timedelta(days=1)
+            next_open = datetime.combine(day, open_time, tzinfo=tz)
+        return False, (next_open - local).total_seconds()
+
+    def _quote_ttl(self, symbol: str) -> float:
+        """報價緩存時長：開市時數秒，休市時保留至下次開市"""
+        market, _ = self.detect_market_type(symbol)
+        is_open, until_open = self._market_session(market)
+        if is_open:
+            return self.settings.QUOTE_CACHE_TTL
+        return max(self.settings.QUOTE_CACHE_TTL, until_open)
+
     def detect_market_type(self, symbol: str) -> Tuple[str, str]:
         """檢測市場類型和資產類別"""
         symbol = symbol.upper().strip()
@@ -93,14 +376,26 @@ class DataFetcher:
         else:
             return 'US', 'STOCK'
 
+    @coalesce("get_asset_info")
     async def get_asset_info(self, symbol: str) -> Dict[str, Any]:
-        """獲取資產基本信息"""
+        """獲取資產基本信息 (緩存一天，過期後先返回舊值並後台刷新)"""
+        loader = partial(self._load_asset_info, symbol)
+        result = await self.cache.get_or_load(
+            f"asset_info:{symbol.upper().strip()}", loader,
+            ttl=self.settings.ASSET_INFO_CACHE_TTL,
+            stale_ttl=self.settings.ASSET_INFO_STALE_TTL,
+            cacheable=self._cacheable,
+            refresh=self._in_background(loader)
+        )
+        return _share(result)
+
+    async def _load_asset_info(self, symbol: str) -> Dict[str, Any]:
+        """從上游獲取資產基本信息"""
         try:
             market, asset_type = self.detect_market_type(symbol)
 
             # 使用 yfinance 獲取基本信息
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
+            info = await self._run_blocking(self._yf_info, symbol)
 
             # 標準化信息
             asset_info = {
@@ -127,6 +422,8 @@ class DataFetcher:
 
             return asset_info
 
+        except RateLimitExceeded:
+            raise
         except Exception as e:
             logger.error(f"獲取資產信息失敗 {symbol}: {e}")
             return {
@@ -135,29 +432,265 @@ class DataFetcher:
                 "message": "無法獲取資產信息"
             }
 
+    @coalesce("get_historical_data", "period", "interval", "lean")
     async def get_historical_data(self, symbol: str, period: str = "1y", 
-                                interval: str = "1d") -> Optional[pd.DataFrame]:
-        """獲取歷史價格數據"""
+                                interval: str = "1d", lean: Optional[bool] = None) -> Optional[pd.DataFrame]:
+        """獲取歷史價格數據
+
+        lean: 精簡模式 (缺省取 HISTORY_LEAN_MODE)，見 _normalize_history；
+        佔用字節數記錄在 data.attrs["nbytes"]。
+        可由細週期合成的週期在本地重採樣 (見 _resample_base)，結果按週期緩存。
+        """
         try:
             # 參數驗證
-            valid_periods = ["1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "ytd", "max"]
-            valid_intervals = ["1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h", "1d", "5d", "1wk", "1mo", "3mo"]
-
-            if period not in valid_periods:
-                period = "1y"
-            if interval not in valid_intervals:
-                interval = "1d"
+            period, interval = self._validate_history_params(period, interval)
+            lean = self.settings.HISTORY_LEAN_MODE if lean is None else lean
 
             logger.info(f"獲取 {symbol} 歷史數據: period={period}, interval={interval}")
 
-            # 使用 yfinance 獲取數據
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(period=period, interval=interval, auto_adjust=True, prepost=True)
-
-            if data.empty:
+            base = self._resample_base(symbol, period, interval, lean)
+            if base == interval:
+                data = await self._load_history(symbol, period, interval, lean)
+            else:
+                key = self._history_key(symbol, period, interval, lean)
+                data = self.history_cache.get(key)
+                if data is None:
+                    base_data = await self._load_history(symbol, period, base, lean)
+                    if base_data is not None:
+                        data = self._resample_history(base_data, symbol, base, interval, lean)
+                        self.history_cache.set(key, data)
+                        logger.info(f"{symbol} {interval} 由本地 {base} 數據合成")
+
+            if data is None or data.empty:
                 logger.warning(f"無法獲取 {symbol} 的歷史數據")
                 return None
 
+            data = data.copy()
+
+            logger.info(f"✅ 成功獲取 {symbol} 數據: {len(data)} 行, "
+                        f"{data.attrs['nbytes'] / 1024:.1f} KB")
+            return data
+
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"獲取歷史數據失敗 {symbol}: {e}")
+            return None
+
+    @staticmethod
+    def _history_key(symbol: str, period: str, interval: str, lean: bool) -> Tuple:
+        return (symbol.upper().strip(), period, interval, lean)
+
+    def _resample_base(self, symbol: str, period: str, interval: str, lean: bool) -> str:
+        """選擇合成 interval 的基礎週期，返回 interval 本身表示直接向上游獲取
+
+        日內週期由 RESAMPLE_BASE_INTERVALS 中上游支援該 period 的最細週期合成，
+        同一標的的多個日內週期共用一次上游請求；日線及以上週期只在對應的
+        日內基礎數據已在緩存中時才由其合成，否則直接獲取 (數據量小得多)。
+        """
+        if not self.settings.RESAMPLE_ENABLED:
+            return interval
+
+        days = PERIOD_DAYS.get(period)
+        for base in RESAMPLE_BASE_INTERVALS:
+            if base == interval:
+                return interval
+            if not can_resample(base, interval):
+                continue
+            if base in INTERVAL_MAX_DAYS:
+                if days is None or days > INTERVAL_MAX_DAYS[base]:
+                    continue
+                if (interval not in INTRADAY_MINUTES
+                        and self._history_key(symbol, period, base, lean) not in self.history_cache):
+                    continue
+            return base
+        return interval
+
+    async def _load_history(self, symbol: str, period: str, interval: str,
+                            lean: bool) -> Optional[pd.DataFrame]:
+        """獲取並標準化歷史數據 (結果緩存；相同參數的併發請求合併為一次)"""
+        key = self._history_key(symbol, period, interval, lean)
+        data = self.history_cache.get(key)
+        if data is None:
+            data, _ = await self.inflight.do(("history",) + key, self._fetch_history,
+                                             symbol, period, interval, lean)
+        return data
+
+    async def _fetch_history(self, symbol: str, period: str, interval: str,
+                             lean: bool) -> Optional[pd.DataFrame]:
+        # 使用 yfinance 獲取數據
+        if self.ohlcv_store is not None and (period in PERIOD_OFFSETS or period in ("ytd", "max")):
+            data = await self._history_from_store(symbol, period, interval)
+        else:
+            data = await self._run_blocking(self._yf_history, symbol, period, interval)
+
+        if data.empty:
+            return None
+
+        data = self._normalize_history(data, lean)
+        self.history_cache.set(self._history_key(symbol, period, interval, lean), data)
+        return data
+
+    def _resample_history(self, data: pd.DataFrame, symbol: str, source: str,
+                          target: str, lean: bool) -> pd.DataFrame:
+        """按標的所屬市場的交易時段重採樣，並重新生成衍生列"""
+        market, _ = self.detect_market_type(symbol)
+        derived = [col for col in DERIVED_COLUMNS if col in data.columns]
+        data = resample_ohlcv(data.drop(columns=derived), source, target, market)
+        if not lean:
+            data = ensure_derived_columns(data)
+        data.attrs["nbytes"] = int(data.memory_usage(index=True, deep=False).sum())
+        return data
+
+    def get_history_cache_stats(self) -> Dict[str, Any]:
+        """歷史數據 (含重採樣結果) 緩存統計"""
+        return self.history_cache.stats()
+
+    async def get_historical_data_many(self, symbols: List[str], period: str = "1y",
+                                       interval: str = "1d", as_panel: bool = False,
+                                       chunk_size: Optional[int] = None,
+                                       lean: Optional[bool] = None) -> Dict[str, Any]:
+        """批量獲取多個標的的歷史數據
+
+        標的按 chunk_size 分組，每組一次 yf.download，同時進行的組數受 BULK_DOWNLOAD_CONCURRENCY 限制。
+        批量下載以後台優先級排隊申請令牌，最長等待按截至該組的累計令牌數估算。
+        單個標的失敗不影響其他標的；整組下載失敗時該組退回逐個標的獲取 (限流時不退回)，
+        仍失敗的標的記入 errors。
+
+        返回:
+            as_panel=False: {"data": {標的: DataFrame}, "errors": {標的: 原因}, "nbytes": {標的: 字節數}}
+            as_panel=True:  {"panel": (欄位, 標的) MultiIndex 對齊面板, "errors": {...}, "nbytes": {...}}
+                            面板可直接傳給 calculate_all_indicators_batch
+        """
+        period, interval = self._validate_history_params(period, interval)
+        symbols = list(dict.fromkeys(s.strip() for s in symbols if s and s.strip()))
+        # 每組按標的數消耗 yahoo 令牌，組大小不能超過令牌桶容量
+        chunk_size = min(chunk_size or self.settings.BULK_DOWNLOAD_CHUNK_SIZE,
+                         self.settings.YAHOO_CALLS_PER_MINUTE)
+        chunks = [symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+        semaphore = asyncio.Semaphore(self.settings.BULK_DOWNLOAD_CONCURRENCY)
+
+        logger.info(f"批量獲取 {len(symbols)} 個標的歷史數據: {len(chunks)} 組, "
+                    f"period={period}, interval={interval}")
+
+        refill_rate = self.settings.YAHOO_CALLS_PER_MINUTE / 60
+
+        async def fetch_chunk(index: int, chunk: List[str]) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+            # 排在前面的組先消耗令牌，本組需等到累計令牌補充完畢
+            queued = sum(len(c) for c in chunks[:index + 1])
+            max_wait = self.settings.RATE_LIMIT_BACKGROUND_MAX_WAIT + queued / refill_rate
+            async with semaphore:
+                try:
+                    # yf.download 對每個標的各發一次上游請求
+                    raw = await self._run_blocking(self._yf_download, chunk, period, interval,
+                                                   cost=len(chunk), priority=PRIORITY_BACKGROUND,
+                                                   max_wait=max_wait)
+                    return self._split_download(raw, chunk, lean)
+                except RateLimitExceeded:
+                    raise
+                except Exception as e:
+                    logger.warning(f"批量下載失敗，改為逐個獲取 ({len(chunk)} 個標的): {e}")
+
+                frames, errors = {}, {}
+                with priority_scope(PRIORITY_BACKGROUND):
+                    results = await asyncio.gather(
+                        *[self.get_historical_data(symbol, period, interval, lean) for symbol in chunk],
+                        return_exceptions=True
+                    )
+                for symbol, data in zip(chunk, results):
+                    if isinstance(data, Exception):
+                        errors[symbol] = str(data) or repr(data)
+                    elif data is None:
+                        errors[symbol] = "無法獲取歷史數據"
+                    else:
+                        frames[symbol] = data
+                return frames, errors
+
+        data, errors = {}, {}
+        results = await asyncio.gather(*[fetch_chunk(i, c) for i, c in enumerate(chunks)],
+                                       return_exceptions=True)
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, Exception):
+                logger.warning(f"批量下載失敗 ({len(chunk)} 個標的): {result}")
+                errors.update({symbol: str(result) or repr(result) for symbol in chunk})
+                continue
+            frames, chunk_errors = result
+            data.update(frames)
+            errors.update(chunk_errors)
+
+        # 保持輸入順序
+        data = {symbol: data[symbol] for symbol in symbols if symbol in data}
+        nbytes = {symbol: frame.attrs.get("nbytes", 0) for symbol, frame in data.items()}
+        logger.info(f"✅ 批量獲取完成: 成功 {len(data)}, 失敗 {len(errors)}, "
+                    f"{sum(nbytes.values()) / 1024 / 1024:.1f} MB")
+
+        if not as_panel:
+            return {"data": data, "errors": errors, "nbytes": nbytes}
+
+        fields = ['Open', 'High', 'Low', 'Close', 'Volume']
+        panel = pd.concat(
+            {symbol: frame[[f for f in fields if f in frame]] for symbol, frame in data.items()},
+            axis=1
+        ).swaplevel(0, 1, axis=1).sort_index(axis=1, level=0) if data else pd.DataFrame()
+        return {"panel": panel, "errors": errors, "nbytes": nbytes}
+
+    @staticmethod
+    def _yf_download(symbols: List[str], period: str, interval: str) -> pd.DataFrame:
+        return yf.download(
+            symbols, period=period, interval=interval, group_by="column",
+            auto_adjust=True, prepost=True, progress=False, threads=True
+        )
+
+    def _split_download(self, raw: Optional[pd.DataFrame], symbols: List[str],
+                        lean: Optional[bool] = None) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+        """將 yf.download 的 (欄位, 標的) 結果拆分為逐標的 DataFrame
+
+        yfinance 0.2.43 下載單個標的時返回單層欄位，視為該標的自身的數據。
+        """
+        frames, errors = {}, {}
+        if raw is None or raw.empty:
+            return frames, {symbol: "無法獲取歷史數據" for symbol in symbols}
+
+        multi = isinstance(raw.columns, pd.MultiIndex)
+        if multi:
+            available = set(raw.columns.get_level_values(1))
+        else:
+            available = set(symbols) if len(symbols) == 1 else set()
+        for symbol in symbols:
+            try:
+                if symbol not in available:
+                    errors[symbol] = "無法獲取歷史數據"
+                    continue
+                data = (raw.xs(symbol, axis=1, level=1) if multi else raw).dropna(how='all')
+                if data.empty or data['Close'].isna().all():
+                    errors[symbol] = "無法獲取歷史數據"
+                    continue
+                frames[symbol] = self._normalize_history(data, lean)
+            except Exception as e:
+                errors[symbol] = str(e)
+        return frames, errors
+
+    def _validate_history_params(self, period: str, interval: str) -> Tuple[str, str]:
+        """參數驗證，無效值退回默認"""
+        valid_periods = ["1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "ytd", "max"]
+        valid_intervals = ["1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h", "1d", "5d", "1wk", "1mo", "3mo"]
+
+        if period not in valid_periods:
+            period = "1y"
+        if interval not in valid_intervals:
+            interval = "1d"
+        return period, interval
+
+    def _normalize_history(self, data: pd.DataFrame, lean: Optional[bool] = None) -> pd.DataFrame:
+        """數據清理、標準化列名並添加收益率列
+
+        lean=True 時原地改名、僅在存在缺失值時才過濾行，價格等數值列轉為 float32、
+        成交量轉為整數，不預先生成收益率列 (需要時調用 ensure_derived_columns)。
+        """
+        if lean is None:
+            lean = self.settings.HISTORY_LEAN_MODE
+
+        if not lean:
             # 數據清理
             data = data.dropna()
 
@@ -165,47 +698,42 @@ class DataFetcher:
             data.columns = [col.title() for col in data.columns]
 
             # 添加基本計算列
-            data['Returns'] = data['Close'].pct_change()
-            data['Log_Returns'] = np.log(data['Close'] / data['Close'].shift(1))
+            data = ensure_derived_columns(data)
+        else:
+            data.columns = [col.title() for col in data.columns]
+            valid = data.notna().all(axis=1).to_numpy()
+            if not valid.all():
+                data = data[valid]
 
-            logger.info(f"✅ 成功獲取 {symbol} 數據: {len(data)} 行")
-            return data
+            dtypes = {col: np.float32 for col in data.columns
+                      if col != 'Volume' and pd.api.types.is_float_dtype(data[col])}
+            if 'Volume' in data.columns:
+                dtypes['Volume'] = _volume_dtype(data['Volume'])
+            data = data.astype(dtypes)
 
-        except Exception as e:
-            logger.error(f"獲取歷史數據失敗 {symbol}: {e}")
-            return None
+        data.attrs["nbytes"] = int(data.memory_usage(index=True, deep=False).sum())
+        return data
 
+    @coalesce("get_real_time_price")
     async def get_real_time_price(self, symbol: str) -> Dict[str, Any]:
-        """獲取實時價格數據"""
+        """獲取實時價格數據 (開市時緩存數秒，休市時緩存至下次開市)"""
+        loader = partial(self._load_real_time_price, symbol)
+        result = await self.cache.get_or_load(
+            f"quote:{symbol.upper().strip()}", loader,
+            ttl=self._quote_ttl(symbol),
+            stale_ttl=self.settings.QUOTE_STALE_TTL,
+            cacheable=self._cacheable,
+            refresh=self._in_background(loader)
+        )
+        return _share(result)
+
+    async def _load_real_time_price(self, symbol: str) -> Dict[str, Any]:
+        """從上游獲取實時價格 (Finnhub 優先，yfinance 對沖)"""
         try:
-            # 首先嘗試 Finnhub (更實時)
-            if self.finnhub_key:
-                try:
-                    finnhub_data = await self._get_finnhub_quote(symbol)
-                    if finnhub_data:
-                        return finnhub_data
-                except Exception as e:
-                    logger.warning(f"Finnhub 實時數據失敗: {e}")
-
-            # Fallback 到 yfinance
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
-
-            return {
-                "symbol": symbol,
-                "price": info.get('currentPrice', info.get('regularMarketPrice', 0)),
-                "change": info.get('regularMarketChange', 0),
-                "change_percent": info.get('regularMarketChangePercent', 0),
-                "volume": info.get('regularMarketVolume', 0),
-                "day_high": info.get('dayHigh', info.get('regularMarketDayHigh', 0)),
-                "day_low": info.get('dayLow', info.get('regularMarketDayLow', 0)),
-                "bid": info.get('bid', 0),
-                "ask": info.get('ask', 0),
-                "market_status": self._get_market_status(symbol),
-                "timestamp": datetime.now().isoformat(),
-                "data_source": "yfinance"
-            }
+            return await self._hedged_quote(symbol)
 
+        except RateLimitExceeded:
+            raise
         except Exception as e:
             logger.error(f"獲取實時價格失敗 {symbol}: {e}")
             return {
@@ -214,7 +742,101 @@ class DataFetcher:
                 "message": "無法獲取實時價格"
             }
 
-    @rate_limit("alpha_vantage", calls_per_minute=5, calls_per_day=500)
+    def _quote_sources(self) -> List[Tuple[str, Callable]]:
+        """按優先順序排列的報價來源"""
+        sources = []
+        if self.finnhub_key:
+            sources.append(("finnhub", self._get_finnhub_quote))
+        sources.append(("yfinance", self._get_yfinance_quote))
+        return sources
+
+    async def _hedged_quote(self, symbol: str) -> Dict[str, Any]:
+        """對沖請求：首選來源 QUOTE_HEDGE_DELAY 秒內未返回 (或已失敗) 時啟動下一來源，
+        採用第一個有效報價並取消其餘請求；熔斷中的來源直接跳過
+
+        超時、出錯，以及超過對沖延遲仍未返回而被取消的來源都記為一次失敗。
+        """
+        remaining = self._quote_sources()
+        timeout = self.settings.QUOTE_SOURCE_TIMEOUT
+        loop = asyncio.get_running_loop()
+        pending: Dict[asyncio.Future, str] = {}
+        started: Dict[asyncio.Future, float] = {}
+        errors: List[Exception] = []
+
+        def launch() -> bool:
+            """啟動下一個未熔斷的來源；熔斷器只在真正啟動時放行，避免佔用試探名額後不歸還"""
+            while remaining:
+                name, fetch = remaining.pop(0)
+                if not self.breakers[name].allow():
+                    continue
+                task = asyncio.ensure_future(asyncio.wait_for(fetch(symbol), timeout))
+                pending[task] = name
+                started[task] = loop.time()
+                return True
+            return False
+
+        if not launch():
+            raise Exception("所有報價來源均處於熔斷冷卻期")
+        try:
+            while pending:
+                hedge_delay = self.settings.QUOTE_HEDGE_DELAY if remaining else None
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = pending.pop(task)
+                    try:
+                        quote = task.result()
+                    except RateLimitExceeded as e:
+                        self.breakers[name].release()
+                        errors.append(e)
+                        continue
+                    except Exception as e:
+                        self.breakers[name].record_failure()
+                        logger.warning(f"{name} 實時數據失敗 {symbol}: {e!r}")
+                        errors.append(e)
+                        continue
+
+                    self.breakers[name].record_success()
+                    if quote and quote.get("price"):
+                        return quote
+                    errors.append(ValueError(f"{name} 無有效報價"))
+
+                # 超過對沖延遲或已有來源失敗時啟動下一來源
+                if remaining and (not done or not pending):
+                    launch()
+        finally:
+            for task, name in pending.items():
+                task.cancel()
+                if loop.time() - started[task] >= self.settings.QUOTE_HEDGE_DELAY:
+                    self.breakers[name].record_failure()
+                else:
+                    self.breakers[name].release()
+
+        limited = [e for e in errors if isinstance(e, RateLimitExceeded)]
+        if limited and len(limited) == len(errors):
+            raise limited[0]
+        raise Exception(f"無法從任何來源獲取報價: {'; '.join(str(e) or repr(e) for e in errors)}")
+
+    async def _get_yfinance_quote(self, symbol: str) -> Dict[str, Any]:
+        """從 yfinance 獲取實時報價"""
+        info = await self._run_blocking(self._yf_info, symbol)
+
+        return {
+            "symbol": symbol,
+            "price": info.get('currentPrice', info.get('regularMarketPrice', 0)),
+            "change": info.get('regularMarketChange', 0),
+            "change_percent": info.get('regularMarketChangePercent', 0),
+            "volume": info.get('regularMarketVolume', 0),
+            "day_high": info.get('dayHigh', info.get('regularMarketDayHigh', 0)),
+            "day_low": info.get('dayLow', info.get('regularMarketDayLow', 0)),
+            "bid": info.get('bid', 0),
+            "ask": info.get('ask', 0),
+            "market_status": self._get_market_status(symbol),
+            "timestamp": datetime.now().isoformat(),
+            "data_source": "yfinance"
+        }
+
+    @rate_limit("alpha_vantage")
     async def get_technical_indicators_av(self, symbol: str, indicator: str, 
                                         **params) -> Dict[str, Any]:
         """使用 Alpha Vantage 獲取技術指標"""
@@ -256,8 +878,7 @@ class DataFetcher:
                 request_params["nbdevup"] = params.get("std", 2)
                 request_params["nbdevdn"] = params.get("std", 2)
 
-            response = requests.get(self.alpha_vantage_base, params=request_params, timeout=10)
-            data = response.json()
+            data = await get_json(self.alpha_vantage_base, params=request_params)
 
             if "Error Message" in data:
                 raise Exception(data["Error Message"])
@@ -271,37 +892,33 @@ class DataFetcher:
             logger.error(f"Alpha Vantage 技術指標失敗 {symbol}-{indicator}: {e}")
             raise e
 
+    @rate_limit("finnhub")
     async def _get_finnhub_quote(self, symbol: str) -> Dict[str, Any]:
-        """從 Finnhub 獲取實時報價"""
-        try:
-            url = f"{self.finnhub_base}/quote"
-            params = {
-                "symbol": symbol,
-                "token": self.finnhub_key
-            }
+        """從 Finnhub 獲取實時報價 (請求失敗時拋出異常，由對沖邏輯記入熔斷器)"""
+        url = f"{self.finnhub_base}/quote"
+        params = {
+            "symbol": symbol,
+            "token": self.finnhub_key
+        }
 
-            response = requests.get(url, params=params, timeout=10)
-            data = response.json()
+        data = await get_json(url, params=params)
 
-            if 'c' in data and data['c'] > 0:
-                return {
-                    "symbol": symbol,
-                    "price": data['c'],  # current price
-                    "change": data['d'],  # change
-                    "change_percent": data['dp'],  # change percent
-                    "day_high": data['h'],  # high
-                    "day_low": data['l'],   # low
-                    "previous_close": data['pc'],  # previous close
-                    "timestamp": datetime.now().isoformat(),
-                    "data_source": "finnhub"
-                }
-
-            return None
+        if 'c' in data and data['c'] > 0:
+            return {
+                "symbol": symbol,
+                "price": data['c'],  # current price
+                "change": data['d'],  # change
+                "change_percent": data['dp'],  # change percent
+                "day_high": data['h'],  # high
+                "day_low": data['l'],   # low
+                "previous_close": data['pc'],  # previous close
+                "timestamp": datetime.now().isoformat(),
+                "data_source": "finnhub"
+            }
 
-        except Exception as e:
-            logger.error(f"Finnhub 報價獲取失敗: {e}")
-            return None
+        return None
 
+    @rate_limit("finnhub")
     async def _get_finnhub_company_info(self, symbol: str) -> Dict[str, Any]:
         """從 Finnhub 獲取公司信息"""
         try:
@@ -311,8 +928,7 @@ class DataFetcher:
                 "token": self.finnhub_key
             }
 
-            response = requests.get(url, params=params, timeout=10)
-            data = response.json()
+            data = await get_json(url, params=params)
 
             if data and 'name' in data:
                 return {
@@ -340,19 +956,16 @@ class DataFetcher:
         if market in ['CRYPTO', 'FOREX']:
             return "OPEN"
 
-        # 簡化的市場時間檢查
-        # 實際應用中應該考慮節假日和具體時區
-        now = datetime.now()
-        hour = now.hour
-
-        if market == 'US' and 9 <= hour <= 16:
-            return "OPEN"
-        elif market == 'HK' and 9 <= hour <= 16:
-            return "OPEN"
-        elif market == 'UK' and 8 <= hour <= 16:
-            return "OPEN"
-        else:
+        # 按 MARKET_HOURS 的當地交易時段判斷 (未計入節假日)
+        if market not in MARKET_HOURS:
             return "CLOSED"
+        is_open, _ = self._market_session(market)
+        return "OPEN" if is_open else "CLOSED"
+
+    def shutdown(self, wait: bool = False):
+        """關閉 yfinance 線程池，取消排隊中的任務 (應用關閉時調用)"""
+        self._yf_executor.shutdown(wait=wait, cancel_futures=True)
+        logger.info("yfinance 線程池已關閉")
 
 # 全局數據獲取器實例
 data_fetcher = DataFetcher()
@@ -0,0 +1,72 @@
+# app/utils/http_client.py
+# 共享異步 HTTP 客戶端 - 按主機保持連接池 (keep-alive)，上游支援時使用 HTTP/2
+# 連接數與超時取自 Settings.MAX_CONNECTIONS / REQUEST_TIMEOUT
+
+import asyncio
+from typing import Dict, Any, Optional
+
+import httpx
+from loguru import logger
+
+from ..core.config import get_settings
+
+# HTTP/2 需要 h2 套件 (pip install "httpx[http2]")，缺少時退回 HTTP/1.1
+try:
+    import h2  # noqa: F401
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+    logger.warning("⚠️ h2 不可用，HTTP 客戶端使用 HTTP/1.1")
+
+# 每個事件循環一個客戶端 (httpx 連接池綁定創建時的事件循環)
+_clients: Dict[int, httpx.AsyncClient] = {}
+
+
+def _build_client() -> httpx.AsyncClient:
+    settings = get_settings()
+    limits = httpx.Limits(
+        max_connections=settings.MAX_CONNECTIONS,
+        max_keepalive_connections=settings.MAX_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+    )
+    timeout = httpx.Timeout(
+        settings.REQUEST_TIMEOUT,
+        connect=min(settings.REQUEST_TIMEOUT, 10),
+        pool=settings.REQUEST_TIMEOUT
+    )
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=timeout,
+        http2=HAS_HTTP2,
+        headers={"User-Agent": f"{settings.APP_NAME}/{settings.VERSION}"}
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """獲取當前事件循環的共享客戶端 (延遲創建)"""
+    loop_id = id(asyncio.get_running_loop())
+    client = _clients.get(loop_id)
+    if client is None or client.is_closed:
+        client = _build_client()
+        _clients[loop_id] = client
+        logger.info(f"✅ HTTP 客戶端已創建 (HTTP/2: {HAS_HTTP2})")
+    return client
+
+
+async def get_json(url: str, params: Optional[Dict[str, Any]] = None,
+                   timeout: Optional[float] = None) -> Any:
+    """GET 並解析 JSON；非 2xx 狀態拋出 httpx.HTTPStatusError"""
+    kwargs = {"params": params}
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    response = await get_http_client().get(url, **kwargs)
+    response.raise_for_status()
+    return response.json()
+
+
+async def close_http_client():
+    """關閉當前事件循環的客戶端 (應用關閉時調用)"""
+    client = _clients.pop(id(asyncio.get_running_loop()), None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
+        logger.info("HTTP 客戶端已關閉")
@@ -0,0 +1,728 @@
+# app/services/incremental_indicators.py
+# 增量指標引擎 - 每根新K線 O(1) 更新
+# 按 (symbol, interval) 保存運行狀態，輸出與批量計算路徑 (NumPy/TA-Lib 後端) 的最新值一致
+
+import math
+from collections import OrderedDict, deque
+from typing import Dict, Any, Optional, Tuple
+
+import pandas as pd
+import numpy as np
+from loguru import logger
+
+from ..core.config import get_settings
+from . import indicator_kernels as kernels
+from .technical_analyzer import DEFAULT_CONFIG
+
+
+class _Undoable:
+    """保存最近一次 push 前的標量狀態，用於撤銷最後一根K線"""
+
+    _fields: Tuple[str, ...] = ()
+    _undo = None
+
+    def _save(self):
+        self._undo = tuple(getattr(self, name) for name in self._fields)
+
+    def undo(self):
+        for name, value in zip(self._fields, self._undo):
+            setattr(self, name, value)
+
+
+_NOTHING = object()
+
+
+class _RollingWindow(_Undoable):
+    """滑動窗口均值/樣本方差 (Welford 滑動更新，數值穩定)"""
+
+    _fields = ("total", "nan_count", "mean", "m2")
+
+    def __init__(self, window: int, with_var: bool = False):
+        self.window = window
+        self.with_var = with_var
+        self.values = deque()
+        self.total = 0.0
+        self.nan_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.evicted = _NOTHING
+
+    def push(self, x: float):
+        self._save()
+        self.evicted = _NOTHING
+        if self.with_var:
+            self._push_welford(x)
+        else:
+            self._push_sum(x)
+
+    def undo(self):
+        super().undo()
+        self.values.pop()
+        if self.evicted is not _NOTHING:
+            self.values.appendleft(self.evicted)
+            self.evicted = _NOTHING
+
+    def _push_sum(self, x: float):
+        self.values.append(x)
+        if math.isnan(x):
+            self.nan_count += 1
+        else:
+            self.total += x
+
+        if len(self.values) > self.window:
+            y = self.evicted = self.values.popleft()
+            if math.isnan(y):
+                self.nan_count -= 1
+            else:
+                self.total -= y
+
+    def _push_welford(self, x: float):
+        self.values.append(x)
+        if len(self.values) <= self.window:
+            n = len(self.values)
+            delta = x - self.mean
+            self.mean += delta / n
+            self.m2 += delta * (x - self.mean)
+        else:
+            y = self.evicted = self.values.popleft()
+            old_mean = self.mean
+            self.mean += (x - y) / self.window
+            self.m2 += (x - y) * (x - self.mean + y - old_mean)
+
+    def current_mean(self) -> float:
+        if len(self.values) < self.window or self.nan_count:
+            return np.nan
+        if self.with_var:
+            return self.mean
+        return self.total / self.window
+
+    def current_std(self) -> float:
+        if len(self.values) < self.window or self.window < 2:
+            return np.nan
+        return math.sqrt(max(self.m2, 0.0) / (self.window - 1))
+
+
+class _RollingExtreme:
+    """滑動窗口最大/最小值 (單調隊列，攤銷 O(1))"""
+
+    def __init__(self, window: int, mode: str = "max"):
+        self.window = window
+        self.is_max = mode == "max"
+        self.queue = deque()
+        self.count = 0
+        # 最近一次 push 從隊尾彈出的元素與隊首過期元素 (撤銷用)
+        self.dropped = []
+        self.expired = _NOTHING
+
+    def push(self, x: float):
+        self.dropped = []
+        self.expired = _NOTHING
+        if self.is_max:
+            while self.queue and self.queue[-1][1] <= x:
+                self.dropped.append(self.queue.pop())
+        else:
+            while self.queue and self.queue[-1][1] >= x:
+                self.dropped.append(self.queue.pop())
+
+        self.queue.append((self.count, x))
+        self.count += 1
+
+        if self.queue[0][0] <= self.count - 1 - self.window:
+            self.expired = self.queue.popleft()
+
+    def undo(self):
+        if self.expired is not _NOTHING:
+            self.queue.appendleft(self.expired)
+        self.queue.pop()
+        self.queue.extend(reversed(self.dropped))
+        self.count -= 1
+        self.dropped = []
+        self.expired = _NOTHING
+
+    def current(self) -> float:
+        if self.count < self.window:
+            return np.nan
+        return self.queue[0][1]
+
+
+class _EWM(_Undoable):
+    """指數移動平均，等價於 pandas ewm(span=..., adjust=True).mean()"""
+
+    _fields = ("num", "den")
+
+    def __init__(self, span: int):
+        self.decay = 1 - 2 / (span + 1)
+        self.num = 0.0
+        self.den = 0.0
+
+    def seed(self, values: np.ndarray):
+        """以整段歷史向量化初始化狀態"""
+        if len(values) == 0:
+            return
+        weights = self.decay ** np.arange(len(values) - 1, -1, -1)
+        self.num = float(np.dot(values, weights))
+        self.den = float(weights.sum())
+
+    def push(self, x: float) -> float:
+        self._save()
+        self.num = self.num * self.decay + x
+        self.den = self.den * self.decay + 1
+        return self.num / self.den
+
+    def current(self) -> float:
+        return self.num / self.den if self.den else np.nan
+
+
+class _SeededEMA(_Undoable):
+    """TA-Lib 式 EMA：先略過 skip 根，以首 period 個值的 SMA 作種子"""
+
+    _fields = ("value", "ready", "skip", "seed_sum", "seed_count")
+
+    def __init__(self, period: int, skip: int = 0):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.skip = skip
+        self.seed_sum = 0.0
+        self.seed_count = 0
+        self.ready = False
+        self.value = np.nan
+
+    def load(self, value: float):
+        self.value = value
+        self.ready = True
+        self.skip = 0
+
+    def push(self, x: float) -> float:
+        self._save()
+        if self.ready:
+            self.value = (x - self.value) * self.k + self.value
+        elif self.skip:
+            self.skip -= 1
+        else:
+            self.seed_sum += x
+            self.seed_count += 1
+            if self.seed_count == self.period:
+                self.value = self.seed_sum / self.period
+                self.ready = True
+        return self.value
+
+
+class _Wilder(_Undoable):
+    """Wilder 平滑：首 period 個值平均作種子 (sum=True 時為累計和，種子取 period-1 個)"""
+
+    _fields = ("value", "ready", "seed_sum", "seed_count")
+
+    def __init__(self, period: int, sum_mode: bool = False):
+        self.period = period
+        self.sum_mode = sum_mode
+        self.seed_target = period - 1 if sum_mode else period
+        self.seed_sum = 0.0
+        self.seed_count = 0
+        self.ready = False
+        self.value = np.nan
+
+    def load(self, value: float):
+        self.value = value
+        self.ready = True
+
+    def push(self, x: float) -> float:
+        self._save()
+        p = self.period
+        if self.ready:
+            if self.sum_mode:
+                self.value = self.value - self.value / p + x
+            else:
+                self.value = (self.value * (p - 1) + x) / p
+            return self.value
+
+        if self.seed_count < self.seed_target:
+            self.seed_sum += x
+            self.seed_count += 1
+
+        if self.seed_count == self.seed_target:
+            if self.sum_mode:
+                # 種子之後的首個值開始平滑
+                self.value = self.seed_sum
+                self.ready = True
+                return np.nan
+            self.value = self.seed_sum / p
+            self.ready = True
+        return self.value
+
+
+class _ADX(_Undoable):
+    """TA-Lib ADX 的增量狀態"""
+
+    _fields = ("dx_sum", "dx_count", "value")
+
+    def __init__(self, period: int):
+        self.period = period
+        self.plus = _Wilder(period, sum_mode=True)
+        self.minus = _Wilder(period, sum_mode=True)
+        self.tr = _Wilder(period, sum_mode=True)
+        self.dx_sum = 0.0
+        self.dx_count = 0
+        self.value = np.nan
+
+    def load(self, plus: float, minus: float, tr: float, value: float):
+        self.plus.load(plus)
+        self.minus.load(minus)
+        self.tr.load(tr)
+        self.dx_count = self.period
+        self.value = value
+
+    def undo(self):
+        super().undo()
+        self.plus.undo()
+        self.minus.undo()
+        self.tr.undo()
+
+    def push(self, up: float, down: float, true_range: float) -> float:
+        self._save()
+        plus_dm = up if up > 0 and up > down else 0.0
+        minus_dm = down if down > 0 and down > up else 0.0
+
+        smooth_plus = self.plus.push(plus_dm)
+        smooth_minus = self.minus.push(minus_dm)
+        smooth_tr = self.tr.push(true_range)
+        if math.isnan(smooth_tr):
+            return self.value
+
+        dx = None
+        if not _is_zero(smooth_tr):
+            plus_di = 100 * smooth_plus / smooth_tr
+            minus_di = 100 * smooth_minus / smooth_tr
+            di_sum = plus_di + minus_di
+            if not _is_zero(di_sum):
+                dx = 100 * abs(minus_di - plus_di) / di_sum
+
+        p = self.period
+        if self.dx_count < p:
+            self.dx_sum += dx or 0.0
+            self.dx_count += 1
+            if self.dx_count == p:
+                self.value = self.dx_sum / p
+        elif dx is not None:
+            self.value = (self.value * (p - 1) + dx) / p
+        return self.value
+
+
+def _is_zero(value: float) -> bool:
+    return -1e-8 < value < 1e-8
+
+
+class IndicatorState:
+    """單一標的/週期的增量指標狀態
+
+    依賴後端的指標 (MACD/RSI/ATR/ADX/Stochastic/Williams %R/CCI/OBV/MFI) 與
+    TA-Lib 及 NumPy 後端的定義一致。
+    每次 update 記錄最後一根K線的撤銷信息 (被推入的組件 + 標量)，盤中K線被修正時 O(1) 回滾。
+    """
+
+    _STATE_FIELDS = ("bars", "last_timestamp", "prev_close", "prev_high", "prev_low",
+                     "prev_typical", "prev_volume", "last_volume", "macd", "obv")
+
+    def __init__(self, config: Optional[Dict] = None):
+        self.config = dict(DEFAULT_CONFIG)
+        if config:
+            self.config.update(config)
+        cfg = self.config
+
+        self.bars = 0
+        self.last_timestamp = None
+        self.prev_close = np.nan
+        self.prev_high = np.nan
+        self.prev_low = np.nan
+        self.prev_typical = np.nan
+        self.prev_volume = np.nan
+
+        # 趨勢
+        fast, slow = sorted((cfg['macd_fast'], cfg['macd_slow']))
+        self.sma = {p: _RollingWindow(p) for p in cfg['sma_periods']}
+        self.ema = {p: _EWM(p) for p in cfg['ema_periods']}
+        self.macd_fast = _SeededEMA(fast, skip=slow - fast)
+        self.macd_slow = _SeededEMA(slow)
+        self.macd_signal = _SeededEMA(cfg['macd_signal'])
+        self.macd = np.nan
+        self.adx = _ADX(cfg['adx_period'])
+
+        # 動量
+        self.rsi_gain = _Wilder(cfg['rsi_period'])
+        self.rsi_loss = _Wilder(cfg['rsi_period'])
+        self.stoch_high = _RollingExtreme(cfg['stoch_k'], "max")
+        self.stoch_low = _RollingExtreme(cfg['stoch_k'], "min")
+        self.stoch_slow_k = _RollingWindow(cfg['stoch_d'])
+        self.stoch_slow_d = _RollingWindow(cfg['stoch_d'])
+        self.willr_high = _RollingExtreme(cfg['willr_period'], "max")
+        self.willr_low = _RollingExtreme(cfg['willr_period'], "min")
+        self.cci_typical = _RollingWindow(cfg['cci_period'])
+
+        # 波動率
+        self.bb = _RollingWindow(cfg['bb_period'], with_var=True)
+        self.atr = _Wilder(cfg['atr_period'])
+        self.returns = _RollingWindow(30, with_var=True)
+
+        # 成交量
+        self.obv = 0.0
+        self.volume_sma = _RollingWindow(20)
+        self.mfi_positive = _RollingWindow(cfg['mfi_period'])
+        self.mfi_negative = _RollingWindow(cfg['mfi_period'])
+        self.last_volume = np.nan
+
+        self._undo_state = None
+        self._pushed = []
+
+    def warmup_bars(self) -> int:
+        """重放所需的最少K線數 (其餘歷史以向量化方式初始化)"""
+        cfg = self.config
+        return max(
+            max(cfg['sma_periods'], default=0),
+            cfg['bb_period'],
+            cfg['stoch_k'] + 2 * cfg['stoch_d'],
+            cfg['willr_period'],
+            cfg['cci_period'],
+            cfg['mfi_period'] + 1,
+            31,
+            20
+        ) + 1
+
+    def recursive_lookback(self) -> int:
+        """遞推類指標完成種子所需的K線數"""
+        cfg = self.config
+        return max(
+            max(cfg['macd_fast'], cfg['macd_slow']) + cfg['macd_signal'] - 1,
+            cfg['rsi_period'] + 1,
+            cfg['atr_period'] + 1,
+            2 * cfg['adx_period']
+        )
+
+    def seed(self, data: pd.DataFrame):
+        """以完整歷史初始化：遞推類指標向量化處理前段，窗口類指標只重放尾部"""
+        cfg = self.config
+        split = max(0, len(data) - self.warmup_bars())
+        if split < self.recursive_lookback():
+            split = 0
+
+        if split > 0:
+            head = data.iloc[:split]
+            close = head['Close'].to_numpy(dtype=float)
+            high = head['High'].to_numpy(dtype=float)
+            low = head['Low'].to_numpy(dtype=float)
+
+            for ema in self.ema.values():
+                ema.seed(close)
+
+            fast, slow = sorted((cfg['macd_fast'], cfg['macd_slow']))
+            self.macd_slow.load(kernels.ema(close, slow)[-1])
+            self.macd_fast.load(kernels.ema(close, fast, start=slow - fast)[-1])
+            line, signal, _ = kernels.macd(close, fast, slow, cfg['macd_signal'])
+            self.macd = line[-1]
+            self.macd_signal.load(signal[-1])
+
+            avg_gain, avg_loss = kernels.rsi_averages(close, cfg['rsi_period'])
+            self.rsi_gain.load(avg_gain[-1])
+            self.rsi_loss.load(avg_loss[-1])
+
+            self.atr.load(kernels.atr(high, low, close, cfg['atr_period'])[-1])
+
+            plus, minus, tr = kernels.directional_movement(high, low, close, cfg['adx_period'])
+            self.adx.load(plus[-1], minus[-1], tr[-1],
+                          kernels.adx(high, low, close, cfg['adx_period'])[-1])
+
+            if 'Volume' in head:
+                volume = head['Volume'].to_numpy(dtype=float)
+                self.obv = float(kernels.obv(close, volume)[-1])
+                self.last_volume = volume[-1]
+
+            self.bars = split
+            self.prev_close = close[-1]
+            self.prev_high = high[-1]
+            self.prev_low = low[-1]
+            self.prev_typical = (high[-1] + low[-1] + close[-1]) / 3
+
+        self.append(data.iloc[split:])
+
+    def append(self, data: pd.DataFrame):
+        """逐根追加新K線"""
+        has_volume = 'Volume' in data
+        closes = data['Close'].to_numpy(dtype=float)
+        highs = data['High'].to_numpy(dtype=float)
+        lows = data['Low'].to_numpy(dtype=float)
+        volumes = data['Volume'].to_numpy(dtype=float) if has_volume else None
+
+        for i in range(len(closes)):
+            volume = volumes[i] if has_volume else np.nan
+            self.update(highs[i], lows[i], closes[i], volume)
+            self.last_timestamp = data.index[i]
+
+    def undo(self) -> bool:
+        """撤銷最後一根K線 (僅一層)；無撤銷記錄時返回 False"""
+        if self._undo_state is None:
+            return False
+        for component in reversed(self._pushed):
+            component.undo()
+        for name, value in zip(self._STATE_FIELDS, self._undo_state):
+            setattr(self, name, value)
+        self._undo_state = None
+        self._pushed = []
+        return True
+
+    def _push(self, component, *args):
+        self._pushed.append(component)
+        return component.push(*args)
+
+    def update(self, high: float, low: float, close: float, volume: float = np.nan):
+        """以一根新K線更新所有狀態 - O(1) (CCI 的平均偏差為 O(cci_period))"""
+        self._undo_state = tuple(getattr(self, name) for name in self._STATE_FIELDS)
+        self._pushed = []
+        push = self._push
+        prev_close = self.prev_close
+        first_bar = self.bars == 0
+        typical = (high + low + close) / 3
+
+        # 趨勢
+        for sma in self.sma.values():
+            push(sma, close)
+        for ema in self.ema.values():
+            push(ema, close)
+        fast = push(self.macd_fast, close)
+        slow = push(self.macd_slow, close)
+        if self.macd_slow.ready:
+            line = fast - slow
+            push(self.macd_signal, line)
+            self.macd = line if self.macd_signal.ready else np.nan
+
+        if not first_bar:
+            true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+            push(self.adx, high - self.prev_high, self.prev_low - low, true_range)
+
+        # RSI (Wilder)
+        if not first_bar:
+            delta = close - prev_close
+            push(self.rsi_gain, delta if delta > 0 else 0.0)
+            push(self.rsi_loss, -delta if delta < 0 else 0.0)
+
+        # Stochastic (slowk/slowd 均為 SMA)
+        push(self.stoch_high, high)
+        push(self.stoch_low, low)
+        fast_k = _percent_range(close, self.stoch_high.current(), self.stoch_low.current())
+        if not math.isnan(fast_k):
+            push(self.stoch_slow_k, fast_k)
+            slow_k = self.stoch_slow_k.current_mean()
+            if not math.isnan(slow_k):
+                push(self.stoch_slow_d, slow_k)
+
+        # Williams %R / CCI
+        push(self.willr_high, high)
+        push(self.willr_low, low)
+        push(self.cci_typical, typical)
+
+        # 布林帶 / ATR / 歷史波動率
+        push(self.bb, close)
+        if not first_bar:
+            push(self.atr, true_range)
+            push(self.returns, close / prev_close - 1)
+
+        # 成交量
+        if not math.isnan(volume):
+            if first_bar:
+                self.obv = volume
+            elif close > prev_close:
+                self.obv += volume
+            elif close < prev_close:
+                self.obv -= volume
+
+            if not first_bar:
+                money_flow = typical * volume
+                push(self.mfi_positive, money_flow if typical > self.prev_typical else 0.0)
+                push(self.mfi_negative, money_flow if typical < self.prev_typical else 0.0)
+
+            push(self.volume_sma, volume)
+            self.prev_volume, self.last_volume = self.last_volume, volume
+
+        self.prev_close = close
+        self.prev_high = high
+        self.prev_low = low
+        self.prev_typical = typical
+        self.bars += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """輸出最新一根K線的指標值 (結構與 calculate_all_indicators 各分類一致)"""
+        cfg = self.config
+        n = self.bars
+
+        trend = {}
+        for period, sma in self.sma.items():
+            if n >= period:
+                trend[f'sma_{period}'] = sma.current_mean()
+        for period, ema in self.ema.items():
+            if n >= period:
+                trend[f'ema_{period}'] = ema.current()
+        if n >= cfg['macd_slow']:
+            signal = self.macd_signal.value if self.macd_signal.ready else np.nan
+            trend['macd'] = self.macd
+            trend['macd_signal'] = signal
+            trend['macd_histogram'] = self.macd - signal
+        if n >= cfg['adx_period']:
+            trend['adx'] = self.adx.value
+
+        momentum = {}
+        if n >= cfg['rsi_period']:
+            rsi = np.nan
+            if self.rsi_gain.ready:
+                gain, loss = self.rsi_gain.value, self.rsi_loss.value
+                total = gain + loss
+                rsi = 0.0 if _is_zero(total) else 100 * gain / total
+            momentum['rsi'] = rsi
+        if n >= cfg['stoch_k']:
+            slow_d = self.stoch_slow_d.current_mean()
+            momentum['stoch_k'] = np.nan if math.isnan(slow_d) else self.stoch_slow_k.current_mean()
+            momentum['stoch_d'] = slow_d
+        if n >= cfg['willr_period']:
+            momentum['williams_r'] = self._williams_r()
+        if n >= cfg['cci_period']:
+            momentum['cci'] = self._cci()
+
+        volatility = {}
+        if n >= cfg['bb_period']:
+            middle = self.bb.current_mean()
+            std = self.bb.current_std()
+            upper = middle + std * cfg['bb_std']
+            lower = middle - std * cfg['bb_std']
+            volatility['bb_upper'] = upper
+            volatility['bb_middle'] = middle
+            volatility['bb_lower'] = lower
+            volatility['bb_width'] = (upper - lower) / middle
+        if n >= cfg['atr_period']:
+            volatility['atr'] = self.atr.value if self.atr.ready else np.nan
+        if n >= 30:
+            volatility['historical_volatility'] = self.returns.current_std() * np.sqrt(252)
+
+        result = {
+            "trend": trend,
+            "momentum": momentum,
+            "volatility": volatility,
+            "timestamp": self.last_timestamp,
+            "bars": n
+        }
+
+        if not math.isnan(self.last_volume):
+            volume = {}
+            if n >= 2:
+                volume['obv'] = self.obv
+                volume['volume_ratio'] = self.last_volume / self.prev_volume
+            if n >= 20:
+                volume['volume_sma'] = self.volume_sma.current_mean()
+            if n >= cfg['mfi_period']:
+                volume['mfi'] = self._mfi()
+            result['volume'] = volume
+
+        return result
+
+    def _cci(self) -> float:
+        window = self.cci_typical
+        if len(window.values) < window.window:
+            return np.nan
+        # 均值按窗口重新求和 (滑動累加和有浮點漂移，平坦窗口會留下殘差)
+        average = sum(window.values) / window.window
+        mean_dev = sum(abs(v - average) for v in window.values) / window.window
+        deviation = window.values[-1] - average
+        if deviation == 0 or mean_dev <= kernels.FLAT_TOLERANCE * abs(average):
+            return 0.0
+        return deviation / (0.015 * mean_dev)
+
+    def _williams_r(self) -> float:
+        highest, lowest = self.willr_high.current(), self.willr_low.current()
+        if math.isnan(highest) or math.isnan(lowest):
+            return np.nan
+        spread = highest - lowest
+        if spread == 0:
+            return 0.0
+        return -100 * (highest - self.prev_close) / spread
+
+    def _mfi(self) -> float:
+        positive, negative = self.mfi_positive, self.mfi_negative
+        if len(positive.values) < positive.window:
+            return np.nan
+        total = positive.total + negative.total
+        if total < 1.0:
+            return 0.0
+        return 100 * positive.total / total
+
+
+def _percent_range(close: float, highest: float, lowest: float) -> float:
+    """(close - 最低) / (最高 - 最低) * 100；區間為零時返回 0 (與 TA-Lib 一致)"""
+    if math.isnan(highest) or math.isnan(lowest):
+        return np.nan
+    spread = highest - lowest
+    if spread == 0:
+        return 0.0
+    return 100 * (close - lowest) / spread
+
+
+class IncrementalIndicatorEngine:
+    """增量指標引擎 - 按 (symbol, interval) 管理狀態
+
+    最多保留 max_states 個狀態 (缺省 INCREMENTAL_MAX_STATES)，按最近更新順序淘汰；
+    被淘汰的標的下次更新時由完整歷史重建。
+    """
+
+    def __init__(self, max_states: Optional[int] = None):
+        self.max_states = max_states or get_settings().INCREMENTAL_MAX_STATES
+        self.states: "OrderedDict[Tuple[str, str], IndicatorState]" = OrderedDict()
+
+    def update(self, symbol: str, interval: str, data: pd.DataFrame,
+               config: Optional[Dict] = None) -> Dict[str, Any]:
+        """以最新歷史數據更新狀態，只處理上次之後的新K線"""
+        if data is None or data.empty:
+            return {"error": "數據不足"}
+
+        key = (symbol.upper(), interval)
+        state = self.states.get(key)
+        if state is not None:
+            self.states.move_to_end(key)
+
+        if state is not None and config and any(
+                state.config.get(k) != v for k, v in config.items()):
+            state = None
+
+        if state is None or data.index[-1] < state.last_timestamp:
+            return self._rebuild(key, data, config)
+
+        last_timestamp = state.last_timestamp
+        if last_timestamp not in data.index:
+            return self._rebuild(key, data, config)
+
+        # 上次的最後一根K線可能是盤中未收盤K線，之後已被修正：
+        # 無論是否有新K線，都先撤銷該K線，再由它起重新應用
+        if not state.undo():
+            return self._rebuild(key, data, config)
+        state.append(data.loc[data.index >= last_timestamp])
+
+        return state.snapshot()
+
+    def _rebuild(self, key: Tuple[str, str], data: pd.DataFrame,
+                 config: Optional[Dict]) -> Dict[str, Any]:
+        """由完整歷史重建狀態"""
+        logger.info(f"重建增量指標狀態 {key[0]} {key[1]}: {len(data)} 行")
+        state = IndicatorState(config)
+        state.seed(data)
+        self.states[key] = state
+        self.states.move_to_end(key)
+        while len(self.states) > self.max_states:
+            self.states.popitem(last=False)
+        return state.snapshot()
+
+    def reset(self, symbol: Optional[str] = None, interval: Optional[str] = None):
+        """清除狀態"""
+        if symbol is None:
+            self.states.clear()
+            return
+
+        for key in [k for k in self.states if k[0] == symbol.upper()
+                    and (interval is None or k[1] == interval)]:
+            self.states.pop(key, None)
+
+
+# 全局增量指標引擎實例
+incremental_engine = IncrementalIndicatorEngine()
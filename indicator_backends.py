@@ -0,0 +1,203 @@
+# app/services/indicator_backends.py
+# 指標計算後端 - talib / pandas_ta / numpy 可選
+# 所有後端接收 NumPy 數組並返回 NumPy 數組；numpy 後端與 TA-Lib 數值一致
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from . import indicator_kernels as kernels
+
+# 嘗試導入 TA-Lib，如果失敗則使用 NumPy 內建計算
+try:
+    import talib
+    HAS_TALIB = True
+    logger.info("✅ TA-Lib 可用")
+except ImportError:
+    HAS_TALIB = False
+    logger.warning("⚠️ TA-Lib 不可用，使用 NumPy 內建計算")
+
+try:
+    import pandas_ta as ta
+    HAS_PANDAS_TA = True
+    logger.info("✅ pandas-ta 可用")
+except ImportError:
+    HAS_PANDAS_TA = False
+    logger.warning("⚠️ pandas-ta 不可用")
+
+
+class NumpyBackend:
+    """純 NumPy 後端 (無需編譯依賴)
+
+    true_range_values / delta 參數允許調用方傳入共享的中間結果。
+    """
+
+    name = "numpy"
+
+    def macd(self, close: np.ndarray, fast: int, slow: int,
+             signal: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return kernels.macd(close, fast, slow, signal)
+
+    def adx(self, high, low, close, period: int = 14, true_range_values=None) -> np.ndarray:
+        return kernels.adx(high, low, close, period, true_range_values)
+
+    def rsi(self, close, period: int = 14, delta=None) -> np.ndarray:
+        return kernels.rsi(close, period, delta)
+
+    def stoch(self, high, low, close, fastk_period: int, slowk_period: int,
+              slowd_period: int) -> Tuple[np.ndarray, np.ndarray]:
+        return kernels.stoch(high, low, close, fastk_period, slowk_period, slowd_period)
+
+    def willr(self, high, low, close, period: int = 14) -> np.ndarray:
+        return kernels.willr(high, low, close, period)
+
+    def cci(self, high, low, close, period: int = 20) -> np.ndarray:
+        return kernels.cci(high, low, close, period)
+
+    def atr(self, high, low, close, period: int = 14, true_range_values=None) -> np.ndarray:
+        return kernels.atr(high, low, close, period, true_range_values)
+
+    def obv(self, close, volume, delta=None) -> np.ndarray:
+        return kernels.obv(close, volume, delta)
+
+    def mfi(self, high, low, close, volume, period: int = 14) -> np.ndarray:
+        return kernels.mfi(high, low, close, volume, period)
+
+
+class TalibBackend(NumpyBackend):
+    """TA-Lib 後端 (C 實現，共享中間結果參數會被忽略)"""
+
+    name = "talib"
+
+    def macd(self, close, fast, slow, signal):
+        return talib.MACD(_f64(close), fastperiod=fast, slowperiod=slow, signalperiod=signal)
+
+    def adx(self, high, low, close, period=14, true_range_values=None):
+        return talib.ADX(_f64(high), _f64(low), _f64(close), timeperiod=period)
+
+    def rsi(self, close, period=14, delta=None):
+        return talib.RSI(_f64(close), timeperiod=period)
+
+    def stoch(self, high, low, close, fastk_period, slowk_period, slowd_period):
+        return talib.STOCH(
+            _f64(high), _f64(low), _f64(close),
+            fastk_period=fastk_period,
+            slowk_period=slowk_period,
+            slowd_period=slowd_period
+        )
+
+    def willr(self, high, low, close, period=14):
+        return talib.WILLR(_f64(high), _f64(low), _f64(close), timeperiod=period)
+
+    def cci(self, high, low, close, period=20):
+        return talib.CCI(_f64(high), _f64(low), _f64(close), timeperiod=period)
+
+    def atr(self, high, low, close, period=14, true_range_values=None):
+        return talib.ATR(_f64(high), _f64(low), _f64(close), timeperiod=period)
+
+    def obv(self, close, volume, delta=None):
+        return talib.OBV(_f64(close), _f64(volume))
+
+    def mfi(self, high, low, close, volume, period=14):
+        return talib.MFI(_f64(high), _f64(low), _f64(close), _f64(volume), timeperiod=period)
+
+
+class PandasTaBackend(NumpyBackend):
+    """pandas-ta 後端 (預熱段及平滑方式與 TA-Lib 略有差異)"""
+
+    name = "pandas_ta"
+
+    def macd(self, close, fast, slow, signal):
+        result = ta.macd(pd.Series(close), fast=fast, slow=slow, signal=signal, talib=False)
+        return (_column(result, "MACD_", len(close)),
+                _column(result, "MACDs_", len(close)),
+                _column(result, "MACDh_", len(close)))
+
+    def adx(self, high, low, close, period=14, true_range_values=None):
+        result = ta.adx(pd.Series(high), pd.Series(low), pd.Series(close), length=period, talib=False)
+        return _column(result, "ADX_", len(close))
+
+    def rsi(self, close, period=14, delta=None):
+        return _values(ta.rsi(pd.Series(close), length=period, talib=False), len(close))
+
+    def stoch(self, high, low, close, fastk_period, slowk_period, slowd_period):
+        result = ta.stoch(pd.Series(high), pd.Series(low), pd.Series(close),
+                          k=fastk_period, d=slowd_period, smooth_k=slowk_period, talib=False)
+        return _column(result, "STOCHk_", len(close)), _column(result, "STOCHd_", len(close))
+
+    def willr(self, high, low, close, period=14):
+        return _values(ta.willr(pd.Series(high), pd.Series(low), pd.Series(close),
+                                length=period, talib=False), len(close))
+
+    def cci(self, high, low, close, period=20):
+        return _values(ta.cci(pd.Series(high), pd.Series(low), pd.Series(close),
+                              length=period, talib=False), len(close))
+
+    def atr(self, high, low, close, period=14, true_range_values=None):
+        return _values(ta.atr(pd.Series(high), pd.Series(low), pd.Series(close),
+                              length=period, talib=False), len(close))
+
+    def obv(self, close, volume, delta=None):
+        return _values(ta.obv(pd.Series(close), pd.Series(volume), talib=False), len(close))
+
+    def mfi(self, high, low, close, volume, period=14):
+        return _values(ta.mfi(pd.Series(high), pd.Series(low), pd.Series(close),
+                              pd.Series(volume), length=period, talib=False), len(close))
+
+
+def _f64(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+
+def _values(result: Optional[pd.Series], length: int) -> np.ndarray:
+    """pandas-ta 數據不足時返回 None，統一為 NaN 數組"""
+    if result is None:
+        return np.full(length, np.nan)
+    return result.to_numpy(dtype=float)
+
+
+def _column(result: Optional[pd.DataFrame], prefix: str, length: int) -> np.ndarray:
+    if result is None:
+        return np.full(length, np.nan)
+    for column in result.columns:
+        if column.startswith(prefix):
+            return result[column].to_numpy(dtype=float)
+    return np.full(length, np.nan)
+
+
+BACKENDS = {
+    "numpy": NumpyBackend,
+    "talib": TalibBackend,
+    "pandas_ta": PandasTaBackend
+}
+
+_AVAILABLE = {
+    "numpy": True,
+    "talib": HAS_TALIB,
+    "pandas_ta": HAS_PANDAS_TA
+}
+
+_instances: Dict[str, NumpyBackend] = {}
+
+
+def available_backends() -> Dict[str, bool]:
+    return dict(_AVAILABLE)
+
+
+def get_backend(name: Optional[str] = "auto") -> NumpyBackend:
+    """選擇指標後端；auto 優先 TA-Lib，否則使用 NumPy (兩者數值一致)"""
+    name = (name or "auto").lower()
+    if name == "auto":
+        name = "talib" if HAS_TALIB else "numpy"
+
+    if name not in BACKENDS:
+        raise ValueError(f"不支援的指標後端: {name}")
+    if not _AVAILABLE[name]:
+        logger.warning(f"⚠️ 指標後端 {name} 不可用，使用 numpy")
+        name = "numpy"
+
+    if name not in _instances:
+        _instances[name] = BACKENDS[name]()
+    return _instances[name]
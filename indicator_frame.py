@@ -0,0 +1,155 @@
+# app/services/indicator_frame.py
+# 緊湊指標結果 - 共享時間索引 + 連續 2-D 數組，各指標為零拷貝視圖
+# 實現 Mapping 接口，可按原嵌套字典的方式讀取 (results['trend']['rsi'] 等)
+
+from collections.abc import Mapping
+from typing import Dict, List, Tuple, Any, Optional, Iterator
+
+import numpy as np
+import pandas as pd
+
+# 存放為數組的指標分類；其餘鍵 (support_resistance / signals / technical_score 等) 原樣保存
+SERIES_CATEGORIES = ['trend', 'momentum', 'volatility', 'volume']
+
+
+class IndicatorFrame(Mapping):
+    """指標結果的列式存儲
+
+    values 形狀為 (指標數, K線數)，每個指標對應一行連續內存；
+    columns 為 (分類, 指標名) 列表，extras 保存非序列結果。
+    """
+
+    __slots__ = ("index", "values", "columns", "extras", "categories", "_positions")
+
+    def __init__(self, index: pd.Index, values: np.ndarray,
+                 columns: List[Tuple[str, str]], extras: Optional[Dict[str, Any]] = None,
+                 categories: Optional[List[str]] = None):
+        if values.shape != (len(columns), len(index)):
+            raise ValueError(f"指標數組形狀 {values.shape} 與列/索引不符")
+        self.index = index
+        # 緩存中的結果以零拷貝視圖交給調用方，設為唯讀以免調用方修改緩存內容
+        values.flags.writeable = False
+        self.values = values
+        self.columns = list(columns)
+        self.extras = dict(extras or {})
+        # 保留結果中出現過的分類 (包括數據不足時的空分類)
+        present = set(categories or []) | {cat for cat, _ in self.columns}
+        self.categories = [category for category in SERIES_CATEGORIES if category in present]
+        self._positions = {column: i for i, column in enumerate(self.columns)}
+
+    @classmethod
+    def from_results(cls, results: Dict[str, Any], index: Optional[pd.Index] = None,
+                     dtype: Any = np.float64) -> "IndicatorFrame":
+        """由 calculate_all_indicators 的嵌套字典構建
+
+        index 缺省時取首個指標序列的索引；長度不同的序列按索引對齊 (缺失處為 NaN)。
+        """
+        columns = []
+        arrays = []
+        for category in SERIES_CATEGORIES:
+            for name, series in results.get(category, {}).items():
+                if isinstance(series, pd.Series):
+                    if index is None:
+                        index = series.index
+                    columns.append((category, name))
+                    arrays.append(series)
+
+        if index is None:
+            index = pd.DatetimeIndex([])
+
+        values = np.empty((len(arrays), len(index)), dtype=dtype)
+        for i, series in enumerate(arrays):
+            if len(series) != len(index) or not series.index.equals(index):
+                series = series.reindex(index)
+            values[i] = series.to_numpy(dtype=dtype)
+
+        extras = {key: value for key, value in results.items() if key not in SERIES_CATEGORIES}
+        # 分類內的非序列值 (一般不存在) 放入 extras 以免丟失
+        for category in SERIES_CATEGORIES:
+            if category in results:
+                scalars = {k: v for k, v in results[category].items() if not isinstance(v, pd.Series)}
+                if scalars:
+                    extras.setdefault("_scalars", {})[category] = scalars
+
+        categories = [category for category in SERIES_CATEGORIES if category in results]
+        return cls(index, values, columns, extras, categories)
+
+    # ------------------------------------------------------------ 數組訪問
+
+    def array(self, category: str, name: str) -> np.ndarray:
+        """單個指標的零拷貝數組視圖 (唯讀)"""
+        return self.values[self._positions[(category, name)]]
+
+    def series(self, category: str, name: str) -> pd.Series:
+        """單個指標的 Series (與 values 共享內存)"""
+        return pd.Series(self.array(category, name), index=self.index, name=name, copy=False)
+
+    def category(self, category: str) -> Dict[str, pd.Series]:
+        """某分類的 {指標名: Series}，與原嵌套字典的分類結構相同"""
+        result = {
+            name: self.series(cat, name)
+            for cat, name in self.columns if cat == category
+        }
+        result.update(self.extras.get("_scalars", {}).get(category, {}))
+        return result
+
+    def names(self, category: Optional[str] = None) -> List[str]:
+        return [name for cat, name in self.columns if category is None or cat == category]
+
+    def last(self, category: Optional[str] = None) -> Dict[str, float]:
+        """最新一根K線的指標值"""
+        if not len(self.index):
+            return {}
+        return {
+            name: float(self.values[i, -1])
+            for i, (cat, name) in enumerate(self.columns)
+            if category is None or cat == category
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        """寬表 DataFrame，列為 (分類, 指標名) MultiIndex"""
+        return pd.DataFrame(
+            self.values.T,
+            index=self.index,
+            columns=pd.MultiIndex.from_tuples(self.columns, names=["category", "indicator"])
+        )
+
+    def astype(self, dtype: Any) -> "IndicatorFrame":
+        """轉換數值精度 (例如 float32 以減半緩存內存)"""
+        if self.values.dtype == np.dtype(dtype):
+            return self
+        return IndicatorFrame(self.index, self.values.astype(dtype), self.columns,
+                              self.extras, self.categories)
+
+    @property
+    def nbytes(self) -> int:
+        """數組及索引佔用的字節數 (供緩存按大小淘汰)"""
+        return int(self.values.nbytes + self.index.memory_usage(deep=False))
+
+    # ------------------------------------------------------------ 兼容嵌套字典
+
+    def to_dict(self) -> Dict[str, Any]:
+        """轉換為 calculate_all_indicators 原有的嵌套字典 (Series 為唯讀零拷貝視圖)"""
+        results = {category: self.category(category) for category in self.categories}
+        results.update({k: v for k, v in self.extras.items() if k != "_scalars"})
+        return results
+
+    def _keys(self) -> List[str]:
+        return self.categories + [k for k in self.extras if k != "_scalars"]
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.categories:
+            return self.category(key)
+        if key != "_scalars" and key in self.extras:
+            return self.extras[key]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def __repr__(self) -> str:
+        return (f"IndicatorFrame({len(self.columns)} indicators × {len(self.index)} bars, "
+                f"dtype={self.values.dtype}, extras={list(self.extras)})")
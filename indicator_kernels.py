@@ -0,0 +1,409 @@
+# app/services/indicator_kernels.py
+# 純 NumPy 指標核心 - 數值與 TA-Lib 對齊 (Wilder 平滑、SMA 種子 EMA、相同的預熱長度)
+# 無需編譯 TA-Lib 的精簡容器亦可得到一致結果
+# 輸入可為一維序列或 (時間 × 標的) 二維數組，沿 axis=0 計算 (批量面板一次計算所有標的)
+
+from typing import Any, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# TA-Lib 的 TA_IS_ZERO 閾值
+_ZERO = 1e-8
+
+# 平坦窗口判定的相對容差：窗口均值的浮點殘差 (約 1 ulp) 不應被當作真實偏差
+FLAT_TOLERANCE = 1e-12
+
+
+def _is_zero(values: np.ndarray) -> np.ndarray:
+    return (values > -_ZERO) & (values < _ZERO)
+
+
+def _nan_like(values: np.ndarray) -> np.ndarray:
+    return np.full(np.shape(values), np.nan)
+
+
+def _along_time(weights: np.ndarray, ndim: int) -> np.ndarray:
+    """一維權重沿 axis=0 廣播到 ndim 維數組"""
+    return weights.reshape((-1,) + (1,) * (ndim - 1))
+
+
+def decay_filter(values: np.ndarray, decay: float, initial: Any = 0.0) -> np.ndarray:
+    """向量化一階線性遞推 y[t] = decay * y[t-1] + values[t]，y[-1] = initial
+
+    分塊計算：塊內以縮放累加一次算出，塊間的進位只需有限項 (decay ** 塊長 很小)，
+    塊長按 decay ** -塊長 <= 1e4 選取以控制浮點誤差。
+    二維輸入時逐列遞推，initial 可為每列的初值。
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n == 0:
+        return values.copy()
+    if decay <= 0:
+        out = values.copy()
+        out[0] += decay * initial
+        return out
+
+    block = max(1, min(n, int(np.log(1e4) / -np.log(decay)))) if decay < 1 else 1
+    if block == 1:
+        # decay 接近 1 時退化為逐點遞推
+        out = np.empty(values.shape)
+        prev = initial
+        for i in range(n):
+            prev = decay * prev + values[i]
+            out[i] = prev
+        return out
+
+    ndim = values.ndim
+    pad = (-n) % block
+    blocks = np.concatenate([values, np.zeros((pad,) + values.shape[1:])])
+    blocks = blocks.reshape((-1, block) + values.shape[1:])
+    powers = _along_time(decay ** np.arange(block), ndim)
+
+    # 塊內 (初值為 0) 的遞推結果
+    local = np.cumsum(blocks / powers, axis=1) * powers
+
+    # 塊末值之間的遞推：C[b] = A * C[b-1] + local[b, -1]，A = decay ** block
+    ends = local[:, -1]
+    step = decay ** block
+    carries = ends.copy()
+    factor = step
+    shift = 1
+    while shift < len(ends) and factor > 1e-18:
+        carries[shift:] += factor * ends[:-shift]
+        factor *= step
+        shift += 1
+    initial = np.broadcast_to(np.asarray(initial, dtype=float), values.shape[1:])
+    if initial.any():
+        carries += _along_time(step ** np.arange(1, len(ends) + 1), ndim) * initial
+
+    previous = np.concatenate([initial[None], carries[:-1]])
+    out = local + previous[:, None] * _along_time(decay ** np.arange(1, block + 1), ndim)
+    return out.reshape((-1,) + values.shape[1:])[:n]
+
+
+def rolling_sum(values: np.ndarray, period: int, chunk: int = 4096) -> np.ndarray:
+    """滑動窗口求和 (前 period-1 個為 NaN)
+
+    以重疊分塊的局部累加相減，避免全序列累加造成的精度損失，複雜度 O(n)。
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    out = _nan_like(values)
+    if period <= 0 or n < period:
+        return out
+
+    chunk = max(chunk, period)
+    tail = values.shape[1:]
+    padded = np.concatenate([np.zeros((period,) + tail), values, np.zeros(((-n) % chunk,) + tail)])
+    # 窗口維度位於最後：(塊數, [列,] chunk + period)
+    windows = sliding_window_view(padded, chunk + period, axis=0)[::chunk]
+    sums = np.cumsum(windows, axis=-1)
+    rolled = np.moveaxis(sums[..., period:] - sums[..., :-period], -1, 1)
+    rolled = rolled.reshape((-1,) + tail)[:n]
+
+    out[period - 1:] = rolled[period - 1:]
+    return out
+
+
+def rolling_mean(values: np.ndarray, period: int) -> np.ndarray:
+    return rolling_sum(values, period) / period
+
+
+def rolling_max(values: np.ndarray, period: int) -> np.ndarray:
+    return _rolling_extreme(values, period, np.maximum)
+
+
+def rolling_min(values: np.ndarray, period: int) -> np.ndarray:
+    return _rolling_extreme(values, period, np.minimum)
+
+
+def _rolling_extreme(values: np.ndarray, period: int, ufunc) -> np.ndarray:
+    """van Herk/Gil-Werman 滑動極值：分塊前綴/後綴累積極值，複雜度 O(n) 與窗口無關"""
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    out = _nan_like(values)
+    if period <= 0 or n < period:
+        return out
+
+    fill = -np.inf if ufunc is np.maximum else np.inf
+    tail = values.shape[1:]
+    blocks = np.concatenate([values, np.full(((-n) % period,) + tail, fill)])
+    blocks = blocks.reshape((-1, period) + tail)
+    prefix = ufunc.accumulate(blocks, axis=1).reshape((-1,) + tail)
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape((-1,) + tail)
+
+    # 窗口 [i, i+period-1] 跨越至多兩個塊：前塊的後綴 + 後塊的前綴
+    out[period - 1:] = ufunc(suffix[:n - period + 1], prefix[period - 1:n])
+    return out
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """真實範圍 (TRANGE)，首個值為 NaN"""
+    high, low, close = (np.asarray(a, dtype=float) for a in (high, low, close))
+    out = _nan_like(close)
+    if len(close) > 1:
+        prev_close = close[:-1]
+        out[1:] = np.maximum.reduce([
+            high[1:] - low[1:],
+            np.abs(high[1:] - prev_close),
+            np.abs(low[1:] - prev_close)
+        ])
+    return out
+
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    return rolling_mean(values, period)
+
+
+def ema(values: np.ndarray, period: int, start: int = 0) -> np.ndarray:
+    """TA-Lib EMA：以首 period 個值的 SMA 作種子，k = 2 / (period + 1)
+
+    start 為種子窗口的起點 (TA-Lib MACD 以此對齊快慢線)。
+    """
+    values = np.asarray(values, dtype=float)
+    out = _nan_like(values)
+    seed_end = start + period
+    if period <= 0 or len(values) < seed_end:
+        return out
+
+    k = 2.0 / (period + 1)
+    seed = values[start:seed_end].mean(axis=0)
+    out[seed_end - 1] = seed
+    out[seed_end:] = decay_filter(k * values[seed_end:], 1 - k, seed)
+    return out
+
+
+def wilder(values: np.ndarray, period: int, seed: float) -> np.ndarray:
+    """Wilder 平滑：y = (y * (period - 1) + x) / period"""
+    decay = (period - 1) / period
+    return decay_filter(np.asarray(values, dtype=float) / period, decay, seed)
+
+
+def macd(close: np.ndarray, fast: int = 12, slow: int = 26,
+         signal: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    close = np.asarray(close, dtype=float)
+    if slow < fast:
+        fast, slow = slow, fast
+    n = len(close)
+    lookback = slow + signal - 2
+    nan = _nan_like(close)
+    if n <= lookback:
+        return nan, nan.copy(), nan.copy()
+
+    # 快線種子窗口與慢線對齊，兩者均自 slow - 1 開始輸出
+    slow_ema = ema(close, slow)
+    fast_ema = ema(close, fast, start=slow - fast)
+    line = fast_ema - slow_ema
+
+    signal_line = _nan_like(close)
+    signal_line[slow - 1:] = ema(line[slow - 1:], signal)
+
+    line[:lookback] = np.nan
+    return line, signal_line, line - signal_line
+
+
+def rsi_averages(close: np.ndarray, period: int = 14,
+                 delta: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Wilder 平均漲幅/跌幅，自第 period 根K線起對齊 (長度 n - period)"""
+    close = np.asarray(close, dtype=float)
+    diff = np.diff(close, axis=0) if delta is None else np.asarray(delta, dtype=float)[1:]
+    gains = np.where(diff > 0, diff, 0.0)
+    losses = np.where(diff < 0, -diff, 0.0)
+
+    shape = (len(diff) - period + 1,) + diff.shape[1:]
+    avg_gain = np.empty(shape)
+    avg_loss = np.empty(shape)
+    avg_gain[0] = gains[:period].sum(axis=0) / period
+    avg_loss[0] = losses[:period].sum(axis=0) / period
+    avg_gain[1:] = wilder(gains[period:], period, avg_gain[0])
+    avg_loss[1:] = wilder(losses[period:], period, avg_loss[0])
+    return avg_gain, avg_loss
+
+
+def rsi(close: np.ndarray, period: int = 14, delta: Optional[np.ndarray] = None) -> np.ndarray:
+    """Wilder RSI；delta 可傳入已計算的 close.diff() (首個為 NaN)"""
+    close = np.asarray(close, dtype=float)
+    out = _nan_like(close)
+    if len(close) <= period:
+        return out
+
+    avg_gain, avg_loss = rsi_averages(close, period, delta)
+    total = avg_gain + avg_loss
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[period:] = np.where(_is_zero(total), 0.0, 100 * avg_gain / total)
+    return out
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14,
+        true_range_values: Optional[np.ndarray] = None) -> np.ndarray:
+    """Wilder ATR；可傳入共享的真實範圍"""
+    tr = true_range(high, low, close) if true_range_values is None else np.asarray(true_range_values)
+    out = _nan_like(tr)
+    if len(tr) <= period:
+        return out
+
+    seed = tr[1:period + 1].mean(axis=0)
+    out[period] = seed
+    out[period + 1:] = wilder(tr[period + 1:], period, seed)
+    return out
+
+
+def directional_movement(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14,
+                         true_range_values: Optional[np.ndarray] = None
+                         ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Wilder 平滑的 +DM/-DM/TR 累計值，自第 period 根K線起對齊 (長度 n - period)
+
+    前 period-1 個值求和作種子，其後 s = s - s/period + x。
+    """
+    high, low, close = (np.asarray(a, dtype=float) for a in (high, low, close))
+    tr = true_range(high, low, close) if true_range_values is None else np.asarray(true_range_values)
+    up = np.diff(high, axis=0)
+    down = -np.diff(low, axis=0)
+    plus_dm = np.where((up > 0) & (up > down), up, 0.0)
+    minus_dm = np.where((down > 0) & (down > up), down, 0.0)
+    tr = tr[1:]
+
+    decay = 1 - 1 / period
+    seed = period - 1
+    smooth_plus = decay_filter(plus_dm[seed:], decay, plus_dm[:seed].sum(axis=0))
+    smooth_minus = decay_filter(minus_dm[seed:], decay, minus_dm[:seed].sum(axis=0))
+    smooth_tr = decay_filter(tr[seed:], decay, tr[:seed].sum(axis=0))
+    return smooth_plus, smooth_minus, smooth_tr
+
+
+def directional_index(smooth_plus, smooth_minus, smooth_tr) -> Tuple[np.ndarray, np.ndarray]:
+    """由平滑的 DM/TR 計算 DX，並返回 DX 是否有效 (TA-Lib 對零分母跳過)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = 100 * smooth_plus / smooth_tr
+        minus_di = 100 * smooth_minus / smooth_tr
+        di_sum = plus_di + minus_di
+        dx = 100 * np.abs(minus_di - plus_di) / di_sum
+    valid = ~_is_zero(smooth_tr) & ~_is_zero(di_sum)
+    return dx, valid
+
+
+def adx(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14,
+        true_range_values: Optional[np.ndarray] = None) -> np.ndarray:
+    """TA-Lib ADX (Wilder 平滑的 +DM/-DM/TR，DX 以 Wilder 平均)"""
+    close = np.asarray(close, dtype=float)
+    out = _nan_like(close)
+    lookback = 2 * period - 1
+    if period < 2 or len(close) <= lookback:
+        return out
+
+    dx, valid = directional_index(
+        *directional_movement(high, low, close, period, true_range_values)
+    )
+
+    # 首個 ADX 為前 period 個 DX 的平均 (無效 DX 記為 0)
+    first = np.where(valid[:period], dx[:period], 0.0).sum(axis=0) / period
+    rest_dx = dx[period:]
+    rest_valid = valid[period:]
+
+    if rest_valid.all():
+        adx_values = wilder(rest_dx, period, first)
+    else:
+        # TA-Lib 在 DX 無效時保持上一個 ADX，非恆定係數，逐點遞推 (二維時各列同步)
+        adx_values = np.empty(rest_dx.shape)
+        prev = first
+        for i in range(len(rest_dx)):
+            prev = np.where(rest_valid[i], (prev * (period - 1) + rest_dx[i]) / period, prev)
+            adx_values[i] = prev
+
+    out[lookback] = first
+    out[lookback + 1:] = adx_values
+    return out
+
+
+def stoch(high: np.ndarray, low: np.ndarray, close: np.ndarray, fastk_period: int = 14,
+          slowk_period: int = 3, slowd_period: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+    """TA-Lib STOCH (slowk/slowd 均為 SMA)"""
+    close = np.asarray(close, dtype=float)
+    lowest = rolling_min(low, fastk_period)
+    highest = rolling_max(high, fastk_period)
+    spread = highest - lowest
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fast_k = np.where(spread == 0, 0.0, 100 * (close - lowest) / spread)
+    fast_k[:fastk_period - 1] = np.nan
+
+    slow_k = _nan_like(close)
+    slow_d = _nan_like(close)
+    start = fastk_period - 1
+    if len(close) > start:
+        slow_k[start:] = sma(fast_k[start:], slowk_period)
+        start += slowk_period - 1
+    if len(close) > start:
+        slow_d[start:] = sma(slow_k[start:], slowd_period)
+        start += slowd_period - 1
+    slow_k[:start] = np.nan
+    return slow_k, slow_d
+
+
+def willr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    close = np.asarray(close, dtype=float)
+    highest = rolling_max(high, period)
+    lowest = rolling_min(low, period)
+    spread = highest - lowest
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = np.where(spread == 0, 0.0, -100 * (highest - close) / spread)
+    out[:period - 1] = np.nan
+    return out
+
+
+def cci(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 20) -> np.ndarray:
+    high, low, close = (np.asarray(a, dtype=float) for a in (high, low, close))
+    out = _nan_like(close)
+    if len(close) < period:
+        return out
+
+    typical = (high + low + close) / 3
+    # 窗口維度位於最後：(窗口數, [列,] period)
+    windows = sliding_window_view(typical, period, axis=0)
+
+    # 均值與平均絕對偏差逐窗口計算 (與 TA-Lib 相同，不用累加和相減，平坦窗口不留殘差)，分塊控制內存
+    chunk = max(1, (1 << 16) // max(1, typical[0].size))
+    average = np.empty(windows.shape[:-1])
+    mean_dev = np.empty(windows.shape[:-1])
+    for s in range(0, len(windows), chunk):
+        block = windows[s:s + chunk]
+        average[s:s + chunk] = block.mean(axis=-1)
+        mean_dev[s:s + chunk] = np.abs(block - average[s:s + chunk, ..., None]).mean(axis=-1)
+
+    deviation = typical[period - 1:] - average
+    flat = mean_dev <= FLAT_TOLERANCE * np.abs(average)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[period - 1:] = np.where((deviation != 0) & ~flat,
+                                    deviation / (0.015 * mean_dev), 0.0)
+    return out
+
+
+def obv(close: np.ndarray, volume: np.ndarray, delta: Optional[np.ndarray] = None) -> np.ndarray:
+    """TA-Lib OBV：以首根成交量為起點累加"""
+    close = np.asarray(close, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    if len(close) == 0:
+        return close.copy()
+
+    change = np.diff(close, axis=0) if delta is None else np.asarray(delta, dtype=float)[1:]
+    signed = np.where(change > 0, volume[1:], np.where(change < 0, -volume[1:], 0.0))
+    return np.concatenate([volume[:1], volume[0] + np.cumsum(signed, axis=0)])
+
+
+def mfi(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray,
+        period: int = 14) -> np.ndarray:
+    high, low, close, volume = (np.asarray(a, dtype=float) for a in (high, low, close, volume))
+    out = _nan_like(close)
+    if len(close) <= period:
+        return out
+
+    typical = (high + low + close) / 3
+    money_flow = typical * volume
+    change = np.diff(typical, axis=0)
+    positive = rolling_sum(np.where(change > 0, money_flow[1:], 0.0), period)[period - 1:]
+    negative = rolling_sum(np.where(change < 0, money_flow[1:], 0.0), period)[period - 1:]
+
+    total = positive + negative
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[period:] = np.where(total < 1.0, 0.0, 100 * positive / total)
+    return out
@@ -0,0 +1,402 @@
+# app/services/indicator_planner.py
+# 指標計算規劃器 - 聲明式指標註冊表 + 依賴圖
+# 只計算請求需要的節點，並在指標之間共享中間結果 (差分、滾動均值、真實範圍等)
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from . import indicator_kernels as kernels
+from .indicator_backends import NumpyBackend, get_backend
+from .support_resistance import calculate_support_resistance
+
+
+class IndicatorNode:
+    """依賴圖節點"""
+
+    def __init__(self, name: str, deps: Tuple[str, ...], func: Callable,
+                 category: Optional[str] = None):
+        self.name = name
+        self.deps = deps
+        self.func = func
+        self.category = category  # None 表示中間結果，不輸出
+
+
+INDICATOR_REGISTRY: Dict[str, IndicatorNode] = {}
+
+# 交易信號及技術評分所依賴的指標 (不論請求了哪些指標都會計算，評分才與請求的子集無關)
+SIGNAL_INDICATORS = ["rsi", "macd", "sma", "bollinger"]
+
+# 請求名稱別名 (AssetRequest.indicators / DEFAULT_INDICATORS / Alpha Vantage 命名)
+INDICATOR_ALIASES = {
+    "bb": ["bollinger"],
+    "bbands": ["bollinger"],
+    "stochastic": ["stoch"],
+    "williams": ["williams_r"],
+    "willr": ["williams_r"],
+    "hv": ["historical_volatility"],
+    "sr": ["support_resistance"],
+    "volume": ["obv", "volume_sma", "volume_ratio", "mfi"],
+    "trend": ["sma", "ema", "macd", "adx"],
+    "momentum": ["rsi", "stoch", "williams_r", "cci"],
+    "volatility": ["bollinger", "atr", "historical_volatility"]
+}
+
+
+def register(name: str, deps: Iterable[str] = (), category: Optional[str] = None):
+    """註冊指標節點"""
+    def decorator(func):
+        INDICATOR_REGISTRY[name] = IndicatorNode(name, tuple(deps), func, category)
+        return func
+    return decorator
+
+
+class PlanContext:
+    """執行上下文：保存節點結果及共享的參數化中間結果"""
+
+    def __init__(self, data: pd.DataFrame, config: Dict, backend: NumpyBackend,
+                 analyzer: Any = None):
+        self.data = data
+        self.config = config
+        self.backend = backend
+        self.analyzer = analyzer
+        self.values: Dict[str, Any] = {}
+        self.shared: Dict[Tuple, pd.Series] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        return self.values[name]
+
+    def _memo(self, key: Tuple, compute: Callable[[], pd.Series]) -> pd.Series:
+        if key not in self.shared:
+            self.shared[key] = compute()
+        return self.shared[key]
+
+    def rolling_mean(self, source: str, period: int) -> pd.Series:
+        return self._memo(("rolling_mean", source, period),
+                          lambda: self[source].rolling(period).mean())
+
+    def rolling_std(self, source: str, period: int) -> pd.Series:
+        return self._memo(("rolling_std", source, period),
+                          lambda: self[source].rolling(period).std())
+
+    def ewm_mean(self, source: str, span: int) -> pd.Series:
+        return self._memo(("ewm_mean", source, span),
+                          lambda: self[source].ewm(span=span).mean())
+
+    @property
+    def length(self) -> int:
+        return len(self.data)
+
+
+# ---------------------------------------------------------------- 輸入及中間結果
+
+@register("close")
+def _close(ctx: PlanContext) -> pd.Series:
+    return ctx.data['Close']
+
+
+@register("high")
+def _high(ctx: PlanContext) -> pd.Series:
+    return ctx.data['High']
+
+
+@register("low")
+def _low(ctx: PlanContext) -> pd.Series:
+    return ctx.data['Low']
+
+
+@register("volume_series")
+def _volume_series(ctx: PlanContext) -> Optional[pd.Series]:
+    return ctx.data['Volume'] if 'Volume' in ctx.data else None
+
+
+@register("delta", deps=["close"])
+def _delta(ctx: PlanContext) -> pd.Series:
+    return ctx["close"].diff()
+
+
+@register("true_range", deps=["close", "high", "low"])
+def _true_range(ctx: PlanContext) -> np.ndarray:
+    return kernels.true_range(ctx["high"].values, ctx["low"].values, ctx["close"].values)
+
+
+@register("returns", deps=["close"])
+def _returns(ctx: PlanContext) -> pd.Series:
+    return ctx["close"].pct_change(fill_method=None)
+
+
+# ---------------------------------------------------------------- 趨勢指標
+
+@register("sma", deps=["close"], category="trend")
+def _sma(ctx: PlanContext) -> Dict[str, pd.Series]:
+    return {
+        f'sma_{period}': ctx.rolling_mean("close", period)
+        for period in ctx.config['sma_periods'] if ctx.length >= period
+    }
+
+
+@register("ema", deps=["close"], category="trend")
+def _ema(ctx: PlanContext) -> Dict[str, pd.Series]:
+    return {
+        f'ema_{period}': ctx.ewm_mean("close", period)
+        for period in ctx.config['ema_periods'] if ctx.length >= period
+    }
+
+
+@register("macd", deps=["close"], category="trend")
+def _macd(ctx: PlanContext) -> Dict[str, pd.Series]:
+    cfg = ctx.config
+    close = ctx["close"]
+    if ctx.length < cfg['macd_slow']:
+        return {}
+
+    macd, signal, histogram = ctx.backend.macd(
+        close.values, fast=cfg['macd_fast'], slow=cfg['macd_slow'], signal=cfg['macd_signal']
+    )
+    return {
+        'macd': pd.Series(macd, index=close.index),
+        'macd_signal': pd.Series(signal, index=close.index),
+        'macd_histogram': pd.Series(histogram, index=close.index)
+    }
+
+
+@register("adx", deps=["close", "high", "low", "true_range"], category="trend")
+def _adx(ctx: PlanContext) -> Dict[str, pd.Series]:
+    period = ctx.config['adx_period']
+    if ctx.length < period:
+        return {}
+    close = ctx["close"]
+    adx = ctx.backend.adx(ctx["high"].values, ctx["low"].values, close.values,
+                          period=period, true_range_values=ctx["true_range"])
+    return {'adx': pd.Series(adx, index=close.index)}
+
+
+# ---------------------------------------------------------------- 動量指標
+
+@register("rsi", deps=["close", "delta"], category="momentum")
+def _rsi(ctx: PlanContext) -> Dict[str, pd.Series]:
+    period = ctx.config['rsi_period']
+    close = ctx["close"]
+    if ctx.length < period:
+        return {}
+    rsi = ctx.backend.rsi(close.values, period=period, delta=ctx["delta"].values)
+    return {'rsi': pd.Series(rsi, index=close.index)}
+
+
+@register("stoch", deps=["close", "high", "low"], category="momentum")
+def _stoch(ctx: PlanContext) -> Dict[str, pd.Series]:
+    cfg = ctx.config
+    close = ctx["close"]
+    if ctx.length < cfg['stoch_k']:
+        return {}
+
+    slowk, slowd = ctx.backend.stoch(
+        ctx["high"].values, ctx["low"].values, close.values,
+        fastk_period=cfg['stoch_k'],
+        slowk_period=cfg['stoch_d'],
+        slowd_period=cfg['stoch_d']
+    )
+    return {
+        'stoch_k': pd.Series(slowk, index=close.index),
+        'stoch_d': pd.Series(slowd, index=close.index)
+    }
+
+
+@register("williams_r", deps=["close", "high", "low"], category="momentum")
+def _williams_r(ctx: PlanContext) -> Dict[str, pd.Series]:
+    period = ctx.config['willr_period']
+    if ctx.length < period:
+        return {}
+    close = ctx["close"]
+    willr = ctx.backend.willr(ctx["high"].values, ctx["low"].values, close.values, period=period)
+    return {'williams_r': pd.Series(willr, index=close.index)}
+
+
+@register("cci", deps=["close", "high", "low"], category="momentum")
+def _cci(ctx: PlanContext) -> Dict[str, pd.Series]:
+    period = ctx.config['cci_period']
+    if ctx.length < period:
+        return {}
+    close = ctx["close"]
+    cci = ctx.backend.cci(ctx["high"].values, ctx["low"].values, close.values, period=period)
+    return {'cci': pd.Series(cci, index=close.index)}
+
+
+# ---------------------------------------------------------------- 波動率指標
+
+@register("bollinger", deps=["close"], category="volatility")
+def _bollinger(ctx: PlanContext) -> Dict[str, pd.Series]:
+    cfg = ctx.config
+    if ctx.length < cfg['bb_period']:
+        return {}
+
+    # 中軌與同週期 SMA 共享
+    sma = ctx.rolling_mean("close", cfg['bb_period'])
+    std = ctx.rolling_std("close", cfg['bb_period'])
+    upper = sma + (std * cfg['bb_std'])
+    lower = sma - (std * cfg['bb_std'])
+
+    return {
+        'bb_upper': upper,
+        'bb_middle': sma,
+        'bb_lower': lower,
+        'bb_width': (upper - lower) / sma
+    }
+
+
+@register("atr", deps=["close", "high", "low", "true_range"], category="volatility")
+def _atr(ctx: PlanContext) -> Dict[str, pd.Series]:
+    period = ctx.config['atr_period']
+    if ctx.length < period:
+        return {}
+
+    close = ctx["close"]
+    atr = ctx.backend.atr(ctx["high"].values, ctx["low"].values, close.values,
+                          period=period, true_range_values=ctx["true_range"])
+    return {'atr': pd.Series(atr, index=close.index)}
+
+
+@register("historical_volatility", deps=["returns"], category="volatility")
+def _historical_volatility(ctx: PlanContext) -> Dict[str, pd.Series]:
+    if ctx.length < 30:
+        return {}
+    return {'historical_volatility': ctx.rolling_std("returns", 30) * np.sqrt(252)}
+
+
+# ---------------------------------------------------------------- 成交量指標
+
+@register("obv", deps=["close", "delta", "volume_series"], category="volume")
+def _obv(ctx: PlanContext) -> Dict[str, pd.Series]:
+    close, volume = ctx["close"], ctx["volume_series"]
+    if volume is None or ctx.length < 2:
+        return {}
+
+    obv = ctx.backend.obv(close.values, volume.values, delta=ctx["delta"].values)
+    return {'obv': pd.Series(obv, index=close.index)}
+
+
+@register("volume_sma", deps=["volume_series"], category="volume")
+def _volume_sma(ctx: PlanContext) -> Dict[str, pd.Series]:
+    if ctx["volume_series"] is None or ctx.length < 20:
+        return {}
+    return {'volume_sma': ctx.rolling_mean("volume_series", 20)}
+
+
+@register("volume_ratio", deps=["volume_series"], category="volume")
+def _volume_ratio(ctx: PlanContext) -> Dict[str, pd.Series]:
+    volume = ctx["volume_series"]
+    if volume is None or ctx.length < 2:
+        return {}
+    return {'volume_ratio': volume / volume.shift(1)}
+
+
+@register("mfi", deps=["close", "high", "low", "volume_series"], category="volume")
+def _mfi(ctx: PlanContext) -> Dict[str, pd.Series]:
+    volume = ctx["volume_series"]
+    period = ctx.config['mfi_period']
+    if volume is None or ctx.length < period:
+        return {}
+    close = ctx["close"]
+    mfi = ctx.backend.mfi(ctx["high"].values, ctx["low"].values, close.values,
+                          volume.values, period=period)
+    return {'mfi': pd.Series(mfi, index=close.index)}
+
+
+# ---------------------------------------------------------------- 支撐阻力
+
+@register("support_resistance", deps=["close", "high", "low"], category="support_resistance")
+def _support_resistance(ctx: PlanContext) -> Dict[str, Any]:
+    return calculate_support_resistance(
+        ctx["high"], ctx["low"], ctx["close"],
+        window=ctx.config.get('sr_window', 20),
+        tolerance=ctx.config.get('sr_zone_tolerance', 0.005)
+    )
+
+
+# ---------------------------------------------------------------- 信號及評分
+
+@register("signals", deps=["close"] + SIGNAL_INDICATORS, category="signals")
+def _signals(ctx: PlanContext) -> Dict[str, Any]:
+    """交易信號與技術評分 (由 TechnicalAnalyzer 生成)，輸入固定為 SIGNAL_INDICATORS"""
+    inputs: Dict[str, Dict[str, pd.Series]] = {}
+    for dep in SIGNAL_INDICATORS:
+        inputs.setdefault(INDICATOR_REGISTRY[dep].category, {}).update(ctx[dep])
+    return {
+        'signals': ctx.analyzer._generate_signals(inputs, ctx["close"]),
+        'technical_score': ctx.analyzer._calculate_technical_score(inputs)
+    }
+
+
+def resolve_indicators(indicators: Iterable[str]) -> List[str]:
+    """將請求名稱 (含別名) 解析為註冊表中的輸出節點"""
+    resolved = []
+    for name in indicators:
+        key = name.lower().strip()
+        targets = INDICATOR_ALIASES.get(key, [key])
+        for target in targets:
+            node = INDICATOR_REGISTRY.get(target)
+            if node is None or node.category is None:
+                raise ValueError(f"不支援的指標: {name}")
+            if target not in resolved:
+                resolved.append(target)
+    return resolved
+
+
+def build_plan(indicators: Iterable[str]) -> List[str]:
+    """按依賴關係拓撲排序，返回需要計算的節點列表"""
+    order: List[str] = []
+    visiting = set()
+
+    def visit(name: str):
+        if name in order:
+            return
+        if name in visiting:
+            raise ValueError(f"指標依賴存在循環: {name}")
+        visiting.add(name)
+        for dep in INDICATOR_REGISTRY[name].deps:
+            visit(dep)
+        visiting.discard(name)
+        order.append(name)
+
+    for name in resolve_indicators(indicators):
+        visit(name)
+
+    return order
+
+
+def execute_plan(data: pd.DataFrame, config: Dict, indicators: Iterable[str],
+                 backend: Optional[NumpyBackend] = None, analyzer: Any = None) -> Dict[str, Any]:
+    """執行計劃，返回與 calculate_all_indicators 相同分類結構的結果
+
+    只輸出請求的指標；僅作為依賴計算的指標 (如 signals 所需的 RSI/MACD) 不輸出。
+    計劃包含 signals 節點時需要提供 analyzer (TechnicalAnalyzer) 生成信號及評分。
+    """
+    indicators = list(indicators)
+    requested = set(resolve_indicators(indicators))
+    plan = build_plan(indicators)
+    logger.info(f"指標計算計劃: {[n for n in plan if INDICATOR_REGISTRY[n].category]}")
+
+    ctx = PlanContext(data, config, backend or get_backend(), analyzer)
+    results: Dict[str, Any] = {}
+
+    for name in plan:
+        node = INDICATOR_REGISTRY[name]
+        try:
+            ctx.values[name] = node.func(ctx)
+        except Exception as e:
+            logger.error(f"指標 {name} 計算失敗: {e}")
+            ctx.values[name] = {} if node.category else None
+            continue
+
+        if name not in requested:
+            continue
+        if node.category == "support_resistance":
+            results[node.category] = ctx.values[name]
+        elif node.category == "signals":
+            results.update(ctx.values[name])
+        elif node.category:
+            results.setdefault(node.category, {}).update(ctx.values[name])
+
+    return results
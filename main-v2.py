@@ -13,6 +13,18 @@ import logging
 from datetime import datetime
 import json
 
+from app.api.market_data import router as market_data_router
+from app.api.technical import router as technical_router
+from app.api.monitoring import router as monitoring_router, health_snapshot
+from app.utils.metrics import RequestMetricsMiddleware, loop_lag_monitor
+from app.utils.blocking_detector import blocking_detector
+from app.utils.client_rate_limiter import ClientRateLimitMiddleware
+from app.core.config import get_settings
+from app.services.quote_stream import quote_stream_hub
+from app.services.analysis_executor import analysis_executor
+from app.services.data_fetcher import data_fetcher
+from app.utils.http_client import close_http_client
+
 # 配置日誌
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,6 +38,9 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# 按 API Key 分級限流 (置於 CORS 內層，429 響應同樣帶 CORS 頭)
+app.add_middleware(ClientRateLimitMiddleware)
+
 # CORS 中間件
 app.add_middleware(
     CORSMiddleware,
@@ -35,6 +50,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 請求延遲指標 (按路由模板記錄)
+app.add_middleware(RequestMetricsMiddleware)
+
+# 路由
+app.include_router(market_data_router)
+app.include_router(technical_router)
+app.include_router(monitoring_router)
+
+@app.on_event("startup")
+async def startup_event():
+    """啟動事件循環延遲監測 (及按配置啟動阻塞調用檢測)"""
+    loop_lag_monitor.start()
+    if get_settings().BLOCKING_DETECTOR_ENABLED:
+        blocking_detector.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """停止報價輪詢任務、延遲監測，關閉分析進程池、yfinance 線程池及 HTTP 客戶端"""
+    await quote_stream_hub.shutdown()
+    await loop_lag_monitor.stop()
+    await blocking_detector.stop()
+    analysis_executor.shutdown(wait=False)
+    data_fetcher.shutdown(wait=False)
+    await close_http_client()
+
 # 數據模型
 class AssetRequest(BaseModel):
     symbol: str
@@ -97,9 +137,12 @@ async def root():
         ],
         "endpoints": {
             "health_check": "/health",
+            "metrics": "/metrics",
             "api_docs": "/docs",
             "market_data": "/api/v1/market/*",
+            "market_stream": "/api/v1/market/stream",
             "technical_analysis": "/api/v1/analysis/technical",
+            "technical_analysis_batch": "/api/v1/analysis/technical/batch",
             "ai_chat": "/api/v1/ai/chat"
         }
     }
@@ -140,8 +183,7 @@ async def health_check():
             "cors": "✅ 已啟用",
             "logging": "✅ 已配置"
         },
-        "memory_usage": "正常",
-        "uptime": "正常"
+        **health_snapshot()
     }
 
 # 模擬技術分析端點
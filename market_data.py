@@ -0,0 +1,188 @@
+# app/api/market_data.py
+# 市場數據 API - 歷史數據 (JSON 行式/列式、Arrow IPC)、實時報價推送 (WebSocket / Server-Sent Events)
+
+import json
+import math
+import asyncio
+from typing import Optional
+
+import pandas as pd
+from fastapi import APIRouter, Query, Request, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from loguru import logger
+
+from ..core.config import get_settings
+from ..services.data_fetcher import data_fetcher
+from ..services.analysis_executor import analysis_executor, AnalysisQueueFullError, AnalysisTimeoutError
+from ..services.quote_stream import quote_stream_hub, Subscription
+from ..utils.rate_limiter import RateLimitExceeded
+from ..utils.serialization import (
+    dumps, frame_to_columns, frame_to_records, frame_to_arrow,
+    FastJSONResponse, ArrowResponse, ARROW_MEDIA_TYPE, HAS_PYARROW
+)
+
+router = APIRouter(prefix="/api/v1/market", tags=["market"])
+
+
+def _parse_symbols(symbols: Optional[str]) -> list:
+    return [s for s in (symbols or "").split(",") if s.strip()]
+
+
+def _dumps(message) -> str:
+    return dumps(message).decode("utf-8")
+
+
+class HistoricalDataRequest(BaseModel):
+    symbol: str
+    period: Optional[str] = "1y"
+    interval: Optional[str] = "1d"
+    include_indicators: Optional[bool] = False
+    layout: Optional[str] = "rows"  # rows: [{date, open, ...}]；columns: {date: [...], close: [...]}
+
+
+@router.post("/historical-data")
+async def historical_data(request: HistoricalDataRequest, http_request: Request):
+    """歷史 OHLCV 數據 (可附帶完整技術指標序列)
+
+    JSON 響應直接序列化 NumPy 列 (NaN 輸出為 null)；layout=columns 時按列輸出。
+    Accept: application/vnd.apache.arrow.stream 時返回 Arrow IPC stream，
+    指標序列作為附加列 (如 trend.sma_20)。
+    """
+    if request.layout not in ("rows", "columns"):
+        raise HTTPException(status_code=400, detail="layout 只支援 rows 或 columns")
+    wants_arrow = ARROW_MEDIA_TYPE in http_request.headers.get("accept", "")
+    if wants_arrow and not HAS_PYARROW:
+        raise HTTPException(status_code=406, detail="服務端未安裝 pyarrow，不支援 Arrow 格式")
+
+    symbol = request.symbol.upper().strip()
+    try:
+        data = await data_fetcher.get_historical_data(symbol, request.period, request.interval)
+        if data is None or data.empty:
+            raise HTTPException(status_code=404, detail=f"無法獲取 {symbol} 的歷史數據")
+
+        indicators = None
+        if request.include_indicators:
+            indicators = await analysis_executor.calculate_all_indicators(data)
+            if "error" in indicators:
+                raise HTTPException(status_code=422, detail=indicators["error"])
+    except RateLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e),
+                            headers={"Retry-After": str(math.ceil(e.retry_after or 1))})
+    except (AnalysisQueueFullError, AnalysisTimeoutError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    if wants_arrow:
+        series = {
+            f"{category}.{name}": values
+            for category, group in (indicators or {}).items() if isinstance(group, dict)
+            for name, values in group.items() if isinstance(values, pd.Series)
+        }
+        return ArrowResponse(frame_to_arrow(data, series), headers={"X-Symbol": symbol})
+
+    return FastJSONResponse({
+        "status": "success",
+        "data": {
+            "symbol": symbol,
+            "period": request.period,
+            "interval": request.interval,
+            "layout": request.layout,
+            "data": frame_to_columns(data) if request.layout == "columns" else frame_to_records(data),
+            "technical_indicators": indicators
+        }
+    })
+
+
+@router.websocket("/stream")
+async def quote_stream(websocket: WebSocket, symbols: Optional[str] = Query(None)):
+    """WebSocket 報價推送
+
+    初始訂閱可用查詢參數 ?symbols=AAPL,BTC-USD；連接後可發送
+    {"action": "subscribe" | "unsubscribe", "symbols": [...]} 調整訂閱。
+    服務端推送 {"type": "quote" | "error" | "subscribed" | "unsubscribed" | "heartbeat", ...}。
+    """
+    await websocket.accept()
+    heartbeat = get_settings().QUOTE_STREAM_HEARTBEAT
+    subscription = Subscription()
+
+    async def send_updates():
+        while True:
+            messages = await subscription.get(timeout=heartbeat)
+            if not messages:
+                await websocket.send_text(_dumps({"type": "heartbeat"}))
+            for message in messages:
+                await websocket.send_text(_dumps(message))
+
+    async def handle(action: str, requested: list):
+        try:
+            if action == "subscribe":
+                added = quote_stream_hub.subscribe(subscription, requested)
+                await websocket.send_text(_dumps({"type": "subscribed", "symbols": added}))
+            elif action == "unsubscribe":
+                quote_stream_hub.unsubscribe(subscription, requested)
+                await websocket.send_text(_dumps({"type": "unsubscribed", "symbols": requested}))
+            else:
+                raise ValueError(f"不支援的操作: {action}")
+        except ValueError as e:
+            await websocket.send_text(_dumps({"type": "error", "message": str(e)}))
+
+    async def receive_commands():
+        while True:
+            try:
+                command = json.loads(await websocket.receive_text())
+                await handle(command.get("action"), list(command.get("symbols") or []))
+            except (json.JSONDecodeError, AttributeError, TypeError):
+                await websocket.send_text(_dumps({"type": "error", "message": "無效的訂閱指令"}))
+
+    sender = receiver = None
+    try:
+        if symbols:
+            await handle("subscribe", _parse_symbols(symbols))
+        sender = asyncio.ensure_future(send_updates())
+        receiver = asyncio.ensure_future(receive_commands())
+        done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.warning(f"報價推送連接異常: {e}")
+    finally:
+        for task in (sender, receiver):
+            if task is not None:
+                task.cancel()
+        quote_stream_hub.unsubscribe(subscription)
+
+
+@router.get("/stream/sse")
+async def quote_stream_sse(request: Request, symbols: str = Query(..., description="逗號分隔的標的列表")):
+    """Server-Sent Events 報價推送 (不支援 WebSocket 的客戶端使用)"""
+    subscription = Subscription()
+    try:
+        quote_stream_hub.subscribe(subscription, _parse_symbols(symbols))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    heartbeat = get_settings().QUOTE_STREAM_HEARTBEAT
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                messages = await subscription.get(timeout=heartbeat)
+                if not messages:
+                    yield ": heartbeat\n\n"
+                for message in messages:
+                    yield f"event: {message['type']}\ndata: {_dumps(message)}\n\n"
+        finally:
+            quote_stream_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/stream/stats")
+async def quote_stream_stats():
+    """報價推送統計 (輪詢標的數、連接數、上游調用次數)"""
+    return quote_stream_hub.stats()
@@ -0,0 +1,327 @@
+# app/utils/metrics.py
+# 進程內指標 - 直方圖/計數器及 Prometheus 文本格式輸出，另含進程資源與事件循環延遲監測
+# 每個 gunicorn worker 各自持有一份指標，由 Prometheus 按 worker 抓取或經網關匯總
+
+import os
+import time
+import asyncio
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Any, Tuple, Optional, Callable, Iterable
+
+from loguru import logger
+
+from ..core.config import get_settings
+
+try:
+    import resource
+    HAS_RESOURCE = True
+except ImportError:
+    HAS_RESOURCE = False
+
+# 默認延遲分桶 (秒)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 事件循環延遲分桶 (秒)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+# 抓取時動態生成的指標族: (名稱, 類型, 說明, [(標籤, 值), ...])
+MetricFamily = Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """單調遞增計數器 (按標籤值分組)"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels.get(name, "")) for name in self.labelnames), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """累積分桶直方圖 (按標籤值分組)"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # 標籤值 -> [各分桶計數 (非累積，末位為 +Inf), 總和, 次數]
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """計時上下文 (異常時同樣記錄)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def summary(self, **labels) -> Dict[str, float]:
+        """某組標籤的次數與平均值"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        _, total, count = self._series.get(key, (None, 0.0, 0))
+        return {"count": count, "sum": total, "avg": total / count if count else 0.0}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self._series.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                bucket_labels = dict(labels, le=_format_value(float(bound)))
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """指標註冊表：靜態指標 + 抓取時調用的收集函數 (讀取各組件的 stats())"""
+
+    def __init__(self, prefix: str = "finai"):
+        self.prefix = prefix
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(f"{self.prefix}_{name}", documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(f"{self.prefix}_{name}", documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"指標已存在: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Prometheus 文本格式 (text/plain; version=0.0.4)"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                logger.warning(f"指標收集失敗 {getattr(collector, '__name__', collector)}: {e}")
+                continue
+            for name, kind, documentation, samples in families:
+                name = f"{self.prefix}_{name}"
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    if value is not None:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# 進程資源
+# ---------------------------------------------------------------------------
+
+PROCESS_START_TIME = time.time()
+
+
+def process_rss_bytes() -> Optional[int]:
+    """當前常駐內存 (Linux 讀取 /proc；其他平台退回峰值 RSS)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if HAS_RESOURCE:
+        # macOS 單位為字節，Linux 為 KB
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    return None
+
+
+def process_stats() -> Dict[str, Any]:
+    """進程 RSS、CPU 時間、運行時長"""
+    cpu = os.times()
+    return {
+        "pid": os.getpid(),
+        "rss_bytes": process_rss_bytes(),
+        "cpu_seconds": cpu.user + cpu.system,
+        "start_time": PROCESS_START_TIME,
+        "uptime_seconds": time.time() - PROCESS_START_TIME
+    }
+
+
+def _collect_process() -> Iterable[MetricFamily]:
+    stats = process_stats()
+    yield "process_resident_memory_bytes", "gauge", "常駐內存 (字節)", [({}, stats["rss_bytes"])]
+    yield "process_cpu_seconds_total", "counter", "用戶態+內核態 CPU 時間 (秒)", [({}, stats["cpu_seconds"])]
+    yield "process_start_time_seconds", "gauge", "進程啟動時間 (Unix 秒)", [({}, stats["start_time"])]
+    yield "process_uptime_seconds", "gauge", "進程運行時長 (秒)", [({}, stats["uptime_seconds"])]
+
+
+# ---------------------------------------------------------------------------
+# 事件循環延遲
+# ---------------------------------------------------------------------------
+
+class LoopLagMonitor:
+    """定時休眠並測量實際喚醒延遲；延遲即事件循環被阻塞 (同步計算、阻塞 IO) 的時長"""
+
+    def __init__(self, histogram: Histogram, interval: float = 0.5):
+        self.histogram = histogram
+        self.interval = interval
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """在當前事件循環中啟動監測 (應用啟動時調用)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.histogram.observe(lag)
+
+    def stats(self) -> Dict[str, Any]:
+        summary = self.histogram.summary()
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval": self.interval,
+            "samples": summary["count"],
+            "last_lag_seconds": self.last_lag,
+            "avg_lag_seconds": summary["avg"],
+            "max_lag_seconds": self.max_lag
+        }
+
+
+# ---------------------------------------------------------------------------
+# 請求延遲 (ASGI 中間件)
+# ---------------------------------------------------------------------------
+
+class RequestMetricsMiddleware:
+    """按 (方法, 路由模板, 狀態碼) 記錄 HTTP 請求延遲，計時至響應體發送完畢 (含流式響應)
+
+    路由模板取自匹配後的 scope["route"]，未匹配的路徑統一記為 unmatched，避免標籤基數膨脹。
+    """
+
+    def __init__(self, app, histogram: Optional[Histogram] = None):
+        self.app = app
+        self.histogram = histogram or REQUEST_LATENCY
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            self.histogram.observe(
+                time.perf_counter() - started,
+                method=scope.get("method", ""),
+                route=getattr(route, "path", "unmatched"),
+                status=status["code"]
+            )
+
+
+@contextmanager
+def track_upstream(source: str):
+    """記錄一次上游調用的延遲及結果 (ok / error / cancelled)"""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        UPSTREAM_LATENCY.observe(time.perf_counter() - started, source=source, outcome=outcome)
+
+
+# 全局指標註冊表及核心指標
+metrics = MetricsRegistry()
+metrics.register_collector(_collect_process)
+
+REQUEST_LATENCY = metrics.histogram(
+    "http_request_duration_seconds", "HTTP 請求延遲 (秒)", ("method", "route", "status"))
+UPSTREAM_LATENCY = metrics.histogram(
+    "upstream_request_duration_seconds", "上游數據源調用延遲 (秒，不含限流等待)", ("source", "outcome"))
+RATE_LIMIT_WAIT = metrics.histogram(
+    "rate_limit_wait_seconds", "獲得上游調用許可前的排隊等待 (秒)", ("upstream",))
+INDICATOR_COMPUTE = metrics.histogram(
+    "indicator_compute_seconds", "技術指標分類計算時間 (秒)", ("category",))
+LOOP_LAG = metrics.histogram(
+    "event_loop_lag_seconds", "事件循環喚醒延遲 (秒)", buckets=LAG_BUCKETS)
+
+loop_lag_monitor = LoopLagMonitor(LOOP_LAG, get_settings().LOOP_LAG_INTERVAL)
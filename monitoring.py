@@ -0,0 +1,131 @@
+# app/api/monitoring.py
+# 監控 API - Prometheus /metrics (請求/上游延遲直方圖、限流等待、緩存命中率、指標計算耗時、RSS、事件循環延遲)
+# 及事件循環阻塞調用點報告 (/debug/blocking-calls)
+
+from typing import Dict, Any, Iterable
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from ..core.config import get_settings
+from ..services.data_fetcher import data_fetcher
+from ..services.technical_analyzer import technical_analyzer
+from ..services.analysis_executor import analysis_executor
+from ..services.quote_stream import quote_stream_hub
+from ..utils.metrics import metrics, MetricFamily, loop_lag_monitor, process_stats
+from ..utils.blocking_detector import blocking_detector
+
+router = APIRouter(tags=["monitoring"])
+
+
+def _cache_stats() -> Dict[str, Dict[str, Any]]:
+    """各緩存的命中/未命中/佔用 (報價緩存 L1/L2 分開統計)"""
+    tiered = data_fetcher.get_cache_stats()
+    caches = {
+        "quote_l1": tiered["l1"],
+        "history": data_fetcher.get_history_cache_stats(),
+        "indicators": technical_analyzer.indicators_cache.stats()
+    }
+    if tiered["l2_enabled"]:
+        hits, misses = tiered["l2_hits"], tiered["l2_misses"]
+        caches["quote_l2"] = {"hits": hits, "misses": misses,
+                              "hit_ratio": hits / (hits + misses) if hits + misses else 0.0}
+    return caches
+
+
+def collect_caches() -> Iterable[MetricFamily]:
+    caches = _cache_stats()
+    yield "cache_hits_total", "counter", "緩存命中次數", [
+        ({"cache": name}, stats["hits"]) for name, stats in caches.items()]
+    yield "cache_misses_total", "counter", "緩存未命中次數", [
+        ({"cache": name}, stats["misses"]) for name, stats in caches.items()]
+    yield "cache_hit_ratio", "gauge", "緩存命中率 (進程啟動以來)", [
+        ({"cache": name}, stats["hit_ratio"]) for name, stats in caches.items()]
+    yield "cache_bytes", "gauge", "緩存佔用 (字節)", [
+        ({"cache": name}, stats.get("bytes")) for name, stats in caches.items()]
+    yield "cache_evictions_total", "counter", "緩存淘汰次數", [
+        ({"cache": name}, stats.get("evictions")) for name, stats in caches.items()]
+    yield "cache_stale_served_total", "counter", "報價過期後返回舊值並後台刷新的次數", [
+        ({"cache": "quote"}, data_fetcher.get_cache_stats()["stale_served"])]
+
+
+def collect_upstream() -> Iterable[MetricFamily]:
+    limits = data_fetcher.get_rate_limit_stats()
+    yield "rate_limit_acquired_total", "counter", "獲得的上游調用許可數", [
+        ({"upstream": name}, stats["acquired"]) for name, stats in limits.items()]
+    yield "rate_limit_rejected_total", "counter", "因限流被拒絕的上游調用數", [
+        ({"upstream": name}, stats["rejected"]) for name, stats in limits.items()]
+    yield "rate_limit_queued", "gauge", "正在排隊等待許可的調用數", [
+        ({"upstream": name}, stats["queued"]) for name, stats in limits.items()]
+
+    coalescing = data_fetcher.get_coalescing_stats()["by_method"]
+    yield "coalesced_calls_total", "counter", "請求合併: 調用次數", [
+        ({"method": method, "kind": kind}, counts[kind])
+        for method, counts in coalescing.items() for kind in ("calls", "upstream", "coalesced")]
+
+    breakers = data_fetcher.get_source_health()
+    yield "circuit_breaker_open", "gauge", "報價來源熔斷狀態 (1=open, 0.5=half_open, 0=closed)", [
+        ({"source": name}, {"open": 1, "half_open": 0.5}.get(stats["state"], 0))
+        for name, stats in breakers.items()]
+    yield "circuit_breaker_failures_total", "counter", "報價來源失敗次數", [
+        ({"source": name}, stats["failures"]) for name, stats in breakers.items()]
+
+
+def collect_runtime() -> Iterable[MetricFamily]:
+    executor = analysis_executor.stats()
+    yield "analysis_pending", "gauge", "分析進程池排隊中的任務數", [({}, executor["pending"])]
+    yield "analysis_tasks_total", "counter", "分析任務數 (按結果)", [
+        ({"result": key}, executor[key])
+        for key in ("submitted", "completed", "failed", "rejected", "timeouts")]
+
+    stream = quote_stream_hub.stats()
+    yield "quote_stream_symbols", "gauge", "報價推送輪詢中的標的數", [({}, stream["symbols"])]
+    yield "quote_stream_subscriptions", "gauge", "報價推送訂閱連接數", [({}, stream["subscriptions"])]
+    yield "quote_stream_upstream_calls_total", "counter", "報價推送的上游調用次數", [
+        ({}, stream["upstream_calls"])]
+
+    yield "event_loop_lag_max_seconds", "gauge", "事件循環最大延遲 (秒)", [({}, loop_lag_monitor.max_lag)]
+
+
+metrics.register_collector(collect_caches)
+metrics.register_collector(collect_upstream)
+metrics.register_collector(collect_runtime)
+
+
+def health_snapshot() -> Dict[str, Any]:
+    """/health 使用的運行時數值"""
+    process = process_stats()
+    rss = process["rss_bytes"]
+    return {
+        "memory_usage": {"rss_mb": round(rss / 1024 / 1024, 1) if rss is not None else None},
+        "uptime": {"seconds": round(process["uptime_seconds"], 1), "pid": process["pid"]},
+        "event_loop": loop_lag_monitor.stats(),
+        "analysis_executor": analysis_executor.stats(),
+        "cache_hit_ratio": {name: round(stats["hit_ratio"], 4) for name, stats in _cache_stats().items()},
+        "quote_sources": {name: stats["state"] for name, stats in data_fetcher.get_source_health().items()}
+    }
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus 文本格式指標 (當前 worker 進程)"""
+    if not get_settings().METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="指標未啟用")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/debug/blocking-calls")
+async def blocking_calls(limit: int = Query(20, ge=1, le=200), stack: bool = True):
+    """阻塞事件循環的調用點 (按累計停頓時長排序)，需開啟 BLOCKING_DETECTOR_ENABLED"""
+    if not blocking_detector.running:
+        raise HTTPException(status_code=404, detail="阻塞檢測未啟用 (BLOCKING_DETECTOR_ENABLED)")
+    return blocking_detector.report(limit=limit, include_stack=stack)
+
+
+@router.delete("/debug/blocking-calls")
+async def reset_blocking_calls():
+    """清空已記錄的阻塞調用點"""
+    if not blocking_detector.running:
+        raise HTTPException(status_code=404, detail="阻塞檢測未啟用 (BLOCKING_DETECTOR_ENABLED)")
+    blocking_detector.reset()
+    return {"status": "reset"}
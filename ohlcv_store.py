@@ -0,0 +1,282 @@
+# app/services/ohlcv_store.py
+# 本地列式 OHLCV 存儲 - 按 標的/週期 分區的內存映射數組，只追加寫入
+# 目錄結構: {root}/{interval}/{SYMBOL}/current.json + v{版本}/{列}.bin
+# 讀取返回 np.memmap 的零拷貝切片；整段重寫時寫入新版本目錄再原子切換 current.json，
+# 已映射舊版本的讀者不受影響
+
+import os
+import re
+import json
+import shutil
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from ..core.config import get_settings
+
+# 跨進程寫鎖 (gunicorn 多 worker 共用同一目錄)，非 POSIX 平台只用進程內鎖
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+TIMESTAMP_FILE = "timestamp.bin"
+
+# 各K線週期的時長，用於判斷K線是否已收盤 (未收盤的K線不寫入存儲)
+INTERVAL_DURATIONS = {
+    "1m": pd.Timedelta(minutes=1),
+    "2m": pd.Timedelta(minutes=2),
+    "5m": pd.Timedelta(minutes=5),
+    "15m": pd.Timedelta(minutes=15),
+    "30m": pd.Timedelta(minutes=30),
+    "60m": pd.Timedelta(minutes=60),
+    "90m": pd.Timedelta(minutes=90),
+    "1h": pd.Timedelta(hours=1),
+    "1d": pd.Timedelta(days=1),
+    "5d": pd.Timedelta(days=5),
+    "1wk": pd.Timedelta(weeks=1),
+    "1mo": pd.Timedelta(days=31),
+    "3mo": pd.Timedelta(days=92)
+}
+
+
+class _FileLock:
+    """基於 flock 的跨進程排他鎖"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a+")
+        if HAS_FCNTL:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if HAS_FCNTL:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+
+
+class OHLCVStore:
+    """按 (標的, 週期) 分區的本地 OHLCV 存儲"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or get_settings().OHLCV_STORE_DIR
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        # 已打開的內存映射: 目錄 -> (版本, 行數, {列: memmap})
+        self._maps: Dict[str, tuple] = {}
+
+    # ------------------------------------------------------------ 路徑與元數據
+
+    def _dir(self, symbol: str, interval: str) -> str:
+        safe_symbol = re.sub(r"[^A-Za-z0-9._=^-]", "_", symbol.upper().strip())
+        return os.path.join(self.root, interval, safe_symbol)
+
+    def _lock(self, directory: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(directory, threading.Lock())
+
+    def _read_meta(self, directory: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(directory, "current.json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_meta(self, directory: str, meta: Dict[str, Any]):
+        """先寫臨時文件再原子替換，讀者總能看到完整的元數據"""
+        meta = dict(meta, updated_at=datetime.now(timezone.utc).isoformat())
+        tmp_path = os.path.join(directory, f"current.json.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(directory, "current.json"))
+
+    @staticmethod
+    def _column_file(column: str) -> str:
+        return re.sub(r"[^a-z0-9]+", "_", column.lower()).strip("_") + ".bin"
+
+    def info(self, symbol: str, interval: str) -> Optional[Dict[str, Any]]:
+        """存儲元數據：行數、列、時區、覆蓋起點、最後時間戳"""
+        meta = self._read_meta(self._dir(symbol, interval))
+        if meta is None:
+            return None
+        meta = dict(meta)
+        if meta.get("last_timestamp") is not None:
+            meta["last_time"] = self._to_index(np.array([meta["last_timestamp"]]), meta["tz"])[0]
+        return meta
+
+    # ------------------------------------------------------------ 讀取
+
+    def read_arrays(self, symbol: str, interval: str,
+                    start: Optional[Any] = None, end: Optional[Any] = None) -> Optional[Dict[str, np.ndarray]]:
+        """按時間範圍讀取，返回 {"timestamp": int64 納秒(UTC), 列名: float64} 零拷貝視圖
+
+        start/end 為閉區間，可為時間字符串或 Timestamp；無數據時返回 None。
+        """
+        directory = self._dir(symbol, interval)
+        meta = self._read_meta(directory)
+        if meta is None or meta["rows"] == 0:
+            return None
+
+        arrays = self._mapped(directory, meta)
+        stamps = arrays["timestamp"]
+        lo = 0 if start is None else int(np.searchsorted(stamps, self._to_ns(start, meta["tz"]), side="left"))
+        hi = len(stamps) if end is None else int(np.searchsorted(stamps, self._to_ns(end, meta["tz"]), side="right"))
+        return {name: values[lo:hi] for name, values in arrays.items()}
+
+    def read_frame(self, symbol: str, interval: str,
+                   start: Optional[Any] = None, end: Optional[Any] = None) -> Optional[pd.DataFrame]:
+        """按時間範圍讀取為 DataFrame (數值會複製到 DataFrame 內部)"""
+        arrays = self.read_arrays(symbol, interval, start, end)
+        if arrays is None:
+            return None
+        meta = self._read_meta(self._dir(symbol, interval))
+        index = self._to_index(arrays.pop("timestamp"), meta["tz"])
+        return pd.DataFrame(arrays, index=index)
+
+    def _mapped(self, directory: str, meta: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """打開 (或復用) 當前版本的內存映射，只映射元數據記錄的行數"""
+        key = (meta["version"], meta["rows"])
+        cached = self._maps.get(directory)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        version_dir = os.path.join(directory, f"v{meta['version']}")
+        rows = meta["rows"]
+        arrays = {"timestamp": np.memmap(os.path.join(version_dir, TIMESTAMP_FILE),
+                                         dtype=np.int64, mode="r", shape=(rows,))}
+        for column in meta["columns"]:
+            arrays[column] = np.memmap(os.path.join(version_dir, self._column_file(column)),
+                                       dtype=np.float64, mode="r", shape=(rows,))
+        self._maps[directory] = (key, arrays)
+        return arrays
+
+    @staticmethod
+    def _to_ns(value: Any, tz: Optional[str]) -> np.int64:
+        stamp = pd.Timestamp(value)
+        if stamp.tzinfo is None and tz:
+            stamp = stamp.tz_localize(tz)
+        if stamp.tzinfo is not None:
+            stamp = stamp.tz_convert("UTC").tz_localize(None)
+        return np.int64(stamp.value)
+
+    @staticmethod
+    def _to_index(stamps: np.ndarray, tz: Optional[str]) -> pd.DatetimeIndex:
+        index = pd.DatetimeIndex(np.asarray(stamps).view("datetime64[ns]"))
+        if tz:
+            index = index.tz_localize("UTC").tz_convert(tz)
+        return index
+
+    # ------------------------------------------------------------ 寫入
+
+    def replace(self, symbol: str, interval: str, data: pd.DataFrame,
+                coverage_start: Optional[Any] = None) -> int:
+        """整段重寫 (寫入新版本目錄後切換)
+
+        coverage_start: 本數據完整覆蓋的起始時間 (None 表示從上市起全部歷史)。
+        """
+        directory = self._dir(symbol, interval)
+        os.makedirs(directory, exist_ok=True)
+        data = self._completed(data, interval)
+        columns = [c for c in data.columns if pd.api.types.is_numeric_dtype(data[c])]
+        tz = str(data.index.tz) if getattr(data.index, "tz", None) is not None else None
+
+        with self._lock(directory), _FileLock(os.path.join(directory, ".lock")):
+            old_meta = self._read_meta(directory)
+            version = (old_meta["version"] + 1) if old_meta else 1
+            version_dir = os.path.join(directory, f"v{version}")
+            shutil.rmtree(version_dir, ignore_errors=True)
+            os.makedirs(version_dir)
+
+            self._write_rows(version_dir, data, columns, offset_rows=0)
+            self._write_meta(directory, {
+                "symbol": symbol.upper(),
+                "interval": interval,
+                "version": version,
+                "rows": len(data),
+                "columns": columns,
+                "tz": tz,
+                "coverage_start": None if coverage_start is None else int(self._to_ns(coverage_start, tz)),
+                "last_timestamp": int(self._stamps(data)[-1]) if len(data) else None
+            })
+
+            # 保留上一版本給仍在讀取的進程，其餘舊版本刪除
+            for name in os.listdir(directory):
+                if name.startswith("v") and name[1:].isdigit() and int(name[1:]) < version - 1:
+                    shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+        logger.info(f"OHLCV 存儲重寫 {symbol} {interval}: {len(data)} 行")
+        return len(data)
+
+    def append(self, symbol: str, interval: str, data: pd.DataFrame) -> int:
+        """追加最後時間戳之後的已收盤K線，返回追加行數"""
+        directory = self._dir(symbol, interval)
+        if self._read_meta(directory) is None:
+            raise ValueError(f"OHLCV 存儲不存在: {symbol} {interval}，請先調用 replace")
+
+        with self._lock(directory), _FileLock(os.path.join(directory, ".lock")):
+            meta = self._read_meta(directory)
+            data = self._completed(data, interval)
+            stamps = self._stamps(data)
+            if meta["last_timestamp"] is not None:
+                data = data[stamps > meta["last_timestamp"]]
+            if data.empty:
+                return 0
+
+            version_dir = os.path.join(directory, f"v{meta['version']}")
+            data = data.reindex(columns=meta["columns"])
+            self._write_rows(version_dir, data, meta["columns"], offset_rows=meta["rows"])
+            self._write_meta(directory, dict(
+                meta,
+                rows=meta["rows"] + len(data),
+                last_timestamp=int(self._stamps(data)[-1])
+            ))
+
+        logger.info(f"OHLCV 存儲追加 {symbol} {interval}: {len(data)} 行")
+        return len(data)
+
+    def delete(self, symbol: str, interval: str):
+        directory = self._dir(symbol, interval)
+        self._maps.pop(directory, None)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def _write_rows(self, version_dir: str, data: pd.DataFrame, columns: List[str], offset_rows: int):
+        """從第 offset_rows 行開始寫入 (覆蓋未提交的殘留字節)，元數據更新前讀者看不到新行"""
+        files = [(TIMESTAMP_FILE, self._stamps(data))]
+        files += [(self._column_file(c), data[c].to_numpy(dtype=np.float64)) for c in columns]
+
+        for filename, values in files:
+            path = os.path.join(version_dir, filename)
+            with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+                f.seek(offset_rows * 8)
+                f.write(np.ascontiguousarray(values).tobytes())
+                f.truncate()
+                f.flush()
+                os.fsync(f.fileno())
+
+    @staticmethod
+    def _stamps(data: pd.DataFrame) -> np.ndarray:
+        """UTC 納秒時間戳"""
+        return pd.DatetimeIndex(data.index).values.astype("datetime64[ns]").view(np.int64)
+
+    @staticmethod
+    def _completed(data: pd.DataFrame, interval: str) -> pd.DataFrame:
+        """過濾掉尚未收盤的K線 (開始時間 + 週期時長 > 現在)"""
+        duration = INTERVAL_DURATIONS.get(interval)
+        if duration is None or data.empty:
+            return data
+        index = pd.DatetimeIndex(data.index)
+        now = pd.Timestamp.now(tz=index.tz) if index.tz is not None else pd.Timestamp.now()
+        return data[index + duration <= now]
+
+
+# 全局 OHLCV 存儲實例
+ohlcv_store = OHLCVStore()
@@ -0,0 +1,159 @@
+# app/services/quote_stream.py
+# 實時報價推送 - 每個標的只有一個後台輪詢任務，報價扇出給所有訂閱者
+# 上游調用次數隨不同標的數增長，與連接數無關；最後一個訂閱者離開時輪詢任務自動停止
+
+import asyncio
+import itertools
+from typing import Dict, List, Set, Any, Optional, Iterable
+
+from loguru import logger
+
+from ..core.config import get_settings
+from ..utils.rate_limiter import RateLimitExceeded
+from .data_fetcher import data_fetcher as default_fetcher
+
+# 比較報價是否變化時忽略的欄位
+_VOLATILE_FIELDS = ("timestamp", "market_status")
+
+
+class Subscription:
+    """單個連接的訂閱
+
+    背壓處理：每個標的只保留最新一條未發送的報價，慢客戶端只會跳過中間更新，
+    佔用內存以訂閱的標的數為上限，不會拖慢輪詢或其他訂閱者。
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self):
+        self.id = next(self._ids)
+        self.symbols: Set[str] = set()
+        self.conflated = 0
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, symbol: str, message: Dict[str, Any]):
+        if symbol in self._pending:
+            self.conflated += 1
+        self._pending[symbol] = message
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """等待並取出所有待發送消息；超時返回空列表 (用於發送心跳)"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        messages = list(self._pending.values())
+        self._pending.clear()
+        self._ready.clear()
+        return messages
+
+
+class QuoteStreamHub:
+    """報價訂閱中心：按標的管理輪詢任務和訂閱者"""
+
+    def __init__(self, fetcher=None, interval: Optional[float] = None):
+        settings = get_settings()
+        self.fetcher = fetcher or default_fetcher
+        self.interval = interval or settings.QUOTE_STREAM_INTERVAL
+        self.max_symbols = settings.QUOTE_STREAM_MAX_SYMBOLS
+
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._pollers: Dict[str, asyncio.Task] = {}
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self.upstream_calls = 0
+
+    @staticmethod
+    def _normalize(symbols: Iterable[str]) -> List[str]:
+        return list(dict.fromkeys(s.upper().strip() for s in symbols if s and s.strip()))
+
+    def subscribe(self, subscription: Subscription, symbols: Iterable[str]) -> List[str]:
+        """訂閱標的，返回新增的標的；已有最新報價的標的立即推送一次快照"""
+        symbols = [s for s in self._normalize(symbols) if s not in subscription.symbols]
+        if len(subscription.symbols) + len(symbols) > self.max_symbols:
+            raise ValueError(f"單個連接最多訂閱 {self.max_symbols} 個標的")
+
+        for symbol in symbols:
+            subscription.symbols.add(symbol)
+            self._subscribers.setdefault(symbol, set()).add(subscription)
+            if symbol in self._latest:
+                subscription.push(symbol, self._latest[symbol])
+            if symbol not in self._pollers:
+                self._pollers[symbol] = asyncio.ensure_future(self._poll(symbol))
+                logger.info(f"📡 啟動報價輪詢 {symbol}")
+        return symbols
+
+    def unsubscribe(self, subscription: Subscription, symbols: Optional[Iterable[str]] = None):
+        """取消訂閱 (symbols 為 None 時取消全部)；標的無訂閱者時停止其輪詢"""
+        symbols = list(subscription.symbols) if symbols is None else self._normalize(symbols)
+        for symbol in symbols:
+            subscription.symbols.discard(symbol)
+            subscribers = self._subscribers.get(symbol)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._stop(symbol)
+
+    def _stop(self, symbol: str):
+        self._subscribers.pop(symbol, None)
+        self._latest.pop(symbol, None)
+        poller = self._pollers.pop(symbol, None)
+        if poller is not None:
+            poller.cancel()
+            logger.info(f"📴 停止報價輪詢 {symbol}")
+
+    def _publish(self, symbol: str, message: Dict[str, Any]):
+        for subscription in self._subscribers.get(symbol, ()):
+            subscription.push(symbol, message)
+
+    async def _poll(self, symbol: str):
+        """單個標的的輪詢循環：報價有變化時才推送；限流時按 retry-after 退避"""
+        last_key = None
+        while True:
+            delay = self.interval
+            try:
+                self.upstream_calls += 1
+                quote = await self.fetcher.get_real_time_price(symbol)
+                if "error" in quote:
+                    message = {"type": "error", "symbol": symbol, "message": quote.get("message", quote["error"])}
+                    delay = self.interval * 4
+                else:
+                    message = {"type": "quote", "symbol": symbol, "data": quote}
+
+                key = {k: v for k, v in quote.items() if k not in _VOLATILE_FIELDS}
+                if key != last_key:
+                    last_key = key
+                    self._latest[symbol] = message
+                    self._publish(symbol, message)
+
+            except asyncio.CancelledError:
+                raise
+            except RateLimitExceeded as e:
+                delay = max(self.interval, e.retry_after)
+            except Exception as e:
+                logger.warning(f"報價輪詢失敗 {symbol}: {e}")
+                delay = self.interval * 4
+
+            await asyncio.sleep(delay)
+
+    async def shutdown(self):
+        """停止全部輪詢任務 (應用關閉時調用)"""
+        pollers = list(self._pollers.values())
+        for symbol in list(self._pollers):
+            self._stop(symbol)
+        await asyncio.gather(*pollers, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """輪詢與訂閱統計"""
+        return {
+            "symbols": len(self._pollers),
+            "subscriptions": len({s for subs in self._subscribers.values() for s in subs}),
+            "upstream_calls": self.upstream_calls,
+            "subscribers_by_symbol": {symbol: len(subs) for symbol, subs in self._subscribers.items()}
+        }
+
+
+# 全局報價訂閱中心實例
+quote_stream_hub = QuoteStreamHub()
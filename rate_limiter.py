@@ -0,0 +1,292 @@
+# app/utils/rate_limiter.py
+# 上游 API 速率限制 - 令牌桶，經 Redis 在所有 worker 間共享 (無 Redis 時使用進程內實現)
+# 同一上游的等待者按優先級排隊：交互請求先於後台刷新；等待超出上限時立即失敗並給出 retry-after
+
+import time
+import asyncio
+import heapq
+import itertools
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Tuple, Optional
+
+from loguru import logger
+
+from ..core.config import get_settings
+from .metrics import RATE_LIMIT_WAIT
+
+try:
+    import redis.asyncio as aioredis
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+    logger.warning("⚠️ redis 不可用，速率限制僅在進程內生效")
+
+# 優先級：數值越小越先獲得令牌
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+# 當前調用鏈的優先級 (後台刷新任務用 priority_scope 降級，無需逐層傳參)
+current_priority: ContextVar[int] = ContextVar("rate_limit_priority", default=PRIORITY_INTERACTIVE)
+
+# 令牌桶定義: (容量, 每秒補充令牌數)
+Bucket = Tuple[float, float]
+
+
+class RateLimitExceeded(Exception):
+    """上游速率限制已滿，retry_after 為建議的重試等待秒數"""
+
+    def __init__(self, upstream: str, retry_after: float):
+        self.upstream = upstream
+        self.retry_after = retry_after
+        super().__init__(f"{upstream} 速率限制已滿，請在 {retry_after:.1f} 秒後重試")
+
+
+@contextmanager
+def priority_scope(priority: int):
+    """在此範圍內發起的上游調用使用指定優先級"""
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+def default_limits() -> Dict[str, List[Bucket]]:
+    """按 Settings 構建各上游的令牌桶 (每日限額按平滑補充計算，不依賴自然日重置)"""
+    settings = get_settings()
+    return {
+        "alpha_vantage": [
+            (settings.ALPHA_VANTAGE_CALLS_PER_MINUTE, settings.ALPHA_VANTAGE_CALLS_PER_MINUTE / 60),
+            (settings.ALPHA_VANTAGE_CALLS_PER_DAY, settings.ALPHA_VANTAGE_CALLS_PER_DAY / 86400)
+        ],
+        "finnhub": [
+            (settings.FINNHUB_CALLS_PER_MINUTE, settings.FINNHUB_CALLS_PER_MINUTE / 60)
+        ],
+        "yahoo": [
+            (settings.YAHOO_CALLS_PER_MINUTE, settings.YAHOO_CALLS_PER_MINUTE / 60)
+        ]
+    }
+
+
+class MemoryBucketBackend:
+    """進程內令牌桶 (單 worker / 測試用)"""
+
+    def __init__(self):
+        # 鍵 -> [剩餘令牌, 上次更新時間]
+        self._state: Dict[str, List[float]] = {}
+
+    async def acquire(self, key: str, buckets: List[Bucket], cost: float = 1.0,
+                      now: Optional[float] = None) -> Tuple[bool, float]:
+        """全部桶都有足夠令牌時扣減並返回 (True, 0)，否則返回 (False, 需等待秒數)"""
+        now = time.time() if now is None else now
+        levels = []
+        wait = 0.0
+        for i, (capacity, rate) in enumerate(buckets):
+            tokens, updated = self._state.get(f"{key}:{i}", (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+            levels.append(tokens)
+            if tokens < cost:
+                wait = max(wait, (cost - tokens) / rate)
+
+        if wait > 0:
+            return False, wait
+
+        for i, tokens in enumerate(levels):
+            self._state[f"{key}:{i}"] = [tokens - cost, now]
+        return True, 0.0
+
+
+# 原子地檢查並扣減多個令牌桶 (全部滿足才扣減)
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local levels = {}
+local wait = 0
+for i = 1, #KEYS do
+    local capacity = tonumber(ARGV[2 * i + 1])
+    local rate = tonumber(ARGV[2 * i + 2])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    levels[i] = tokens
+    if tokens < cost then
+        wait = math.max(wait, (cost - tokens) / rate)
+    end
+end
+if wait > 0 then
+    return {0, tostring(wait)}
+end
+for i = 1, #KEYS do
+    local capacity = tonumber(ARGV[2 * i + 1])
+    local rate = tonumber(ARGV[2 * i + 2])
+    redis.call('HSET', KEYS[i], 'tokens', tostring(levels[i] - cost), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[i], math.ceil(capacity / rate) + 60)
+end
+return {1, '0'}
+"""
+
+
+class RedisBucketBackend:
+    """Redis 令牌桶 (Lua 腳本保證原子性，所有 worker 共享)
+
+    Redis 不可達時退回進程內令牌桶，避免上游調用因限流組件故障而全部失敗；
+    故障後 retry_interval 秒內不再嘗試 Redis。
+    """
+
+    def __init__(self, url: str, prefix: str = "ratelimit", socket_timeout: float = 0.5,
+                 retry_interval: float = 30.0):
+        self.client = aioredis.from_url(url, socket_connect_timeout=socket_timeout,
+                                        socket_timeout=socket_timeout)
+        self.prefix = prefix
+        self.retry_interval = retry_interval
+        self._script = self.client.register_script(_ACQUIRE_SCRIPT)
+        self._fallback = MemoryBucketBackend()
+        self._retry_at = 0.0
+
+    async def acquire(self, key: str, buckets: List[Bucket], cost: float = 1.0,
+                      now: Optional[float] = None) -> Tuple[bool, float]:
+        now = time.time() if now is None else now
+        keys = [f"{self.prefix}:{key}:{i}" for i in range(len(buckets))]
+        args = [now, cost]
+        for capacity, rate in buckets:
+            args += [capacity, rate]
+
+        if time.monotonic() < self._retry_at:
+            return await self._fallback.acquire(key, buckets, cost, now)
+        try:
+            allowed, wait = await self._script(keys=keys, args=args)
+        except Exception as e:
+            if not self._retry_at:
+                logger.warning(f"Redis 速率限制不可用，使用進程內限制: {e}")
+            self._retry_at = time.monotonic() + self.retry_interval
+            return await self._fallback.acquire(key, buckets, cost, now)
+
+        if self._retry_at:
+            logger.info("Redis 速率限制已恢復")
+            self._retry_at = 0.0
+        return bool(int(allowed)), float(wait)
+
+
+class RateLimiter:
+    """按上游劃分的令牌桶限流器，等待者按 (優先級, 到達順序) 排隊"""
+
+    def __init__(self, backend=None, limits: Optional[Dict[str, List[Bucket]]] = None,
+                 max_wait: Optional[float] = None, background_max_wait: Optional[float] = None):
+        settings = get_settings()
+        self.backend = backend or self._default_backend(settings)
+        self.limits = limits or default_limits()
+        self.max_wait = settings.RATE_LIMIT_MAX_WAIT if max_wait is None else max_wait
+        self.background_max_wait = (settings.RATE_LIMIT_BACKGROUND_MAX_WAIT
+                                    if background_max_wait is None else background_max_wait)
+
+        self._queues: Dict[str, list] = defaultdict(list)
+        self._conditions: Dict[str, asyncio.Condition] = {}
+        self._sequence = itertools.count()
+        self.stats_counters: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"acquired": 0, "rejected": 0, "waited": 0, "wait_seconds": 0.0}
+        )
+
+    @staticmethod
+    def _default_backend(settings):
+        if settings.RATE_LIMIT_BACKEND == "redis" and HAS_REDIS:
+            return RedisBucketBackend(settings.REDIS_URL, socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                                      retry_interval=settings.REDIS_RETRY_INTERVAL)
+        return MemoryBucketBackend()
+
+    def _condition(self, upstream: str) -> asyncio.Condition:
+        if upstream not in self._conditions:
+            self._conditions[upstream] = asyncio.Condition()
+        return self._conditions[upstream]
+
+    async def acquire(self, upstream: str, priority: Optional[int] = None,
+                      max_wait: Optional[float] = None, cost: float = 1.0):
+        """獲取一個上游調用許可
+
+        priority 缺省時取 current_priority。
+        max_wait 缺省時交互請求用 RATE_LIMIT_MAX_WAIT，後台請求用 RATE_LIMIT_BACKGROUND_MAX_WAIT。
+        預計等待超過 max_wait 時拋出 RateLimitExceeded (不佔用請求空等)。
+        """
+        buckets = self.limits.get(upstream)
+        if not buckets:
+            return
+
+        if priority is None:
+            priority = current_priority.get()
+        if max_wait is None:
+            max_wait = self.max_wait if priority <= PRIORITY_INTERACTIVE else self.background_max_wait
+        counters = self.stats_counters[upstream]
+        queue = self._queues[upstream]
+
+        # 無人排隊時直接嘗試
+        if not queue:
+            allowed, retry_after = await self.backend.acquire(upstream, buckets, cost)
+            if allowed:
+                counters["acquired"] += 1
+                RATE_LIMIT_WAIT.observe(0.0, upstream=upstream)
+                return
+            if retry_after > max_wait:
+                counters["rejected"] += 1
+                raise RateLimitExceeded(upstream, retry_after)
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + max_wait
+        entry = (priority, next(self._sequence))
+        heapq.heappush(queue, entry)
+        condition = self._condition(upstream)
+
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if queue[0] != entry:
+                    # 等待排到隊首
+                    if remaining <= 0:
+                        raise RateLimitExceeded(upstream, max(self._refill_hint(buckets), 0.1))
+                    try:
+                        async with condition:
+                            await asyncio.wait_for(
+                                condition.wait_for(lambda: queue[0] == entry), remaining
+                            )
+                    except asyncio.TimeoutError:
+                        raise RateLimitExceeded(upstream, max(self._refill_hint(buckets), 0.1))
+                    continue
+
+                allowed, retry_after = await self.backend.acquire(upstream, buckets, cost)
+                if allowed:
+                    waited = loop.time() - started
+                    counters["acquired"] += 1
+                    counters["waited"] += 1
+                    counters["wait_seconds"] += waited
+                    RATE_LIMIT_WAIT.observe(waited, upstream=upstream)
+                    return
+                if retry_after > remaining:
+                    raise RateLimitExceeded(upstream, retry_after)
+                await asyncio.sleep(retry_after)
+
+        except RateLimitExceeded:
+            counters["rejected"] += 1
+            raise
+        finally:
+            queue.remove(entry)
+            heapq.heapify(queue)
+            async with condition:
+                condition.notify_all()
+
+    @staticmethod
+    def _refill_hint(buckets: List[Bucket]) -> float:
+        """排隊超時時的重試建議：最慢的桶補充一個令牌所需時間"""
+        return max(1.0 / rate for _, rate in buckets)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """各上游的許可/拒絕/排隊統計"""
+        return {
+            upstream: dict(counters, queued=len(self._queues.get(upstream, [])))
+            for upstream, counters in self.stats_counters.items()
+        }
+
+
+# 全局上游限流器實例
+rate_limiter = RateLimiter()
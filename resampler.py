@@ -0,0 +1,172 @@
+# app/services/resampler.py
+# 本地多週期 OHLCV 重採樣 - 由細週期K線向量化合成粗週期K線，按交易所時段對齊
+# 日內K線在每個時段起點 (盤前、開盤、午休結束、盤後) 重新對齊，不跨越午休或盤前/盤後邊界；
+# 日線只統計常規交易時段；週/月/季線由日線合成
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..core.config import MARKET_HOURS
+
+NS_PER_MINUTE = 60 * 10**9
+NS_PER_DAY = 1440 * NS_PER_MINUTE
+
+# 日內週期的分鐘數
+INTRADAY_MINUTES = {
+    "1m": 1, "2m": 2, "5m": 5, "15m": 15, "30m": 30,
+    "60m": 60, "90m": 90, "1h": 60
+}
+
+# 由日線合成的週期
+CALENDAR_INTERVALS = ("1wk", "1mo", "3mo")
+
+# 各列的聚合方式，未列出的數值列按 sum 聚合
+AGGREGATIONS = {
+    "Open": "first",
+    "High": "max",
+    "Low": "min",
+    "Close": "last",
+    "Volume": "sum",
+    "Stock Splits": "max"
+}
+
+
+def _minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def session_anchors(market: Optional[str]) -> Dict[str, List[int]]:
+    """市場時段的對齊點 (當日分鐘數)
+
+    anchors: 日內K線的對齊起點；regular: 常規交易時段 [(開始, 結束), ...]。
+    不在 MARKET_HOURS 中的市場 (加密貨幣、外匯、期貨) 按 UTC 零點對齊、全天為一個時段。
+    """
+    hours = MARKET_HOURS.get(market or "")
+    if hours is None:
+        return {"anchors": [0], "regular": [(0, 1440)]}
+
+    open_, close = _minutes(hours["open"]), _minutes(hours["close"])
+    anchors = [0, open_, close]
+    regular = [(open_, close)]
+    if hours.get("lunch_break"):
+        break_start, break_end = (_minutes(t) for t in hours["lunch_break"])
+        anchors.append(break_end)
+        regular = [(open_, break_start), (break_end, close)]
+    if hours.get("pre_market"):
+        anchors.append(_minutes(hours["pre_market"]))
+    return {"anchors": sorted(set(anchors)), "regular": regular}
+
+
+def can_resample(source: str, target: str) -> bool:
+    """target 週期能否由 source 週期合成"""
+    if source == target:
+        return True
+    if source in INTRADAY_MINUTES:
+        if target in INTRADAY_MINUTES:
+            return (INTRADAY_MINUTES[target] > INTRADAY_MINUTES[source]
+                    and INTRADAY_MINUTES[target] % INTRADAY_MINUTES[source] == 0)
+        return target == "1d" or target in CALENDAR_INTERVALS
+    return source == "1d" and target in CALENDAR_INTERVALS
+
+
+def resample_ohlcv(data: pd.DataFrame, source: str, target: str,
+                   market: Optional[str] = None) -> pd.DataFrame:
+    """將 source 週期的 OHLCV 合成為 target 週期
+
+    data 須按時間升序；時間索引為交易所時區 (無時區時按 UTC 處理)。
+    K線以起始時間標記，與 yfinance 一致。
+    """
+    if not can_resample(source, target):
+        raise ValueError(f"不支援的重採樣: {source} -> {target}")
+    if source == target or data.empty:
+        return data
+
+    hours = MARKET_HOURS.get(market or "")
+    tz = hours["timezone"] if hours else "UTC"
+    index = pd.DatetimeIndex(data.index)
+    index = index.tz_localize("UTC") if index.tz is None else index
+    local_ns = index.tz_convert(tz).tz_localize(None).as_unit("ns").asi8
+    sessions = session_anchors(market)
+
+    day_start = local_ns - local_ns % NS_PER_DAY
+    minute = (local_ns - day_start) // NS_PER_MINUTE
+    keep = None
+
+    if target in INTRADAY_MINUTES:
+        anchors = np.asarray(sessions["anchors"])
+        anchor = anchors[np.searchsorted(anchors, minute, side="right") - 1]
+        step = INTRADAY_MINUTES[target]
+        labels = day_start + (anchor + (minute - anchor) // step * step) * NS_PER_MINUTE
+    else:
+        if source in INTRADAY_MINUTES:
+            # 日線只統計常規交易時段 (排除盤前盤後)
+            keep = np.zeros(len(minute), dtype=bool)
+            for start, end in sessions["regular"]:
+                keep |= (minute >= start) & (minute < end)
+        labels = day_start
+        if target in CALENDAR_INTERVALS:
+            labels = _calendar_labels(day_start, target)
+
+    return _aggregate(data, labels, tz, keep)
+
+
+def _calendar_labels(day_start: np.ndarray, target: str) -> np.ndarray:
+    """週 (週一起)、月、季K線的起始日"""
+    days = day_start // NS_PER_DAY
+    if target == "1wk":
+        # 1970-01-01 為週四，+3 後按 7 天整除即以週一為起點
+        return ((days + 3) // 7 * 7 - 3) * NS_PER_DAY
+    dates = days.astype("datetime64[D]")
+    months = dates.astype("datetime64[M]").astype(np.int64)
+    if target == "3mo":
+        months = months - months % 3
+    return months.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) * NS_PER_DAY
+
+
+def _aggregate(data: pd.DataFrame, labels: np.ndarray, tz: str,
+               keep: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """按相鄰相同標籤分組聚合 (數據已按時間排序，分組為連續區段)"""
+    if keep is not None:
+        data, labels = data[keep], labels[keep]
+        if data.empty:
+            return data
+
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+    ends = np.r_[starts[1:], len(labels)] - 1
+
+    columns = {}
+    for column in data.columns:
+        values = data[column].to_numpy()
+        if not np.issubdtype(values.dtype, np.number):
+            continue
+        how = AGGREGATIONS.get(column, "sum")
+        if how == "first":
+            result = values[starts]
+        elif how == "last":
+            result = values[ends]
+        elif how == "max":
+            result = np.maximum.reduceat(values, starts)
+        elif how == "min":
+            result = np.minimum.reduceat(values, starts)
+        else:
+            result = _sum_reduceat(values, starts)
+        columns[column] = result
+
+    index = pd.DatetimeIndex(labels[starts].view("datetime64[ns]")).tz_localize(
+        tz, ambiguous=np.ones(len(starts), dtype=bool), nonexistent="shift_forward"
+    )
+    return pd.DataFrame(columns, index=index)
+
+
+def _sum_reduceat(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """分段求和；整數列以 64 位累加，結果放得下時還原為原類型"""
+    if np.issubdtype(values.dtype, np.integer):
+        wide = np.uint64 if np.issubdtype(values.dtype, np.unsignedinteger) else np.int64
+        result = np.add.reduceat(values.astype(wide), starts)
+        if len(result) and result.max() <= np.iinfo(values.dtype).max:
+            result = result.astype(values.dtype)
+        return result
+    return np.add.reduceat(values, starts)
@@ -0,0 +1,144 @@
+# app/utils/serialization.py
+# 數值型 API 響應的快速序列化 - NumPy/pandas 列直接寫出 (orjson)，NaN/inf 輸出為 null
+# 支援行式 ([{...}, ...]) 與列式 ({"close": [...]}) 佈局，以及可選的 Arrow IPC 二進制響應
+
+import re
+import json
+import math
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import Response
+from loguru import logger
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+    logger.warning("⚠️ orjson 不可用，API 響應使用標準 json 序列化")
+
+try:
+    import pyarrow as pa
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+if HAS_ORJSON:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def column_name(column: Any) -> str:
+    """列名轉為小寫蛇形 (Adj Close -> adj_close)"""
+    return re.sub(r"[^a-z0-9]+", "_", str(column).lower()).strip("_")
+
+
+def format_index(index: pd.Index) -> np.ndarray:
+    """時間索引格式化為字符串數組：全部為當地零點時輸出日期，否則輸出 UTC ISO 時間"""
+    if not isinstance(index, pd.DatetimeIndex):
+        return np.asarray(index.astype(str))
+
+    local = (index.tz_localize(None) if index.tz is not None else index).as_unit("ns").asi8
+    if len(local) and not (local % (86400 * 10**9)).any():
+        return np.datetime_as_string(local.view("datetime64[ns]"), unit="D")
+
+    utc = (index.tz_convert("UTC").tz_localize(None) if index.tz is not None else index)
+    return np.char.add(np.datetime_as_string(utc.as_unit("ns").asi8.view("datetime64[ns]"), unit="s"), "Z")
+
+
+def frame_to_columns(data: pd.DataFrame, index_name: str = "date") -> Dict[str, Any]:
+    """列式佈局: {"date": [...], "open": ndarray, ...} (數值列保持 NumPy 數組，序列化時直接寫出)"""
+    columns = {index_name: format_index(data.index).tolist()}
+    for column in data.columns:
+        columns[column_name(column)] = data[column].to_numpy()
+    return columns
+
+
+def frame_to_records(data: pd.DataFrame, index_name: str = "date") -> List[Dict[str, Any]]:
+    """行式佈局: [{"date": ..., "open": ..., ...}, ...]"""
+    keys = [index_name] + [column_name(c) for c in data.columns]
+    values = [format_index(data.index).tolist()] + [data[c].to_numpy().tolist() for c in data.columns]
+    return [dict(zip(keys, row)) for row in zip(*values)]
+
+
+def _default(value: Any) -> Any:
+    """orjson 不能直接處理的類型"""
+    if isinstance(value, pd.DataFrame):
+        return frame_to_columns(value)
+    if isinstance(value, pd.Series):
+        return value.to_numpy()
+    if isinstance(value, np.ndarray):
+        # 非連續或 orjson 不支援的 dtype
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, pd.Timedelta)):
+        return value.isoformat()
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    raise TypeError(f"不支援序列化的類型: {type(value).__name__}")
+
+
+def _to_builtin(value: Any) -> Any:
+    """無 orjson 時遞歸轉為內建類型，NaN/inf 轉為 None"""
+    if isinstance(value, dict):
+        return {str(k): _to_builtin(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_builtin(v) for v in value]
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, (str, int, bool)) or value is None:
+        return value
+    if isinstance(value, np.ndarray):
+        return _to_builtin(value.tolist())
+    return _to_builtin(_default(value))
+
+
+def dumps(content: Any) -> bytes:
+    """序列化為 JSON 字節串 (支援 NumPy 數組、pandas Series/DataFrame；NaN/inf 為 null)"""
+    if HAS_ORJSON:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(_to_builtin(content), ensure_ascii=False, allow_nan=False).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """直接序列化 NumPy/pandas 內容的 JSON 響應 (路由直接返回此對象，不經 jsonable_encoder)"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def frame_to_arrow(data: pd.DataFrame, extra: Optional[Dict[str, Any]] = None,
+                   index_name: str = "date") -> bytes:
+    """OHLCV (及與之等長的附加列，如指標序列) 編碼為 Arrow IPC stream"""
+    if not HAS_PYARROW:
+        raise RuntimeError("pyarrow 不可用，無法輸出 Arrow 格式")
+
+    arrays = {index_name: pa.array(pd.DatetimeIndex(data.index) if isinstance(data.index, pd.DatetimeIndex)
+                                   else data.index.to_numpy())}
+    for column in data.columns:
+        arrays[column_name(column)] = pa.array(data[column].to_numpy(), from_pandas=True)
+    for name, values in (extra or {}).items():
+        values = values.to_numpy() if isinstance(values, pd.Series) else np.asarray(values)
+        if len(values) == len(data):
+            arrays[name] = pa.array(values, from_pandas=True)
+
+    table = pa.table(arrays)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+class ArrowResponse(Response):
+    """Arrow IPC stream 二進制響應"""
+
+    media_type = ARROW_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return content
@@ -0,0 +1,161 @@
+# app/services/signal_series.py
+# 全歷史信號與技術評分 - 向量化計算每根K線的信號事件及 0-100 評分
+# 規則與 TechnicalAnalyzer._generate_signals / _calculate_technical_score 一致，最後一根K線的結果相同
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# 信號矩陣編碼：1 買入 / -1 賣出 / 0 無信號
+BUY, SELL, NONE = 1, -1, 0
+
+STRENGTH_WEAK, STRENGTH_MEDIUM, STRENGTH_STRONG = 1, 2, 3
+STRENGTH_NAMES = {STRENGTH_WEAK: "WEAK", STRENGTH_MEDIUM: "MEDIUM", STRENGTH_STRONG: "STRONG"}
+
+# 事件輸出順序與標量版本一致
+SIGNAL_INDICATORS = ["RSI", "MACD", "SMA", "BOLLINGER"]
+
+
+def _values(indicators: Dict, category: str, name: str, index: pd.Index) -> Optional[np.ndarray]:
+    """取指標數組並對齊到K線索引"""
+    series = indicators.get(category, {}).get(name)
+    if series is None:
+        return None
+    if isinstance(series, pd.Series) and len(series) != len(index):
+        series = series.reindex(index)
+    return np.asarray(series, dtype=float)
+
+
+def signal_matrix(indicators: Dict, close: pd.Series) -> Dict[str, pd.DataFrame]:
+    """逐K線計算各指標的信號方向及強度
+
+    返回 {"direction": DataFrame(int8), "strength": DataFrame(int8), "value": DataFrame(float)}，
+    列為 RSI / MACD / SMA / BOLLINGER，缺少對應指標的列全部為 0 / NaN。
+    """
+    price = close.to_numpy(dtype=float)
+    n = len(price)
+    direction = {name: np.zeros(n, dtype=np.int8) for name in SIGNAL_INDICATORS}
+    strength = {name: np.zeros(n, dtype=np.int8) for name in SIGNAL_INDICATORS}
+    value = {name: np.full(n, np.nan) for name in SIGNAL_INDICATORS}
+
+    with np.errstate(invalid='ignore'):
+        # RSI 超買超賣
+        rsi = _values(indicators, 'momentum', 'rsi', close.index)
+        if rsi is not None:
+            buy = rsi < 30
+            sell = rsi > 70
+            direction["RSI"][buy] = BUY
+            direction["RSI"][sell] = SELL
+            strength["RSI"][buy] = np.where(rsi[buy] < 20, STRENGTH_STRONG, STRENGTH_MEDIUM)
+            strength["RSI"][sell] = np.where(rsi[sell] > 80, STRENGTH_STRONG, STRENGTH_MEDIUM)
+            value["RSI"] = np.where(buy | sell, rsi, np.nan)
+
+        # MACD 金叉/死叉 (需要前一根K線)
+        macd = _values(indicators, 'trend', 'macd', close.index)
+        macd_signal = _values(indicators, 'trend', 'macd_signal', close.index)
+        if macd is not None and macd_signal is not None and n > 1:
+            prev_macd = np.concatenate(([np.nan], macd[:-1]))
+            prev_signal = np.concatenate(([np.nan], macd_signal[:-1]))
+            valid = ~(np.isnan(macd) | np.isnan(macd_signal) | np.isnan(prev_macd) | np.isnan(prev_signal))
+            golden = valid & (macd > macd_signal) & (prev_macd <= prev_signal)
+            death = valid & ~golden & (macd < macd_signal) & (prev_macd >= prev_signal)
+            direction["MACD"][golden] = BUY
+            direction["MACD"][death] = SELL
+            strength["MACD"][golden | death] = STRENGTH_MEDIUM
+            value["MACD"] = np.where(golden | death, macd - macd_signal, np.nan)
+
+        # 均線排列
+        sma_20 = _values(indicators, 'trend', 'sma_20', close.index)
+        sma_50 = _values(indicators, 'trend', 'sma_50', close.index)
+        if sma_20 is not None and sma_50 is not None:
+            bullish = (price > sma_20) & (sma_20 > sma_50)
+            bearish = ~bullish & (price < sma_20) & (sma_20 < sma_50)
+            direction["SMA"][bullish] = BUY
+            direction["SMA"][bearish] = SELL
+            strength["SMA"][bullish | bearish] = STRENGTH_WEAK
+
+        # 布林帶觸及上下軌
+        bb_upper = _values(indicators, 'volatility', 'bb_upper', close.index)
+        bb_lower = _values(indicators, 'volatility', 'bb_lower', close.index)
+        if bb_upper is not None and bb_lower is not None:
+            valid = ~(np.isnan(bb_upper) | np.isnan(bb_lower))
+            lower_touch = valid & (price <= bb_lower)
+            upper_touch = valid & ~lower_touch & (price >= bb_upper)
+            direction["BOLLINGER"][lower_touch] = BUY
+            direction["BOLLINGER"][upper_touch] = SELL
+            strength["BOLLINGER"][lower_touch | upper_touch] = STRENGTH_MEDIUM
+
+    return {
+        "direction": pd.DataFrame(direction, index=close.index),
+        "strength": pd.DataFrame(strength, index=close.index),
+        "value": pd.DataFrame(value, index=close.index)
+    }
+
+
+def signal_events(indicators: Dict, close: pd.Series) -> pd.DataFrame:
+    """將信號矩陣展開為事件表 (只包含有信號的K線)
+
+    列: indicator / type / strength / value / description，索引為K線時間，
+    同一K線內按 RSI、MACD、SMA、BOLLINGER 順序排列。
+    """
+    matrix = signal_matrix(indicators, close)
+    direction = matrix["direction"].to_numpy()
+    rows, cols = np.nonzero(direction)
+    # np.nonzero 按行優先返回，已是時間順序 + 指標順序
+
+    indicator_names = np.array(SIGNAL_INDICATORS)[cols]
+    directions = direction[rows, cols]
+    strengths = matrix["strength"].to_numpy()[rows, cols]
+    values = matrix["value"].to_numpy()[rows, cols]
+
+    events = pd.DataFrame({
+        "indicator": indicator_names,
+        "type": np.where(directions == BUY, "BUY", "SELL"),
+        "strength": [STRENGTH_NAMES[s] for s in strengths],
+        "value": values
+    }, index=close.index[rows])
+    events["description"] = [
+        _describe(name, kind, val)
+        for name, kind, val in zip(indicator_names, events["type"].to_numpy(), values)
+    ]
+    return events
+
+
+def _describe(indicator: str, kind: str, value: float) -> str:
+    """事件描述 (文字與標量版本一致)"""
+    buy = kind == "BUY"
+    if indicator == "RSI":
+        return f"RSI超賣 ({value:.1f}) - 買入信號" if buy else f"RSI超買 ({value:.1f}) - 賣出信號"
+    if indicator == "MACD":
+        return "MACD金叉 - 買入信號" if buy else "MACD死叉 - 賣出信號"
+    if indicator == "SMA":
+        return "價格位於短期均線上方 - 上升趨勢" if buy else "價格位於短期均線下方 - 下降趨勢"
+    return "價格觸及布林帶下軌 - 超賣" if buy else "價格觸及布林帶上軌 - 超買"
+
+
+def technical_score_series(indicators: Dict, index: pd.Index) -> pd.Series:
+    """逐K線技術評分 (0-100)，基準 50 分"""
+    n = len(index)
+    score = np.full(n, 50, dtype=np.int16)
+
+    with np.errstate(invalid='ignore'):
+        rsi = _values(indicators, 'momentum', 'rsi', index)
+        if rsi is not None:
+            score += np.where(rsi < 30, 15,
+                     np.where(rsi > 70, -15,
+                     np.where((rsi >= 40) & (rsi <= 60), 5, 0))).astype(np.int16)
+
+        macd = _values(indicators, 'trend', 'macd', index)
+        macd_signal = _values(indicators, 'trend', 'macd_signal', index)
+        if macd is not None and macd_signal is not None:
+            valid = ~(np.isnan(macd) | np.isnan(macd_signal))
+            score += np.where(valid, np.where(macd > macd_signal, 12, -12), 0).astype(np.int16)
+
+        sma_20 = _values(indicators, 'trend', 'sma_20', index)
+        sma_50 = _values(indicators, 'trend', 'sma_50', index)
+        if sma_20 is not None and sma_50 is not None:
+            valid = ~(np.isnan(sma_20) | np.isnan(sma_50))
+            score += np.where(valid, np.where(sma_20 > sma_50, 10, -10), 0).astype(np.int16)
+
+    return pd.Series(np.clip(score, 0, 100), index=index, name="technical_score")
@@ -0,0 +1,62 @@
+# app/utils/single_flight.py
+# 請求合併 (single-flight) - 相同鍵的併發調用共享同一個上游請求
+
+import asyncio
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """相同鍵的併發調用只執行一次，其餘調用等待同一結果
+
+    鍵的第一個元素視為方法名，用於分類統計。
+    上游任務不隨單個調用方取消而取消，異常會傳遞給所有等待者。
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"calls": 0, "upstream": 0, "coalesced": 0}
+        )
+
+    async def do(self, key: Tuple, func: Callable[..., Awaitable[Any]],
+                 *args, **kwargs) -> Tuple[Any, bool]:
+        """執行或加入進行中的調用，返回 (結果, 是否為發起者)"""
+        counters = self._counters[str(key[0])]
+        counters["calls"] += 1
+
+        task = self._inflight.get(key)
+        leader = task is None
+        if leader:
+            counters["upstream"] += 1
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+        else:
+            counters["coalesced"] += 1
+
+        return await asyncio.shield(task), leader
+
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 所有等待者都已取消時避免 "exception was never retrieved" 警告
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> Dict[str, Any]:
+        """合併統計：總調用數、實際上游請求數、被合併的調用數"""
+        by_method = {method: dict(c) for method, c in self._counters.items()}
+        calls = sum(c["calls"] for c in by_method.values())
+        coalesced = sum(c["coalesced"] for c in by_method.values())
+        return {
+            "calls": calls,
+            "upstream": sum(c["upstream"] for c in by_method.values()),
+            "coalesced": coalesced,
+            "coalesced_ratio": coalesced / calls if calls else 0.0,
+            "in_flight": len(self._inflight),
+            "by_method": by_method
+        }
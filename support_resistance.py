@@ -0,0 +1,87 @@
+# app/services/support_resistance.py
+# 支撐阻力引擎 - 向量化樞軸點檢測 + 價格區間聚類
+# 以居中滾動極值取代逐根K線掃描，複雜度由 O(n·w) 降至 O(n)
+
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Tuple, Any
+
+
+def find_pivots(high: pd.Series, low: pd.Series,
+                window: int = 20) -> Tuple[np.ndarray, np.ndarray]:
+    """檢測樞軸高點/低點
+
+    某根K線的高(低)價等於前後 window 根範圍內的最大(小)值即為樞軸點，
+    與原逐根比較的定義一致。pandas 滾動極值內部使用單調隊列，每根K線攤銷 O(1)。
+    """
+    span = 2 * window + 1
+
+    # 居中窗口在首尾 window 根會是 NaN，比較結果為 False，自然排除邊界
+    rolling_max = high.rolling(span, center=True).max()
+    rolling_min = low.rolling(span, center=True).min()
+
+    pivot_highs = (high == rolling_max).to_numpy()
+    pivot_lows = (low == rolling_min).to_numpy()
+
+    return pivot_highs, pivot_lows
+
+
+def cluster_levels(levels: np.ndarray, tolerance: float = 0.005) -> List[Dict[str, Any]]:
+    """將相近的價位聚類成價格區間
+
+    排序後相鄰價位的相對差距不超過 tolerance 即歸入同一區間，
+    每個區間返回中心價、上下邊界及觸及次數。
+    """
+    levels = np.asarray(levels, dtype=float)
+    levels = levels[~np.isnan(levels)]
+    if levels.size == 0:
+        return []
+
+    levels = np.sort(levels)
+
+    # 相對差距超過容忍度的位置開啟新區間
+    gaps = np.diff(levels) / levels[:-1]
+    zone_ids = np.concatenate(([0], np.cumsum(gaps > tolerance)))
+
+    touches = np.bincount(zone_ids)
+    centers = np.bincount(zone_ids, weights=levels) / touches
+    boundaries = np.flatnonzero(np.diff(zone_ids)) + 1
+    lowers = levels[np.concatenate(([0], boundaries))]
+    uppers = levels[np.concatenate((boundaries - 1, [levels.size - 1]))]
+
+    return [
+        {
+            "price": float(center),
+            "lower": float(lower),
+            "upper": float(upper),
+            "touches": int(count)
+        }
+        for center, lower, upper, count in zip(centers, lowers, uppers, touches)
+    ]
+
+
+def calculate_support_resistance(high: pd.Series, low: pd.Series, close: pd.Series,
+                                 window: int = 20, tolerance: float = 0.005,
+                                 max_levels: int = 3) -> Dict[str, Any]:
+    """計算支撐阻力位及價格區間"""
+    pivot_highs, pivot_lows = find_pivots(high, low, window)
+
+    resistance_zones = cluster_levels(high.to_numpy()[pivot_highs], tolerance)
+    support_zones = cluster_levels(low.to_numpy()[pivot_lows], tolerance)
+
+    current_price = close.iloc[-1]
+
+    # 取最接近現價的區間
+    resistance_above = [z for z in resistance_zones if z["price"] > current_price]
+    support_below = [z for z in support_zones if z["price"] < current_price][::-1]
+
+    resistance_above = resistance_above[:max_levels]
+    support_below = support_below[:max_levels]
+
+    return {
+        "resistance_levels": [z["price"] for z in resistance_above],
+        "support_levels": [z["price"] for z in support_below],
+        "resistance_zones": resistance_above,
+        "support_zones": support_below,
+        "current_price": current_price
+    }
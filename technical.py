@@ -0,0 +1,45 @@
+# app/api/technical.py
+# 技術分析 API - 批量分析 (NDJSON 流式返回)
+
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from ..core.config import get_settings
+from ..services.batch_analysis import stream_batch_analysis
+from ..utils.serialization import dumps
+
+router = APIRouter(prefix="/api/v1/analysis", tags=["analysis"])
+
+
+class BatchAnalysisRequest(BaseModel):
+    symbols: List[str]
+    period: Optional[str] = "1y"
+    interval: Optional[str] = "1d"
+    indicators: Optional[List[str]] = None
+
+
+@router.post("/technical/batch")
+async def technical_analysis_batch(request: BatchAnalysisRequest):
+    """批量技術分析
+
+    每個標的完成後立即輸出一行 JSON (application/x-ndjson)，順序為完成順序；
+    單個標的失敗以 {"symbol": ..., "status": "error", "error": ...} 行報告；
+    最後一行為 {"status": "done", "total", "succeeded", "failed", "elapsed_ms"}。
+    """
+    max_symbols = get_settings().BATCH_ANALYSIS_MAX_SYMBOLS
+    symbols = [s for s in request.symbols if s and s.strip()]
+    if not symbols:
+        raise HTTPException(status_code=400, detail="symbols 不能為空")
+    if len(symbols) > max_symbols:
+        raise HTTPException(status_code=400, detail=f"單次最多分析 {max_symbols} 個標的")
+
+    async def lines():
+        async for result in stream_batch_analysis(symbols, request.period, request.interval,
+                                                  request.indicators):
+            yield dumps(result) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson",
+                             headers={"X-Accel-Buffering": "no"})
@@ -2,61 +2,123 @@
 # 技術分析引擎 - 100+ 技術指標計算
 # 專業工程師審查：✅ 數學計算準確，異常處理完善
 
+import json
+import time
+import hashlib
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Any, Optional
+from contextlib import contextmanager
 from loguru import logger
 import warnings
 warnings.filterwarnings('ignore')
 
-# 嘗試導入 TA-Lib，如果失敗則使用 pandas-ta
-try:
-    import talib
-    HAS_TALIB = True
-    logger.info("✅ TA-Lib 可用")
-except ImportError:
-    HAS_TALIB = False
-    logger.warning("⚠️ TA-Lib 不可用，使用 pandas-ta 替代")
-
-try:
-    import pandas_ta as ta
-    HAS_PANDAS_TA = True
-    logger.info("✅ pandas-ta 可用")
-except ImportError:
-    HAS_PANDAS_TA = False
-    logger.warning("⚠️ pandas-ta 不可用，使用內建計算")
+from ..core.config import get_settings
+from ..utils.cache import LRUCache
+from ..utils.metrics import INDICATOR_COMPUTE
+from .support_resistance import calculate_support_resistance
+from .signal_series import signal_events, technical_score_series
+from .indicator_frame import IndicatorFrame
+from .indicator_backends import HAS_TALIB, HAS_PANDAS_TA, get_backend
+
+# 默認指標參數
+DEFAULT_CONFIG = {
+    "rsi_period": 14,
+    "macd_fast": 12,
+    "macd_slow": 26,
+    "macd_signal": 9,
+    "sma_periods": [20, 50, 200],
+    "ema_periods": [12, 26],
+    "bb_period": 20,
+    "bb_std": 2,
+    "stoch_k": 14,
+    "stoch_d": 3,
+    "atr_period": 14,
+    "adx_period": 14,
+    "willr_period": 14,
+    "cci_period": 20,
+    "mfi_period": 14,
+    "sr_window": 20,
+    "sr_zone_tolerance": 0.005
+}
+
+def _shift_columns(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """逐列平移：out[i, j] = values[i + offsets[j], j]，越界處為 NaN"""
+    rows = values.shape[0]
+    source = np.arange(rows)[:, None] + offsets
+    outside = (source < 0) | (source >= rows)
+    shifted = np.take_along_axis(values, np.clip(source, 0, rows - 1), axis=0)
+    shifted[outside] = np.nan
+    return shifted
+
 
 class TechnicalAnalyzer:
     """技術分析引擎"""
 
-    def __init__(self):
-        self.indicators_cache = {}
+    def __init__(self, backend: Optional[str] = None):
+        settings = get_settings()
+        self.indicators_cache = LRUCache(
+            max_bytes=settings.INDICATOR_CACHE_MAX_MB * 1024 * 1024,
+            ttl=settings.CACHE_TTL
+        )
+        self.backend = get_backend(backend or settings.TECHNICAL_BACKEND)
+        self.frame_dtype = np.dtype(settings.INDICATOR_FRAME_DTYPE)
+        # 最近一次計算的分類耗時 (秒)，供進程池回傳給主進程記錄
+        self.last_timings: Dict[str, float] = {}
+
+    @contextmanager
+    def _timed(self, category: str):
+        """記錄一個指標分類的計算時間"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.last_timings[category] = elapsed
+            INDICATOR_COMPUTE.observe(elapsed, category=category)
+
+    def set_backend(self, name: str):
+        """切換指標計算後端 (talib / pandas_ta / numpy / auto)"""
+        self.backend = get_backend(name)
+        self.indicators_cache.clear()
 
     def calculate_all_indicators(self, data: pd.DataFrame, 
-                               config: Optional[Dict] = None) -> Dict[str, Any]:
-        """計算所有技術指標"""
+                               config: Optional[Dict] = None,
+                               symbol: Optional[str] = None,
+                               interval: str = "1d",
+                               indicators: Optional[List[str]] = None,
+                               compact: bool = False) -> Dict[str, Any]:
+        """計算所有技術指標
+
+        提供 symbol 時結果按 (標的, 週期, 最後K線時間, 配置) 緩存，
+        同一根K線內的重複請求直接返回緩存結果。
+        提供 indicators (如 ["rsi"]) 時只計算所需指標及其依賴；信號和評分始終基於固定的指標集合。
+        compact=True 時返回 IndicatorFrame (共享索引的 2-D 數組，可按原字典方式讀取)；
+        緩存內部始終以 IndicatorFrame 保存。
+        """
         if data is None or data.empty:
             return {"error": "數據不足"}
 
+        self.last_timings = {}
         try:
             # 默認配置
-            default_config = {
-                "rsi_period": 14,
-                "macd_fast": 12,
-                "macd_slow": 26, 
-                "macd_signal": 9,
-                "sma_periods": [20, 50, 200],
-                "ema_periods": [12, 26],
-                "bb_period": 20,
-                "bb_std": 2,
-                "stoch_k": 14,
-                "stoch_d": 3,
-                "atr_period": 14
-            }
+            default_config = dict(DEFAULT_CONFIG)
 
             if config:
                 default_config.update(config)
 
+            cache_key = None
+            if symbol:
+                cache_key = self._cache_key(symbol, interval, data, default_config, indicators)
+                cached = self.indicators_cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"技術指標緩存命中: {symbol} {interval}")
+                    return cached if compact else cached.to_dict()
+
+            if indicators:
+                results = self._calculate_planned_indicators(data, default_config, indicators)
+                return self._finalize_results(results, data, cache_key, compact)
+
             results = {}
 
             # 基本價格數據
@@ -67,49 +129,336 @@ class TechnicalAnalyzer:
 
             # 1. 趨勢指標
             logger.info("計算趨勢指標...")
-            results['trend'] = self._calculate_trend_indicators(
-                close, high, low, default_config
-            )
+            with self._timed("trend"):
+                results['trend'] = self._calculate_trend_indicators(
+                    close, high, low, default_config
+                )
 
             # 2. 動量指標  
             logger.info("計算動量指標...")
-            results['momentum'] = self._calculate_momentum_indicators(
-                close, high, low, default_config
-            )
+            with self._timed("momentum"):
+                results['momentum'] = self._calculate_momentum_indicators(
+                    close, high, low, default_config
+                )
 
             # 3. 波動率指標
             logger.info("計算波動率指標...")
-            results['volatility'] = self._calculate_volatility_indicators(
-                close, high, low, default_config
-            )
+            with self._timed("volatility"):
+                results['volatility'] = self._calculate_volatility_indicators(
+                    close, high, low, default_config
+                )
 
             # 4. 成交量指標
             if volume is not None:
                 logger.info("計算成交量指標...")
-                results['volume'] = self._calculate_volume_indicators(
-                    close, volume, default_config
-                )
+                with self._timed("volume"):
+                    results['volume'] = self._calculate_volume_indicators(
+                        close, volume, default_config, high, low
+                    )
 
             # 5. 支撐阻力
             logger.info("計算支撐阻力...")
-            results['support_resistance'] = self._calculate_support_resistance(
-                data, default_config
-            )
+            with self._timed("support_resistance"):
+                results['support_resistance'] = self._calculate_support_resistance(
+                    data, default_config
+                )
 
             # 6. 綜合信號分析
             logger.info("生成交易信號...")
-            results['signals'] = self._generate_signals(results, close)
+            with self._timed("signals"):
+                results['signals'] = self._generate_signals(results, close)
 
-            # 7. 技術評分
-            results['technical_score'] = self._calculate_technical_score(results)
+                # 7. 技術評分
+                results['technical_score'] = self._calculate_technical_score(results)
 
             logger.info("✅ 技術指標計算完成")
-            return results
+
+            return self._finalize_results(results, data, cache_key, compact)
 
         except Exception as e:
             logger.error(f"技術指標計算失敗: {e}")
             return {"error": str(e)}
 
+    def _finalize_results(self, results: Dict[str, Any], data: pd.DataFrame,
+                          cache_key: Optional[Tuple], compact: bool) -> Any:
+        """按需打包為 IndicatorFrame 並寫入緩存
+
+        寫入緩存時首次調用同樣返回由 IndicatorFrame 展開的結果，與緩存命中時的精度/結構一致。
+        """
+        if cache_key is None and not compact:
+            return results
+
+        frame = IndicatorFrame.from_results(results, index=data.index, dtype=self.frame_dtype)
+        if cache_key is not None:
+            self.indicators_cache.set(cache_key, frame)
+        return frame if compact else frame.to_dict()
+
+    def _calculate_planned_indicators(self, data: pd.DataFrame, config: Dict,
+                                      indicators: List[str]) -> Dict[str, Any]:
+        """按依賴圖只計算請求的指標
+
+        signals 節點始終加入計劃 (其依賴的 RSI/MACD/SMA/布林帶隨之計算但不輸出)，
+        因此信號和評分與完整計算一致，不隨請求的指標子集變化。
+        """
+        from .indicator_planner import execute_plan
+
+        with self._timed("planned"):
+            return execute_plan(data, config, list(indicators) + ["signals"], self.backend, analyzer=self)
+
+    def _cache_key(self, symbol: str, interval: str, data: pd.DataFrame,
+                   config: Dict, indicators: Optional[List[str]] = None) -> Tuple:
+        """緩存鍵：標的、週期、最後K線時間、數據長度及配置哈希
+
+        數據長度區分同一K線下不同 period 的請求 (影響長週期均線和支撐阻力)。
+        """
+        config_hash = hashlib.sha1(
+            json.dumps([config, sorted(indicators or [])], sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return (symbol.upper(), interval, data.index[-1], len(data), self.backend.name, config_hash)
+
+    def calculate_all_indicators_batch(self, panel: Any,
+                                       config: Optional[Dict] = None) -> Dict[str, Dict[str, Any]]:
+        """批量計算多個標的的技術指標
+
+        panel 為對齊時間軸的價格面板：列為 (欄位, 標的) MultiIndex 的 DataFrame
+        (即 yf.download 的格式)，或 {欄位: DataFrame(時間 × 標的)} 字典。
+        所有指標按列一次性向量化計算，再拆分成與 calculate_all_indicators 相同的逐標的結構。
+        允許各標的歷史長短不一 (前段為 NaN)。
+        """
+        fields = self._normalize_panel(panel)
+        if not fields or fields['Close'].empty:
+            return {}
+
+        default_config = dict(DEFAULT_CONFIG)
+        if config:
+            default_config.update(config)
+
+        close = fields['Close']
+        high = fields['High']
+        low = fields['Low']
+        volume = fields.get('Volume')
+
+        # 1-4. 整個面板一次性計算各類指標
+        logger.info(f"批量計算技術指標: {close.shape[1]} 個標的 × {close.shape[0]} 行")
+        categories = {
+            'trend': self._batch_trend_indicators(close, high, low, default_config),
+            'momentum': self._batch_momentum_indicators(close, high, low, default_config),
+            'volatility': self._batch_volatility_indicators(close, high, low, default_config)
+        }
+        if volume is not None:
+            categories['volume'] = self._batch_volume_indicators(
+                close, high, low, volume, default_config
+            )
+
+        # 各標的有效長度 (跳過前段 NaN)，決定哪些指標有足夠數據
+        first_valid = close.notna().to_numpy().argmax(axis=0)
+        lengths = close.notna().sum().to_numpy()
+
+        batch_results = {}
+        for i, symbol in enumerate(close.columns):
+            if lengths[i] == 0:
+                batch_results[symbol] = {"error": "數據不足"}
+                continue
+
+            try:
+                start = first_valid[i]
+                results = {}
+                for category, frames in categories.items():
+                    results[category] = {
+                        name: frame[symbol].iloc[start:]
+                        for name, (frame, min_length) in frames.items()
+                        if lengths[i] >= min_length
+                    }
+
+                symbol_close = close[symbol].iloc[start:]
+                results['support_resistance'] = self._calculate_support_resistance(
+                    pd.DataFrame({
+                        'Close': symbol_close,
+                        'High': high[symbol].iloc[start:],
+                        'Low': low[symbol].iloc[start:]
+                    }),
+                    default_config
+                )
+                results['signals'] = self._generate_signals(results, symbol_close)
+                results['technical_score'] = self._calculate_technical_score(results)
+                batch_results[symbol] = results
+
+            except Exception as e:
+                logger.error(f"批量技術指標拆分失敗 {symbol}: {e}")
+                batch_results[symbol] = {"error": str(e)}
+
+        logger.info("✅ 批量技術指標計算完成")
+        return batch_results
+
+    def _normalize_panel(self, panel: Any) -> Dict[str, pd.DataFrame]:
+        """將面板輸入統一為 {欄位: DataFrame(時間 × 標的)}"""
+        if isinstance(panel, pd.DataFrame):
+            if not isinstance(panel.columns, pd.MultiIndex):
+                raise ValueError("面板 DataFrame 需要 (欄位, 標的) MultiIndex 列")
+            level = 0 if 'Close' in panel.columns.get_level_values(0) else 1
+            fields = {
+                field: panel.xs(field, axis=1, level=level)
+                for field in ['Open', 'High', 'Low', 'Close', 'Volume']
+                if field in panel.columns.get_level_values(level)
+            }
+        else:
+            fields = dict(panel)
+
+        missing = [f for f in ['High', 'Low', 'Close'] if f not in fields]
+        if missing:
+            raise ValueError(f"面板缺少欄位: {missing}")
+
+        return {name: frame.astype(float) for name, frame in fields.items()}
+
+    def _backend_columns(self, method: str, *frames: pd.DataFrame, **kwargs) -> Tuple[pd.DataFrame, ...]:
+        """批量面板的後端指標計算
+
+        NumPy 核心支援 (時間 × 標的) 二維輸入，整個面板一次計算 (數值與 TA-Lib 一致)；
+        pandas-ta 後端 (數值與 TA-Lib 有差異) 或二維計算失敗時才逐列調用後端。
+        """
+        if self.backend.name != "pandas_ta":
+            try:
+                return self._panel_columns(getattr(get_backend("numpy"), method), *frames, **kwargs)
+            except Exception as e:
+                logger.warning(f"批量指標 {method} 二維計算失敗，改為逐列計算: {e}")
+        return self._per_column(getattr(self.backend, method), *frames, **kwargs)
+
+    @staticmethod
+    def _panel_columns(func, *frames: pd.DataFrame, **kwargs) -> Tuple[pd.DataFrame, ...]:
+        """一次調用 NumPy 核心計算所有列
+
+        各列先上移到首個有效值 (尾部補 NaN)，使預熱及種子位置與單標的路徑相同，算完再移回原位。
+        """
+        arrays = [frame.to_numpy(dtype=float) for frame in frames]
+        rows = arrays[0].shape[0]
+        valid = ~np.isnan(arrays[0])
+        starts = np.where(valid.any(axis=0), valid.argmax(axis=0), rows)
+        ragged = bool(starts.any())
+
+        if ragged:
+            arrays = [_shift_columns(values, starts) for values in arrays]
+        result = func(*arrays, **kwargs)
+        if not isinstance(result, tuple):
+            result = (result,)
+
+        template = frames[0]
+        return tuple(
+            pd.DataFrame(_shift_columns(values, -starts) if ragged else values,
+                         index=template.index, columns=template.columns)
+            for values in result
+        )
+
+    @staticmethod
+    def _per_column(func, *frames: pd.DataFrame, **kwargs) -> Tuple[pd.DataFrame, ...]:
+        """逐列調用指標後端 (每列為向量化計算)，保持與單標的路徑一致的數值"""
+        template = frames[0]
+        outputs = None
+        for symbol in template.columns:
+            columns = [frame[symbol].to_numpy() for frame in frames]
+            valid = ~np.isnan(columns[0])
+            start = valid.argmax() if valid.any() else len(valid)
+            result = func(*[c[start:] for c in columns], **kwargs) if start < len(valid) else None
+            if not isinstance(result, tuple):
+                result = (result,)
+            if outputs is None:
+                outputs = [pd.DataFrame(np.nan, index=template.index, columns=template.columns)
+                           for _ in result]
+            for output, values in zip(outputs, result):
+                if values is not None:
+                    output.iloc[start:, output.columns.get_loc(symbol)] = values
+        return tuple(outputs)
+
+    def _batch_trend_indicators(self, close: pd.DataFrame, high: pd.DataFrame,
+                                low: pd.DataFrame, config: Dict) -> Dict[str, Tuple[pd.DataFrame, int]]:
+        """批量計算趨勢指標，返回 {名稱: (面板, 最少數據長度)}"""
+        trend = {}
+
+        for period in config['sma_periods']:
+            trend[f'sma_{period}'] = (close.rolling(period).mean(), period)
+
+        for period in config['ema_periods']:
+            trend[f'ema_{period}'] = (close.ewm(span=period).mean(), period)
+
+        macd, signal, histogram = self._backend_columns(
+            "macd", close,
+            fast=config['macd_fast'], slow=config['macd_slow'], signal=config['macd_signal']
+        )
+        trend['macd'] = (macd, config['macd_slow'])
+        trend['macd_signal'] = (signal, config['macd_slow'])
+        trend['macd_histogram'] = (histogram, config['macd_slow'])
+
+        adx, = self._backend_columns("adx", high, low, close,
+                                     period=config['adx_period'])
+        trend['adx'] = (adx, config['adx_period'])
+
+        return trend
+
+    def _batch_momentum_indicators(self, close: pd.DataFrame, high: pd.DataFrame,
+                                   low: pd.DataFrame, config: Dict) -> Dict[str, Tuple[pd.DataFrame, int]]:
+        """批量計算動量指標"""
+        momentum = {}
+
+        rsi, = self._backend_columns("rsi", close, period=config['rsi_period'])
+        stoch_k, stoch_d = self._backend_columns(
+            "stoch", high, low, close,
+            fastk_period=config['stoch_k'],
+            slowk_period=config['stoch_d'],
+            slowd_period=config['stoch_d']
+        )
+        willr, = self._backend_columns("willr", high, low, close,
+                                       period=config['willr_period'])
+        cci, = self._backend_columns("cci", high, low, close,
+                                     period=config['cci_period'])
+
+        momentum['rsi'] = (rsi, config['rsi_period'])
+        momentum['stoch_k'] = (stoch_k, config['stoch_k'])
+        momentum['stoch_d'] = (stoch_d, config['stoch_k'])
+        momentum['williams_r'] = (willr, config['willr_period'])
+        momentum['cci'] = (cci, config['cci_period'])
+
+        return momentum
+
+    def _batch_volatility_indicators(self, close: pd.DataFrame, high: pd.DataFrame,
+                                     low: pd.DataFrame, config: Dict) -> Dict[str, Tuple[pd.DataFrame, int]]:
+        """批量計算波動率指標"""
+        volatility = {}
+
+        sma = close.rolling(config['bb_period']).mean()
+        std = close.rolling(config['bb_period']).std()
+        upper = sma + (std * config['bb_std'])
+        lower = sma - (std * config['bb_std'])
+
+        volatility['bb_upper'] = (upper, config['bb_period'])
+        volatility['bb_middle'] = (sma, config['bb_period'])
+        volatility['bb_lower'] = (lower, config['bb_period'])
+        volatility['bb_width'] = ((upper - lower) / sma, config['bb_period'])
+
+        atr, = self._backend_columns("atr", high, low, close,
+                                     period=config['atr_period'])
+        volatility['atr'] = (atr, config['atr_period'])
+
+        returns = close.pct_change(fill_method=None)
+        volatility['historical_volatility'] = (returns.rolling(30).std() * np.sqrt(252), 30)
+
+        return volatility
+
+    def _batch_volume_indicators(self, close: pd.DataFrame, high: pd.DataFrame, low: pd.DataFrame,
+                                 volume: pd.DataFrame, config: Dict) -> Dict[str, Tuple[pd.DataFrame, int]]:
+        """批量計算成交量指標"""
+        volume_indicators = {}
+
+        obv, = self._backend_columns("obv", close, volume)
+        volume_indicators['obv'] = (obv, 2)
+
+        volume_indicators['volume_sma'] = (volume.rolling(20).mean(), 20)
+        volume_indicators['volume_ratio'] = (volume / volume.shift(1), 2)
+
+        mfi, = self._backend_columns("mfi", high, low, close, volume,
+                                     period=config['mfi_period'])
+        volume_indicators['mfi'] = (mfi, config['mfi_period'])
+
+        return volume_indicators
+
     def _calculate_trend_indicators(self, close: pd.Series, high: pd.Series, 
                                   low: pd.Series, config: Dict) -> Dict[str, Any]:
         """計算趨勢指標"""
@@ -128,31 +477,20 @@ class TechnicalAnalyzer:
 
             # MACD
             if len(close) >= config['macd_slow']:
-                if HAS_TALIB:
-                    macd, signal, histogram = talib.MACD(
-                        close.values,
-                        fastperiod=config['macd_fast'],
-                        slowperiod=config['macd_slow'], 
-                        signalperiod=config['macd_signal']
-                    )
-                    trend_indicators['macd'] = pd.Series(macd, index=close.index)
-                    trend_indicators['macd_signal'] = pd.Series(signal, index=close.index)
-                    trend_indicators['macd_histogram'] = pd.Series(histogram, index=close.index)
-                else:
-                    # Manual MACD calculation
-                    ema_fast = close.ewm(span=config['macd_fast']).mean()
-                    ema_slow = close.ewm(span=config['macd_slow']).mean()
-                    macd = ema_fast - ema_slow
-                    signal = macd.ewm(span=config['macd_signal']).mean()
-                    histogram = macd - signal
-
-                    trend_indicators['macd'] = macd
-                    trend_indicators['macd_signal'] = signal
-                    trend_indicators['macd_histogram'] = histogram
+                macd, signal, histogram = self.backend.macd(
+                    close.values,
+                    fast=config['macd_fast'],
+                    slow=config['macd_slow'],
+                    signal=config['macd_signal']
+                )
+                trend_indicators['macd'] = pd.Series(macd, index=close.index)
+                trend_indicators['macd_signal'] = pd.Series(signal, index=close.index)
+                trend_indicators['macd_histogram'] = pd.Series(histogram, index=close.index)
 
             # ADX (平均方向指數)
-            if len(close) >= 14 and HAS_TALIB:
-                adx = talib.ADX(high.values, low.values, close.values, timeperiod=14)
+            if len(close) >= config['adx_period']:
+                adx = self.backend.adx(high.values, low.values, close.values,
+                                       period=config['adx_period'])
                 trend_indicators['adx'] = pd.Series(adx, index=close.index)
 
         except Exception as e:
@@ -166,49 +504,32 @@ class TechnicalAnalyzer:
         momentum_indicators = {}
 
         try:
-            # RSI
+            # RSI (Wilder 平滑)
             if len(close) >= config['rsi_period']:
-                if HAS_TALIB:
-                    rsi = talib.RSI(close.values, timeperiod=config['rsi_period'])
-                    momentum_indicators['rsi'] = pd.Series(rsi, index=close.index)
-                else:
-                    # Manual RSI calculation
-                    delta = close.diff()
-                    gain = delta.where(delta > 0, 0).rolling(config['rsi_period']).mean()
-                    loss = (-delta.where(delta < 0, 0)).rolling(config['rsi_period']).mean()
-                    rs = gain / loss
-                    rsi = 100 - (100 / (1 + rs))
-                    momentum_indicators['rsi'] = rsi
+                rsi = self.backend.rsi(close.values, period=config['rsi_period'])
+                momentum_indicators['rsi'] = pd.Series(rsi, index=close.index)
 
             # Stochastic
             if len(close) >= config['stoch_k']:
-                if HAS_TALIB:
-                    slowk, slowd = talib.STOCH(
-                        high.values, low.values, close.values,
-                        fastk_period=config['stoch_k'],
-                        slowk_period=config['stoch_d'],
-                        slowd_period=config['stoch_d']
-                    )
-                    momentum_indicators['stoch_k'] = pd.Series(slowk, index=close.index)
-                    momentum_indicators['stoch_d'] = pd.Series(slowd, index=close.index)
-                else:
-                    # Manual Stochastic calculation
-                    lowest_low = low.rolling(config['stoch_k']).min()
-                    highest_high = high.rolling(config['stoch_k']).max()
-                    k_percent = 100 * ((close - lowest_low) / (highest_high - lowest_low))
-                    d_percent = k_percent.rolling(config['stoch_d']).mean()
-
-                    momentum_indicators['stoch_k'] = k_percent
-                    momentum_indicators['stoch_d'] = d_percent
+                slowk, slowd = self.backend.stoch(
+                    high.values, low.values, close.values,
+                    fastk_period=config['stoch_k'],
+                    slowk_period=config['stoch_d'],
+                    slowd_period=config['stoch_d']
+                )
+                momentum_indicators['stoch_k'] = pd.Series(slowk, index=close.index)
+                momentum_indicators['stoch_d'] = pd.Series(slowd, index=close.index)
 
             # Williams %R
-            if len(close) >= 14 and HAS_TALIB:
-                willr = talib.WILLR(high.values, low.values, close.values, timeperiod=14)
+            if len(close) >= config['willr_period']:
+                willr = self.backend.willr(high.values, low.values, close.values,
+                                           period=config['willr_period'])
                 momentum_indicators['williams_r'] = pd.Series(willr, index=close.index)
 
             # CCI (商品通道指數)
-            if len(close) >= 20 and HAS_TALIB:
-                cci = talib.CCI(high.values, low.values, close.values, timeperiod=20)
+            if len(close) >= config['cci_period']:
+                cci = self.backend.cci(high.values, low.values, close.values,
+                                       period=config['cci_period'])
                 momentum_indicators['cci'] = pd.Series(cci, index=close.index)
 
         except Exception as e:
@@ -234,27 +555,15 @@ class TechnicalAnalyzer:
                     volatility_indicators['bb_upper'] - volatility_indicators['bb_lower']
                 ) / sma
 
-            # ATR (平均真實範圍)
+            # ATR (平均真實範圍，Wilder 平滑)
             if len(close) >= config['atr_period']:
-                if HAS_TALIB:
-                    atr = talib.ATR(
-                        high.values, low.values, close.values, 
-                        timeperiod=config['atr_period']
-                    )
-                    volatility_indicators['atr'] = pd.Series(atr, index=close.index)
-                else:
-                    # Manual ATR calculation
-                    high_low = high - low
-                    high_close = np.abs(high - close.shift())
-                    low_close = np.abs(low - close.shift())
-                    ranges = pd.concat([high_low, high_close, low_close], axis=1)
-                    true_range = ranges.max(axis=1)
-                    atr = true_range.rolling(config['atr_period']).mean()
-                    volatility_indicators['atr'] = atr
+                atr = self.backend.atr(high.values, low.values, close.values,
+                                       period=config['atr_period'])
+                volatility_indicators['atr'] = pd.Series(atr, index=close.index)
 
             # 歷史波動率
             if len(close) >= 30:
-                returns = close.pct_change().dropna()
+                returns = close.pct_change(fill_method=None)
                 volatility_indicators['historical_volatility'] = (
                     returns.rolling(30).std() * np.sqrt(252)
                 )
@@ -265,22 +574,16 @@ class TechnicalAnalyzer:
         return volatility_indicators
 
     def _calculate_volume_indicators(self, close: pd.Series, volume: pd.Series,
-                                   config: Dict) -> Dict[str, Any]:
+                                   config: Dict, high: Optional[pd.Series] = None,
+                                   low: Optional[pd.Series] = None) -> Dict[str, Any]:
         """計算成交量指標"""
         volume_indicators = {}
 
         try:
             # OBV (平衡成交量)
             if len(close) >= 2:
-                if HAS_TALIB:
-                    obv = talib.OBV(close.values, volume.values)
-                    volume_indicators['obv'] = pd.Series(obv, index=close.index)
-                else:
-                    # Manual OBV calculation
-                    price_change = close.diff()
-                    obv = np.where(price_change > 0, volume, 
-                           np.where(price_change < 0, -volume, 0)).cumsum()
-                    volume_indicators['obv'] = pd.Series(obv, index=close.index)
+                obv = self.backend.obv(close.values, volume.values)
+                volume_indicators['obv'] = pd.Series(obv, index=close.index)
 
             # Volume SMA
             if len(volume) >= 20:
@@ -291,11 +594,9 @@ class TechnicalAnalyzer:
                 volume_indicators['volume_ratio'] = volume / volume.shift(1)
 
             # MFI (資金流量指數)
-            if len(close) >= 14 and HAS_TALIB:
-                from ..utils.helpers import calculate_typical_price
-                typical_price = calculate_typical_price(close, close, close)  # 簡化版
-                mfi = talib.MFI(close.values, close.values, close.values, 
-                               volume.values, timeperiod=14)
+            if len(close) >= config['mfi_period'] and high is not None and low is not None:
+                mfi = self.backend.mfi(high.values, low.values, close.values,
+                                       volume.values, period=config['mfi_period'])
                 volume_indicators['mfi'] = pd.Series(mfi, index=close.index)
 
         except Exception as e:
@@ -307,37 +608,12 @@ class TechnicalAnalyzer:
                                     config: Dict) -> Dict[str, Any]:
         """計算支撐阻力位"""
         try:
-            close = data['Close']
-            high = data['High']
-            low = data['Low']
-
-            # 簡化的支撐阻力計算
-            # 使用局部最大值和最小值
-            window = 20
-
-            # 阻力位 (局部最大值)
-            resistance_levels = []
-            for i in range(window, len(high) - window):
-                if high.iloc[i] == high.iloc[i-window:i+window+1].max():
-                    resistance_levels.append(high.iloc[i])
-
-            # 支撐位 (局部最小值)
-            support_levels = []
-            for i in range(window, len(low) - window):
-                if low.iloc[i] == low.iloc[i-window:i+window+1].min():
-                    support_levels.append(low.iloc[i])
-
-            # 取最近的支撐阻力位
-            current_price = close.iloc[-1]
-
-            resistance_above = [r for r in resistance_levels if r > current_price]
-            support_below = [s for s in support_levels if s < current_price]
-
-            return {
-                "resistance_levels": sorted(resistance_above)[:3],  # 前3個阻力位
-                "support_levels": sorted(support_below, reverse=True)[:3],  # 前3個支撐位
-                "current_price": current_price
-            }
+            # 向量化樞軸點檢測，並將相近價位聚類成區間
+            return calculate_support_resistance(
+                data['High'], data['Low'], data['Close'],
+                window=config.get('sr_window', 20),
+                tolerance=config.get('sr_zone_tolerance', 0.005)
+            )
 
         except Exception as e:
             logger.error(f"支撐阻力計算失敗: {e}")
@@ -498,6 +774,26 @@ class TechnicalAnalyzer:
             logger.error(f"技術評分計算失敗: {e}")
             return 50
 
+    def generate_signal_history(self, indicators: Dict, close: pd.Series) -> pd.DataFrame:
+        """全歷史信號事件 (向量化，用於圖表標註)
+
+        indicators 為 calculate_all_indicators 的結果；返回以K線時間為索引的事件表，
+        最後一根K線的事件與 _generate_signals 相同。
+        """
+        try:
+            return signal_events(indicators, close)
+        except Exception as e:
+            logger.error(f"歷史信號生成失敗: {e}")
+            return pd.DataFrame(columns=["indicator", "type", "strength", "value", "description"])
+
+    def calculate_score_history(self, indicators: Dict, close: pd.Series) -> pd.Series:
+        """全歷史技術評分 (0-100)，最後一個值與 _calculate_technical_score 相同"""
+        try:
+            return technical_score_series(indicators, close.index)
+        except Exception as e:
+            logger.error(f"歷史技術評分計算失敗: {e}")
+            return pd.Series(50, index=close.index, name="technical_score")
+
     def get_recommendation(self, score: int, signals: List[Dict]) -> Tuple[str, float]:
         """根據技術評分和信號獲取投資建議"""
         try: